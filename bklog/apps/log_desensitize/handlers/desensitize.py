@@ -19,6 +19,7 @@ SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 We undertake not to change the open source license (MIT license) applicable to the current version of
 the project delivered to anyone in the future.
 """
+import bisect
 import copy
 import re
 from typing import List
@@ -42,6 +43,11 @@ from apps.log_search.constants import CollectorScenarioEnum
 from apps.log_search.models import LogIndexSet, Scenario
 from apps.models import model_to_dict
 
+# 合并后语义会发生变化的正则: 反向引用、条件分组、全局内联标志
+PREFILTER_UNSAFE_REGEX = re.compile(r"\\[1-9]|\(\?P=|\(\?\(|\(\?[aiLmsux]+\)")
+# 命名分组
+NAMED_GROUP_REGEX = re.compile(r"(?<!\\)\(\?P<\w+>")
+
 
 class DesensitizeHandler(object):
     """
@@ -116,6 +122,36 @@ class DesensitizeHandler(object):
         if self.rules:
             self.rules = sorted(self.rules, key=lambda x: x["sort_index"])
 
+        # 预编译每组规则的合并正则，单次扫描即可判断文本是否需要脱敏
+        self.field_prefilter_mapping = {
+            _field_name: self.compile_prefilter(_rules) for _field_name, _rules in self.field_rule_mapping.items()
+        }
+        self.prefilter = self.compile_prefilter(self.rules)
+
+    @staticmethod
+    def compile_prefilter(rules: list):
+        """
+        将多条规则的正则合并为单个正则，用于预判文本是否命中任一规则
+        以下情况不做合并，返回 None:
+        1. 规则少于2条，或存在未指定正则的规则(整个字段处理，必定命中)
+        2. 正则包含反向引用、条件分组或全局内联标志，合并后语义会发生变化
+        """
+        if len(rules) < 2:
+            return None
+
+        patterns = []
+        for rule in rules:
+            regex = rule.get("__regex__")
+            if not regex or PREFILTER_UNSAFE_REGEX.search(regex.pattern):
+                return None
+            # 不同规则的命名分组可能重名，预判只关心是否命中，统一替换为非捕获分组
+            patterns.append("(?:{})".format(NAMED_GROUP_REGEX.sub("(?:", regex.pattern)))
+
+        try:
+            return re.compile("|".join(patterns))
+        except re.error:
+            return None
+
     def transform_text(self, text: str, is_highlight: bool = False):
         """
         处理文本类型
@@ -125,7 +161,7 @@ class DesensitizeHandler(object):
         if not self.rules or not text:
             return text
 
-        text = self.transform(log=str(text), rules=self.rules, is_highlight=is_highlight)
+        text = self.transform(log=str(text), rules=self.rules, is_highlight=is_highlight, prefilter=self.prefilter)
 
         return text
 
@@ -142,7 +178,9 @@ class DesensitizeHandler(object):
             if _field not in log_content or not _rules:
                 continue
             text = log_content[_field]
-            log_content[_field] = self.transform(log=str(text), rules=_rules)
+            log_content[_field] = self.transform(
+                log=str(text), rules=_rules, prefilter=self.field_prefilter_mapping.get(_field)
+            )
 
         return log_content
 
@@ -198,34 +236,37 @@ class DesensitizeHandler(object):
         return results
 
     @staticmethod
-    def merge_substrings(first, second):
+    def merge_substrings(substrings_list: list):
         """
-        合并子串匹配结果，剔除出现重叠的子串
+        合并各规则的子串匹配结果，剔除与更高优先级规则的结果出现重叠的子串
+        substrings_list 按规则优先级排列的各规则匹配结果
         """
+        result = []
+        # 已采纳子串的区间 按 (start, end) 有序保存
+        intervals = []
+
+        for substrings in substrings_list:
+            accepted = []
+            for substring in substrings:
+                # 有序区间之间不存在包含关系，起始位置小于当前子串结束位置的区间中，最后一个区间的结束位置最大
+                index = bisect.bisect_left(intervals, (substring["end"], -1))
+                if index and intervals[index - 1][1] >= substring["start"]:
+                    continue
+                accepted.append(substring)
 
-        def is_overlap(item1, item2):
-            return not (item1["start"] >= item2["end"] or item1["end"] < item2["start"])
-
-        result = first.copy()
-
-        for second_item in second:
-            is_overlapping = False
-
-            for first_item in first:
-                if is_overlap(first_item, second_item):
-                    is_overlapping = True
-                    break
-
-            if not is_overlapping:
-                result.append(second_item)
+            # 同一规则的匹配结果之间不做重叠判断
+            for substring in accepted:
+                bisect.insort(intervals, (substring["start"], substring["end"]))
+            result.extend(accepted)
 
         return result
 
-    def transform(self, log: str, rules: list, is_highlight: bool = False):
-        substrings = []
-        for rule in rules:
-            rule_substrings = self.find_substrings_by_rule(log, rule)
-            substrings = self.merge_substrings(substrings, rule_substrings)
+    def transform(self, log: str, rules: list, is_highlight: bool = False, prefilter=None):
+        # 所有规则均未命中 无需逐条规则匹配
+        if prefilter and not prefilter.search(log):
+            return log
+
+        substrings = self.merge_substrings(self.find_substrings_by_rule(log, rule) for rule in rules)
         substrings.sort(key=lambda x: x["start"])
 
         last_end = 0
@@ -43,6 +43,7 @@ class DslBuilder(object):
         highlight: dict = {},
         collapse={},
         search_after=[],
+        scroll_slice={},
         use_time_range=True,
         mappings: list = [],
     ):  # pylint: disable=dangerous-default-value
@@ -127,6 +128,10 @@ class DslBuilder(object):
             self._body.update({"search_after": self.search_after})
             self._body.pop("from")
 
+        # 切片scroll查询
+        if scroll_slice:
+            self._body.update({"slice": scroll_slice})
+
     @property
     def body(self):
         return self._body
@@ -175,6 +175,7 @@ class EsQuery(object):
             highlight=highlight,
             collapse=collapse,
             search_after=search_after,
+            scroll_slice=self.search_dict.get("slice"),
             use_time_range=use_time_range,
             mappings=mappings,
         ).body
@@ -94,6 +94,8 @@ class EsQuerySearchAttrSerializer(serializers.Serializer):
 
     # 添加scroll参数
     scroll = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    # 切片scroll查询 {"id": 0, "max": 2}
+    slice = serializers.DictField(required=False, default={}, allow_null=True)
 
     # 是否包含嵌套字段
     include_nested_fields = serializers.BooleanField(required=False, default=True)
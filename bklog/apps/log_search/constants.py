@@ -132,6 +132,10 @@ FEATURE_ASYNC_EXPORT_EXTERNAL = "feature_async_export_external"
 FEATURE_ASYNC_EXPORT_NOTIFY_TYPE = "notify_type"
 # 异步导出存储方式
 FEATURE_ASYNC_EXPORT_STORAGE_TYPE = "storage_type"
+# 异步导出切片并发数(仅ES场景, 并发导出的日志不保证全局有序)
+FEATURE_ASYNC_EXPORT_SLICE_COUNT = "slice_count"
+# 异步导出并发读取时缓存的最大页数(每个切片)
+ASYNC_EXPORT_SLICE_QUEUE_SIZE = 2
 # 异步导出邮件模板名
 ASYNC_EXPORT_EMAIL_TEMPLATE = "async_export_email_template"
 # 异步导出邮件默认中文模板路径
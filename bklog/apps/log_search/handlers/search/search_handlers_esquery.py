@@ -800,11 +800,12 @@ class SearchHandler(object):
 
         return search_result
 
-    def pre_get_result(self, sorted_fields: list, size: int):
+    def pre_get_result(self, sorted_fields: list, size: int, scroll_slice: dict = None):
         """
         pre_get_result
         @param sorted_fields:
         @param size:
+        @param scroll_slice: 切片scroll参数, 仅ES场景生效 {"id": 0, "max": 2}
         @return:
         """
         if self.scenario_id == Scenario.ES:
@@ -830,6 +831,7 @@ class SearchHandler(object):
                     "time_field_unit": self.time_field_unit,
                     "scroll": SCROLL,
                     "collapse": self.collapse,
+                    "slice": scroll_slice or {},
                 },
                 data_api_retry_cls=DataApiRetryClass.create_retry_obj(
                     exceptions=[BaseException],
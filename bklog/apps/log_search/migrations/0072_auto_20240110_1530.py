@@ -0,0 +1,22 @@
+# Generated by Django 3.2.15 on 2024-01-10 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('log_search', '0071_merge_20231124_1958'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asynctask',
+            name='export_count',
+            field=models.IntegerField(default=0, verbose_name='已导出条数'),
+        ),
+        migrations.AddField(
+            model_name='asynctask',
+            name='export_rate',
+            field=models.FloatField(blank=True, null=True, verbose_name='导出速率(条/秒)'),
+        ),
+    ]
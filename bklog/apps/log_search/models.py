@@ -1053,6 +1053,8 @@ class AsyncTask(OperateRecordModel):
     index_set_type = models.CharField(
         _("索引集类型"), max_length=32, choices=IndexSetType.get_choices(), default=IndexSetType.SINGLE.value
     )
+    export_count = models.IntegerField(_("已导出条数"), default=0)
+    export_rate = models.FloatField(_("导出速率(条/秒)"), null=True, blank=True)
 
     class Meta:
         db_table = "export_task"
@@ -22,7 +22,11 @@ the project delivered to anyone in the future.
 import datetime
 import json
 import os
+import queue
 import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import arrow
 import pytz
@@ -42,9 +46,11 @@ from apps.log_search.constants import (
     ASYNC_EXPORT_EMAIL_TEMPLATE,
     ASYNC_EXPORT_EXPIRED,
     ASYNC_EXPORT_FILE_EXPIRED_DAYS,
+    ASYNC_EXPORT_SLICE_QUEUE_SIZE,
     FEATURE_ASYNC_EXPORT_COMMON,
     FEATURE_ASYNC_EXPORT_EXTERNAL,
     FEATURE_ASYNC_EXPORT_NOTIFY_TYPE,
+    FEATURE_ASYNC_EXPORT_SLICE_COUNT,
     FEATURE_ASYNC_EXPORT_STORAGE_TYPE,
     MAX_RESULT_WINDOW,
     ExportStatus,
@@ -56,6 +62,7 @@ from apps.log_search.models import AsyncTask, LogIndexSet, Scenario
 from apps.utils.log import logger
 from apps.utils.notify import NotifyType
 from apps.utils.remote_storage import StorageType
+from apps.utils.thread import FuncThread
 
 
 @task(ignore_result=True, queue="async_export")
@@ -100,7 +107,7 @@ def async_export(
 
         async_task.export_status = ExportStatus.DOWNLOAD_LOG
         try:
-            async_export_util.export_package()
+            async_export_util.export_package(async_task=async_task)
         except Exception as e:  # pylint: disable=broad-except
             async_task = set_failed_status(async_task=async_task, reason=f"export package error: {e}")
             raise
@@ -239,30 +246,111 @@ class AsyncExportUtils(object):
         self.storage = self.init_remote_storage()
         self.notify = self.init_notify_type()
 
-    def export_package(self):
+    def export_package(self, async_task: AsyncTask = None):
         """
         检索结果文件打包
+        @param async_task: 导出任务, 用于记录导出进度
         """
         if not (os.path.exists(ASYNC_DIR) and os.path.isdir(ASYNC_DIR)):
             os.makedirs(ASYNC_DIR)
 
-        result = self.search_handler.pre_get_result(sorted_fields=self.sorted_fields, size=MAX_RESULT_WINDOW)
+        slice_count = self.get_slice_count()
+        max_count = None
+        if self.search_handler.scenario_id == Scenario.ES and slice_count > 1:
+            pages = self.iter_slice_pages(slice_count)
+            # 各切片独立滚动, 由写入方统一控制导出总量
+            max_count = self.search_handler.size
+        else:
+            pages = self.iter_pages()
+
+        with open(self.file_path, "a+", encoding="utf-8") as f:
+            self.write_file(f, pages, async_task=async_task, max_count=max_count)
+
+        with tarfile.open(self.tar_file_path, "w:gz") as tar:
+            tar.add(self.file_path, arcname=self.file_name)
+
+    @staticmethod
+    def check_shards(result: dict):
         # 判断是否成功
         if result["_shards"]["total"] != result["_shards"]["successful"]:
             logger.error("can not create async_export task, reason: {}".format(result["_shards"]["failures"]))
             raise PreCheckAsyncExportException()
-        with open(self.file_path, "a+", encoding="utf-8") as f:
-            result_list = self.search_handler._deal_query_result(result_dict=result).get("origin_log_list")
-            for item in result_list:
-                f.write("%s\n" % json.dumps(item, ensure_ascii=False))
-            if self.search_handler.scenario_id == Scenario.ES:
-                generate_result = self.search_handler.scroll_result(result)
-            else:
-                generate_result = self.search_handler.search_after_result(result, self.sorted_fields)
-            self.write_file(f, generate_result)
 
-        with tarfile.open(self.tar_file_path, "w:gz") as tar:
-            tar.add(self.file_path, arcname=self.file_name)
+    def iter_pages(self):
+        """
+        顺序拉取检索结果, 逐页返回
+        """
+        result = self.search_handler.pre_get_result(sorted_fields=self.sorted_fields, size=MAX_RESULT_WINDOW)
+        self.check_shards(result)
+        yield self.search_handler._deal_query_result(result_dict=result)
+        if self.search_handler.scenario_id == Scenario.ES:
+            yield from self.search_handler.scroll_result(result)
+        else:
+            yield from self.search_handler.search_after_result(result, self.sorted_fields)
+
+    def iter_slice_pages(self, slice_count: int):
+        """
+        切片scroll并发拉取检索结果, 逐页返回
+        各切片读取的结果页通过有界队列交给写入方, 内存占用与切片数相关, 不随导出总量增长
+        """
+        pages = queue.Queue(maxsize=slice_count * ASYNC_EXPORT_SLICE_QUEUE_SIZE)
+        stop_event = threading.Event()
+        # 切片读取结束标记
+        finished = object()
+
+        def _put(item):
+            while not stop_event.is_set():
+                try:
+                    pages.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _read_slice(slice_id):
+            try:
+                result = self.search_handler.pre_get_result(
+                    sorted_fields=self.sorted_fields,
+                    size=MAX_RESULT_WINDOW,
+                    scroll_slice={"id": slice_id, "max": slice_count},
+                )
+                self.check_shards(result)
+                if not _put(self.search_handler._deal_query_result(result_dict=result)):
+                    return
+                for page in self.search_handler.scroll_result(result):
+                    if not _put(page):
+                        return
+            except Exception as e:  # pylint: disable=broad-except
+                _put(e)
+            finally:
+                _put(finished)
+
+        executor = ThreadPoolExecutor(max_workers=slice_count)
+        for slice_id in range(slice_count):
+            task = FuncThread(
+                func=_read_slice,
+                params={"slice_id": slice_id},
+                result_key=slice_id,
+                results={},
+                use_request=False,
+                multi_func_params=True,
+            )
+            executor.submit(task.run)
+
+        try:
+            finished_count = 0
+            while finished_count < slice_count:
+                page = pages.get()
+                if page is finished:
+                    finished_count += 1
+                    continue
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+        finally:
+            # 写入方提前结束(达到导出上限或异常)时通知读取线程退出
+            stop_event.set()
+            executor.shutdown(wait=False)
 
     def export_upload(self):
         """
@@ -365,11 +453,39 @@ class AsyncExportUtils(object):
         return NotifyType.get_instance(notify_type=notify_type)()
 
     @classmethod
-    def write_file(cls, f, result):
+    def get_slice_count(cls):
+        slice_count = FeatureToggleObject.toggle(FEATURE_ASYNC_EXPORT_COMMON).feature_config.get(
+            FEATURE_ASYNC_EXPORT_SLICE_COUNT
+        )
+        return int(slice_count) if slice_count else 1
+
+    @classmethod
+    def write_file(cls, f, result, async_task: AsyncTask = None, max_count: int = None):
         """
-        将对应数据写到文件中
+        将对应数据逐页写到文件中(每行一条json), 并在每页写入后记录导出进度
         """
+        start_time = time.time()
+        export_count = 0
         for res in result:
             origin_result_list = res.get("origin_log_list")
-            for item in origin_result_list:
-                f.write("%s\n" % json.dumps(item))
+            if max_count:
+                origin_result_list = origin_result_list[: max_count - export_count]
+            f.write("".join("%s\n" % json.dumps(item, ensure_ascii=False) for item in origin_result_list))
+            export_count += len(origin_result_list)
+
+            if async_task:
+                cls.update_progress(async_task, export_count, time.time() - start_time)
+
+            if max_count and export_count >= max_count:
+                break
+
+    @classmethod
+    def update_progress(cls, async_task: AsyncTask, export_count: int, duration: float):
+        """
+        记录导出进度及速率
+        """
+        async_task.export_count = export_count
+        async_task.export_rate = round(export_count / duration, 2) if duration > 0 else None
+        AsyncTask.objects.filter(id=async_task.id).update(
+            export_count=async_task.export_count, export_rate=async_task.export_rate
+        )
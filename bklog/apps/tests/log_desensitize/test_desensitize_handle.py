@@ -19,6 +19,8 @@ SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 We undertake not to change the open source license (MIT license) applicable to the current version of
 the project delivered to anyone in the future.
 """
+import re
+
 from django.test import TestCase
 
 from apps.log_desensitize.constants import DesensitizeOperator
@@ -59,3 +61,51 @@ class TestDesensitizeOperator(TestCase):
 
         self.assertEqual(result.get("test_field_1"), "132*****678")
         self.assertEqual(result.get("test_field_2"), "abc3434defg")
+
+    def test_transform_overlap(self):
+        param_1 = {
+            "field_name": "test_field",
+            "rule_id": 0,
+            "operator": DesensitizeOperator.TEXT_REPLACE.value,
+            "params": {
+                "template_string": "phone",
+            },
+            "match_pattern": r"1\d{10}",
+            "sort_index": 0,
+        }
+        param_2 = {
+            "field_name": "test_field",
+            "rule_id": 0,
+            "operator": DesensitizeOperator.TEXT_REPLACE.value,
+            "params": {
+                "template_string": "num${num}",
+            },
+            "match_pattern": r"(?P<num>\d{3})",
+            "sort_index": 1,
+        }
+
+        handler = DesensitizeHandler(desensitize_config_info=[param_1, param_2])
+        self.assertIsNotNone(handler.field_prefilter_mapping["test_field"])
+
+        text = {"test_field": "tel 13234345678 code 456"}
+        result = handler.transform_dict(text)
+        # 优先级高的规则命中后 与其重叠的低优先级匹配结果被剔除
+        self.assertEqual(result.get("test_field"), "tel phone code num456")
+
+        text = {"test_field": "no sensitive data"}
+        result = handler.transform_dict(text)
+        self.assertEqual(result.get("test_field"), "no sensitive data")
+
+    def test_compile_prefilter(self):
+        rules = [
+            {"__regex__": re.compile(r"(?P<num>\d{3})")},
+            {"__regex__": re.compile(r"(?P<num>\d{4})")},
+        ]
+        prefilter = DesensitizeHandler.compile_prefilter(rules)
+        self.assertTrue(prefilter.search("abc1234"))
+        self.assertFalse(prefilter.search("abc12"))
+
+        # 包含反向引用或未指定正则的规则不做合并
+        self.assertIsNone(DesensitizeHandler.compile_prefilter(rules + [{"__regex__": re.compile(r"(a)\1")}]))
+        self.assertIsNone(DesensitizeHandler.compile_prefilter(rules + [{"__regex__": None}]))
+        self.assertIsNone(DesensitizeHandler.compile_prefilter(rules[:1]))
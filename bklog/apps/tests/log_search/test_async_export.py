@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making BK-LOG 蓝鲸日志平台 available.
+Copyright (C) 2021 THL A29 Limited, a Tencent company.  All rights reserved.
+BK-LOG 蓝鲸日志平台 is licensed under the MIT License.
+License for BK-LOG 蓝鲸日志平台:
+--------------------------------------------------------------------
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in all copies or substantial
+portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT
+LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN
+NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+We undertake not to change the open source license (MIT license) applicable to the current version of
+the project delivered to anyone in the future.
+"""
+import io
+import json
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+
+from apps.log_search.models import AsyncTask, Scenario
+from apps.log_search.tasks.async_export import AsyncExportUtils
+
+SLICE_COUNT = 3
+
+
+def _page(*items):
+    return {"origin_log_list": list(items)}
+
+
+def _export_utils(search_handler):
+    export_utils = AsyncExportUtils.__new__(AsyncExportUtils)
+    export_utils.search_handler = search_handler
+    export_utils.sorted_fields = []
+    return export_utils
+
+
+def _slice_search_handler(fail_slice_id=None):
+    """
+    每个切片返回 首页 + 2个滚动页
+    """
+    search_handler = MagicMock()
+    search_handler.scenario_id = Scenario.ES
+
+    def pre_get_result(sorted_fields, size, scroll_slice=None):
+        return {"_shards": {"total": 1, "successful": 1}, "slice_id": scroll_slice["id"]}
+
+    def scroll_result(result):
+        slice_id = result["slice_id"]
+        yield _page({"slice": slice_id, "page": 1})
+        if slice_id == fail_slice_id:
+            raise ValueError("scroll failed")
+        yield _page({"slice": slice_id, "page": 2})
+
+    search_handler.pre_get_result.side_effect = pre_get_result
+    search_handler._deal_query_result.side_effect = lambda result_dict: _page(
+        {"slice": result_dict["slice_id"], "page": 0}
+    )
+    search_handler.scroll_result.side_effect = scroll_result
+    return search_handler
+
+
+class TestAsyncExport(TestCase):
+    def setUp(self) -> None:
+        self.async_task = AsyncTask.objects.create(request_param={}, scenario_id=Scenario.ES, index_set_id=1)
+
+    def test_write_file(self):
+        pages = iter([_page({"log": "日志1"}, {"log": "log2"}), _page({"log": "log3"})])
+        f = io.StringIO()
+
+        AsyncExportUtils.write_file(f, pages, async_task=self.async_task)
+
+        # 每行一条json, 中文不转义
+        self.assertEqual(f.getvalue(), '{"log": "日志1"}\n{"log": "log2"}\n{"log": "log3"}\n')
+        async_task = AsyncTask.objects.get(id=self.async_task.id)
+        self.assertEqual(async_task.export_count, 3)
+        self.assertEqual(self.async_task.export_count, 3)
+
+    def test_write_file_with_max_count(self):
+        pages = iter([_page({"log": 1}, {"log": 2}), _page({"log": 3}, {"log": 4}), _page({"log": 5})])
+        f = io.StringIO()
+
+        AsyncExportUtils.write_file(f, pages, async_task=self.async_task, max_count=3)
+
+        # 达到导出上限后截断当前页, 且不再拉取后续页
+        self.assertEqual([json.loads(line)["log"] for line in f.getvalue().splitlines()], [1, 2, 3])
+        self.assertEqual(list(pages), [_page({"log": 5})])
+        self.assertEqual(AsyncTask.objects.get(id=self.async_task.id).export_count, 3)
+
+    def test_update_progress(self):
+        AsyncExportUtils.update_progress(self.async_task, 100, 4)
+        async_task = AsyncTask.objects.get(id=self.async_task.id)
+        self.assertEqual(async_task.export_count, 100)
+        self.assertEqual(async_task.export_rate, 25)
+
+        AsyncExportUtils.update_progress(self.async_task, 0, 0)
+        async_task = AsyncTask.objects.get(id=self.async_task.id)
+        self.assertEqual(async_task.export_count, 0)
+        self.assertIsNone(async_task.export_rate)
+
+    def test_iter_slice_pages(self):
+        search_handler = _slice_search_handler()
+        pages = list(_export_utils(search_handler).iter_slice_pages(SLICE_COUNT))
+
+        self.assertEqual(
+            sorted((page["origin_log_list"][0]["slice"], page["origin_log_list"][0]["page"]) for page in pages),
+            [(slice_id, page) for slice_id in range(SLICE_COUNT) for page in range(3)],
+        )
+        self.assertEqual(
+            sorted(call[1]["scroll_slice"]["id"] for call in search_handler.pre_get_result.call_args_list),
+            list(range(SLICE_COUNT)),
+        )
+        for call in search_handler.pre_get_result.call_args_list:
+            self.assertEqual(call[1]["scroll_slice"]["max"], SLICE_COUNT)
+
+    def test_iter_slice_pages_failed(self):
+        search_handler = _slice_search_handler(fail_slice_id=1)
+        with self.assertRaises(ValueError):
+            list(_export_utils(search_handler).iter_slice_pages(SLICE_COUNT))
+
+    def test_export_package_by_slice(self):
+        search_handler = _slice_search_handler()
+        search_handler.size = 5
+        export_utils = _export_utils(search_handler)
+
+        with tempfile.TemporaryDirectory() as async_dir:
+            export_utils.file_name = "export"
+            export_utils.file_path = os.path.join(async_dir, "export")
+            export_utils.tar_file_path = os.path.join(async_dir, "export.tar.gz")
+            with patch("apps.log_search.tasks.async_export.ASYNC_DIR", async_dir), patch.object(
+                AsyncExportUtils, "get_slice_count", return_value=SLICE_COUNT
+            ):
+                export_utils.export_package(async_task=self.async_task)
+
+            with open(export_utils.file_path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            self.assertTrue(os.path.isfile(export_utils.tar_file_path))
+
+        # 切片并发导出时由写入方控制导出总量
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(AsyncTask.objects.get(id=self.async_task.id).export_count, 5)
+        search_handler.search_after_result.assert_not_called()
@@ -20,6 +20,7 @@ from MySQLdb import DatabaseError as MysqlDatabaseError
 from redis.exceptions import RedisError
 
 from alarm_backends.constants import DEFAULT_DEDUPE_FIELDS, NO_DATA_TAG_DIMENSION
+from alarm_backends.core.alert import snapshot
 from alarm_backends.core.alert.event import Event
 from alarm_backends.core.cache.key import (
     ALERT_BUILD_QOS_COUNTER,
@@ -90,6 +91,9 @@ class Alert:
         # 最新事件
         self.last_event = None
 
+        # 从快照加载时的内容摘要，用于判断快照是否需要重新写入
+        self._snapshot_digest = None
+
     def update(self, event: Event):
         """
         根据给出的事件更新告警内容
@@ -749,11 +753,20 @@ class Alert:
             return
 
         try:
-            alert_data = json.loads(alert_json)
-            return cls(alert_data)
+            return cls.from_snapshot(alert_json)
         except Exception as e:
             logger.warning("load alert failed: %s, origin data: %s", e, alert_json)
 
+    @classmethod
+    def from_snapshot(cls, alert_json: str) -> "Alert":
+        """
+        解析告警快照，兼容压缩格式
+        """
+        alert_data, digest = snapshot.loads(alert_json)
+        alert = cls(alert_data)
+        alert._snapshot_digest = digest
+        return alert
+
     @classmethod
     def get_from_es(cls, alert_id: int) -> "Alert":
         alert_doc = AlertDocument.get(alert_id)
@@ -792,8 +805,7 @@ class Alert:
                 alert_ids_not_found.append(alert_keys[index].alert_id)
                 continue
             try:
-                alert_data = json.loads(alert_json)
-                results.append(cls(alert_data))
+                results.append(cls.from_snapshot(alert_json))
             except Exception as e:
                 logger.warning("load alert failed: %s, origin data: %s", e, alert_json)
                 alert_ids_not_found.append(alert_keys[index].alert_id)
@@ -808,8 +820,7 @@ class Alert:
         """
         保存到redis快照
         """
-        key = ALERT_SNAPSHOT_KEY.get_key(strategy_id=self.strategy_id or 0, alert_id=self.id)
-        ALERT_SNAPSHOT_KEY.client.set(key, json.dumps(self.to_dict()), ALERT_SNAPSHOT_KEY.ttl)
+        AlertCache.save_alert_snapshot([self])
 
     @property
     def key(self) -> AlertKey:
@@ -1022,13 +1033,14 @@ class AlertCache:
         if not alerts:
             return 0
 
-        pipeline = ALERT_SNAPSHOT_KEY.client.pipeline(transaction=False)
-        snapshot_count = 0
+        writer = snapshot.AlertSnapshotWriter()
+        digests = []
         for alert in alerts:
             # 已经结束的告警保存快照备用
             key = ALERT_SNAPSHOT_KEY.get_key(strategy_id=alert.strategy_id or 0, alert_id=alert.id)
-            pipeline.set(key, json.dumps(alert.to_dict()), ALERT_SNAPSHOT_KEY.ttl)
-            snapshot_count += 1
+            digests.append(writer.add(key, alert.to_dict(), alert._snapshot_digest))
 
-        pipeline.execute()
-        return snapshot_count
+        written_count, refreshed_count = writer.flush()
+        for alert, digest in zip(alerts, digests):
+            alert._snapshot_digest = digest
+        return written_count + refreshed_count
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+告警快照存储
+
+快照内容为以下两种格式之一:
+1. 旧格式: 告警内容的 json 字符串
+2. 压缩格式(v1): "ZS1|" + base64(zlib(紧凑 json))，告警内容中包含策略快照等大字段，压缩后体积显著降低
+
+读取端同时兼容两种格式，滚动升级时先升级所有读取端，再通过 ALERT_SNAPSHOT_COMPRESS 开启压缩写入
+
+告警读取快照时记录内容摘要，写入时若内容未发生变化，仅刷新过期时间，不再重复写入
+"""
+
+import base64
+import hashlib
+import json
+import zlib
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+from alarm_backends.core.cache.key import ALERT_SNAPSHOT_KEY
+
+COMPRESSED_PREFIX_V1 = "ZS1|"
+# 内容小于该长度时不压缩
+COMPRESS_MIN_SIZE = 512
+# json 文本重复度高，较低的压缩级别已有足够的压缩率，优先降低 CPU 开销
+COMPRESS_LEVEL = 1
+
+
+def dumps(data: Dict) -> str:
+    return json.dumps(data, separators=(",", ":"))
+
+
+def get_digest(content: str) -> str:
+    return hashlib.md5(content.encode("utf-8")).hexdigest()
+
+
+def encode(content: str, compress: bool = None) -> str:
+    """
+    将快照内容编码为缓存值
+    :param content: 告警内容 json
+    :param compress: 是否压缩，默认读取配置
+    """
+    if compress is None:
+        compress = settings.ALERT_SNAPSHOT_COMPRESS
+    if not compress or len(content) < COMPRESS_MIN_SIZE:
+        return content
+    compressed = zlib.compress(content.encode("utf-8"), COMPRESS_LEVEL)
+    return COMPRESSED_PREFIX_V1 + base64.b64encode(compressed).decode("ascii")
+
+
+def decode(value: str) -> str:
+    """
+    将缓存值解码为告警内容 json，兼容旧格式
+    """
+    if value.startswith(COMPRESSED_PREFIX_V1):
+        return zlib.decompress(base64.b64decode(value[len(COMPRESSED_PREFIX_V1) :])).decode("utf-8")
+    return value
+
+
+def loads(value: str) -> Tuple[Dict, str]:
+    """
+    解析快照
+    :return: 告警内容, 内容摘要
+    """
+    content = decode(value)
+    return json.loads(content), get_digest(content)
+
+
+class AlertSnapshotWriter:
+    """
+    告警快照批量写入，同一批次的快照合并为一次 pipeline 请求
+    """
+
+    def __init__(self):
+        # 快照key -> (告警内容 json, 内容摘要, 已存在快照的内容摘要)
+        self.snapshots = {}
+
+    def add(self, key: str, data: Dict, previous_digest: Optional[str] = None) -> str:
+        """
+        添加待写入的快照，同一个 key 仅保留最后一次写入
+        :param key: 快照key
+        :param data: 告警内容
+        :param previous_digest: 读取快照时记录的内容摘要
+        :return: 写入内容的摘要
+        """
+        content = dumps(data)
+        digest = get_digest(content)
+        self.snapshots[key] = (content, digest, previous_digest)
+        return digest
+
+    def flush(self) -> Tuple[int, int]:
+        """
+        写入快照，内容未变化的快照仅刷新过期时间
+        :return: 写入数量, 仅刷新过期时间的数量
+        """
+        if not self.snapshots:
+            return 0, 0
+
+        client = ALERT_SNAPSHOT_KEY.client
+        ttl = ALERT_SNAPSHOT_KEY.ttl
+
+        pipeline = client.pipeline(transaction=False)
+        refresh_flags = []
+        for key, (content, digest, previous_digest) in self.snapshots.items():
+            is_refresh = digest == previous_digest
+            if is_refresh:
+                pipeline.expire(key, ttl)
+            else:
+                pipeline.set(key, encode(content), ttl)
+            refresh_flags.append(is_refresh)
+        results = pipeline.execute()
+
+        # expire 返回 False 表示快照已过期或被删除，需要重新写入
+        expired_keys = [
+            key
+            for key, is_refresh, result in zip(self.snapshots.keys(), refresh_flags, results)
+            if is_refresh and not result
+        ]
+        if expired_keys:
+            pipeline = client.pipeline(transaction=False)
+            for key in expired_keys:
+                pipeline.set(key, encode(self.snapshots[key][0]), ttl)
+            pipeline.execute()
+
+        refreshed_count = sum(refresh_flags) - len(expired_keys)
+        self.snapshots = {}
+        return len(refresh_flags) - refreshed_count, refreshed_count
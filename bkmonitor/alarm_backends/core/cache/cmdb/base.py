@@ -11,18 +11,145 @@ specific language governing permissions and limitations under the License.
 
 
 import abc
+import copy
+import hashlib
 import json
+import logging
+import os
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import six.moves.cPickle as pickle
-from django.core.cache import caches
+from django.conf import settings
+from django.utils.functional import cached_property
 
 from alarm_backends.constants import CONST_ONE_DAY
 from alarm_backends.core.cache.base import CacheManager
+from bkmonitor.utils.common_utils import chunks
 from core.drf_resource import api
 from core.prometheus import metrics
 
-mem_cache = caches["locmem"]
+logger = logging.getLogger("cache")
+
+# 缓存版本号(hash, field 为各类缓存的 CACHE_KEY)
+CMDB_CACHE_VERSION_KEY = CacheManager.CACHE_KEY_PREFIX + ".cmdb.version"
+# 缓存版本变更通知频道，消息内容为发生变更的 CACHE_KEY
+CMDB_CACHE_VERSION_CHANNEL = CacheManager.CACHE_KEY_PREFIX + ".cmdb.version.channel"
+
+# i18n 的业务ID为全局变量，并发刷新时切换业务需要加锁(语言和时区的激活是线程隔离的)
+I18N_LOCK = threading.Lock()
+
+
+class LocalObjectCache(object):
+    """
+    CMDB 对象进程内缓存
+    1. 缓存反序列化后的对象，按缓存类型分别做 LRU 淘汰，同一对象在一个刷新周期内只需反序列化一次
+    2. 缓存刷新后版本号递增，并通过 redis 发布订阅通知各进程清理对应类型的缓存(仅后台 worker 进程订阅)
+    3. 无论是否订阅，都按固定间隔比对 redis 中的版本号兜底，避免通知丢失(如 redis 重连期间)后缓存一直不更新
+    4. 不存在的对象不缓存，避免新增对象在版本变更前一直查不到
+    """
+
+    def __init__(self, max_size, check_interval):
+        self.max_size = max_size
+        self.check_interval = check_interval
+        self._data = {}
+        self._versions = {}
+        self._check_times = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._subscriber = None
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, cache_key, key):
+        """
+        :return: (是否命中, 对象)
+        """
+        self._check_version(cache_key)
+        with self._lock:
+            objs = self._data.get(cache_key)
+            if objs is None or key not in objs:
+                return False, None
+            objs.move_to_end(key)
+            obj = objs[key]
+        # 调用方可能会给对象追加属性，返回浅拷贝避免相互影响
+        return True, copy.copy(obj)
+
+    def set(self, cache_key, key, obj):
+        if obj is None:
+            return
+        with self._lock:
+            objs = self._data.setdefault(cache_key, OrderedDict())
+            objs[key] = obj
+            objs.move_to_end(key)
+            while len(objs) > self.max_size:
+                objs.popitem(last=False)
+
+    def invalidate(self, cache_key=None):
+        with self._lock:
+            if cache_key is None:
+                self._data.clear()
+                self._versions.clear()
+            else:
+                self._data.pop(cache_key, None)
+                self._versions.pop(cache_key, None)
+
+    @property
+    def subscribe_enabled(self):
+        # 仅后台 worker 进程启动订阅线程，web 及 api 进程按间隔比对版本号
+        return settings.ROLE == "worker"
+
+    def _ensure_subscriber(self):
+        # fork 后的子进程需要重新订阅，继承自父进程的缓存不再可信
+        if self._pid == os.getpid():
+            if self._subscriber and self._subscriber.is_alive():
+                return True
+            if not self.subscribe_enabled:
+                return False
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._data.clear()
+                self._versions.clear()
+                self._subscriber = None
+
+            if self._subscriber is None and self.subscribe_enabled:
+                self._subscriber = threading.Thread(target=self._subscribe, name="cmdb_cache_subscriber", daemon=True)
+                self._subscriber.start()
+                return True
+        return False
+
+    def _subscribe(self):
+        try:
+            pubsub = CMDBCacheManager.cache.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CMDB_CACHE_VERSION_CHANNEL)
+            for message in pubsub.listen():
+                self.invalidate(message["data"])
+        except Exception as e:  # noqa
+            logger.warning("[LocalObjectCache] subscribe cmdb cache version failed, use polling instead: %s", e)
+
+    def _check_version(self, cache_key):
+        self._ensure_subscriber()
+
+        now = time.time()
+        if now - self._check_times.get(cache_key, 0) < self.check_interval:
+            return
+        self._check_times[cache_key] = now
+
+        version = CMDBCacheManager.cache.hget(CMDB_CACHE_VERSION_KEY, cache_key)
+        if self._versions.get(cache_key) != version:
+            self.invalidate(cache_key)
+            self._versions[cache_key] = version
+
+
+LOCAL_OBJECT_CACHE = LocalObjectCache(
+    max_size=settings.CMDB_LOCAL_CACHE_SIZE, check_interval=settings.CMDB_LOCAL_CACHE_VERSION_CHECK_INTERVAL
+)
 
 
 class CMDBCacheManager(CacheManager):
@@ -74,34 +201,57 @@ class CMDBCacheManager(CacheManager):
             return []
         keys = list(keys)
 
-        objs = cls.cache.hmget(cls.CACHE_KEY, keys)
-        result = []
-        for obj in objs:
-            if obj:
-                result.append(cls.deserialize(obj))
+        if not LOCAL_OBJECT_CACHE.enabled:
+            return [cls.deserialize(obj) if obj else None for obj in cls.cache.hmget(cls.CACHE_KEY, keys)]
+
+        result = [None] * len(keys)
+        missing_indexes = []
+        for index, key in enumerate(keys):
+            hit, obj = LOCAL_OBJECT_CACHE.get(cls.CACHE_KEY, key)
+            if hit:
+                result[index] = obj
             else:
-                result.append(None)
+                missing_indexes.append(index)
+
+        if missing_indexes:
+            objs = cls.cache.hmget(cls.CACHE_KEY, [keys[index] for index in missing_indexes])
+            for index, obj in zip(missing_indexes, objs):
+                obj = cls.deserialize(obj) if obj else None
+                LOCAL_OBJECT_CACHE.set(cls.CACHE_KEY, keys[index], obj)
+                result[index] = copy.copy(obj)
         return result
 
     @classmethod
-    def get(cls, *args, **kwargs):
+    def get_by_key(cls, key, log_missing=False):
         """
-        获取单个对象
+        根据存储的key获取单个对象，优先读取进程内缓存
         """
-        key = cls.key_to_internal_value(*args, **kwargs)
-        local_key = f"{cls.CACHE_KEY}_{key}"
-        if local_key in mem_cache:
-            return mem_cache.get(local_key)
+        hit, obj = LOCAL_OBJECT_CACHE.get(cls.CACHE_KEY, key) if LOCAL_OBJECT_CACHE.enabled else (False, None)
+        if hit:
+            return obj
 
         obj = cls.cache.hget(cls.CACHE_KEY, key)
 
         if not obj:
-            cls.logger.warning("unknown {}: {}".format(cls.__name__.replace("Manager", ""), key))
+            if log_missing:
+                cls.logger.warning("unknown {}: {}".format(cls.__name__.replace("Manager", ""), key))
+            obj = None
         else:
             obj = cls.deserialize(obj)
-        mem_cache.set(local_key, obj)
+
+        if LOCAL_OBJECT_CACHE.enabled:
+            LOCAL_OBJECT_CACHE.set(cls.CACHE_KEY, key, obj)
+            obj = copy.copy(obj)
         return obj
 
+    @classmethod
+    def get(cls, *args, **kwargs):
+        """
+        获取单个对象
+        """
+        key = cls.key_to_internal_value(*args, **kwargs)
+        return cls.get_by_key(key, log_missing=True)
+
     @classmethod
     def multi_get_with_dict(cls, keys):
         """
@@ -146,12 +296,47 @@ class CMDBCacheManager(CacheManager):
         """
         raise NotImplementedError
 
+    @classmethod
+    def publish_version(cls):
+        """
+        缓存数据变更后更新版本号，并通知各进程清理进程内缓存
+        """
+        LOCAL_OBJECT_CACHE.invalidate(cls.CACHE_KEY)
+        try:
+            cls.cache.hincrby(CMDB_CACHE_VERSION_KEY, cls.CACHE_KEY, 1)
+            cls.cache.publish(CMDB_CACHE_VERSION_CHANNEL, cls.CACHE_KEY)
+        except Exception as e:  # noqa
+            cls.logger.exception("publish cache version of {} failed: {}".format(cls.CACHE_KEY, e))
+
     @classmethod
     def clear(cls):
         """
         清理缓存
         """
         cls.cache.delete(cls.CACHE_KEY)
+        cls.publish_version()
+
+
+class BizSnapshot(object):
+    """
+    业务数据快照
+    同一业务下的多个缓存共用一份快照，每个接口只请求一次
+    """
+
+    def __init__(self, bk_biz_id):
+        self.bk_biz_id = bk_biz_id
+
+    @cached_property
+    def hosts(self):
+        return api.cmdb.get_host_by_topo_node(bk_biz_id=self.bk_biz_id)
+
+    @cached_property
+    def topo_tree(self):
+        return api.cmdb.get_topo_tree(bk_biz_id=self.bk_biz_id)
+
+    @cached_property
+    def sets(self):
+        return api.cmdb.get_set(bk_biz_id=self.bk_biz_id)
 
 
 class RefreshByBizMixin(object):
@@ -159,6 +344,14 @@ class RefreshByBizMixin(object):
     def get_biz_cache_key(cls):
         return "{}.biz".format(cls.CACHE_KEY)
 
+    @classmethod
+    def get_digest_key(cls):
+        return "{}.digest".format(cls.CACHE_KEY)
+
+    @classmethod
+    def get_full_refresh_key(cls):
+        return "{}.full_refresh".format(cls.CACHE_KEY)
+
     @classmethod
     @abc.abstractmethod
     def refresh_by_biz(cls, bk_biz_id):
@@ -169,53 +362,119 @@ class RefreshByBizMixin(object):
         """
         raise NotImplementedError
 
+    @classmethod
+    def refresh_by_snapshot(cls, snapshot):
+        """
+        基于业务数据快照获取对象信息，子类可覆盖以复用快照中的数据
+        :param snapshot: 业务数据快照
+        :return: {"cache_key": obj}
+        """
+        return cls.refresh_by_biz(snapshot.bk_biz_id)
+
     @classmethod
     def refresh(cls):
         """
         刷新缓存
         """
-        from alarm_backends.core.i18n import i18n
+        refresh_by_biz_managers([cls])
 
-        cls.logger.info("refresh CMDB data started.")
-
-        start_time = time.time()
-        business_list = api.cmdb.get_business()
-
-        if not business_list:
-            return
+    @classmethod
+    def diff_biz_cache(cls, snapshot, existing_keys, full=False):
+        """
+        获取单个业务的对象，并与缓存中对象的内容摘要比对
+        :param snapshot: 业务数据快照
+        :param existing_keys: 缓存中已存在的对象key
+        :param full: 是否全量写入
+        :return: (对象key列表, 对象内容摘要, 待写入的对象)，获取失败时返回 None
+        """
+        from alarm_backends.core.i18n import i18n
 
-        biz_ids = [business.bk_biz_id for business in business_list]
+        bk_biz_id = snapshot.bk_biz_id
+        biz_start_time = time.time()
+        exc = None
+        result = None
+        try:
+            with I18N_LOCK:
+                i18n.set_biz(bk_biz_id)
+            objs = cls.refresh_by_snapshot(snapshot)
+        except Exception as e:
+            # 如果接口调用异常，则不更新
+            cls.logger.exception("get data by biz fail, bk_biz_id: {}, {}".format(bk_biz_id, e))
+            exc = e
+        else:
+            keys = list(objs.keys())
+            old_digests = [None] * len(keys) if full or not keys else cls.cache.hmget(cls.get_digest_key(), keys)
+
+            digests = {}
+            changes = {}
+            for key, old_digest in zip(keys, old_digests):
+                value = cls.serialize(objs[key])
+                digests[key] = hashlib.md5(str(value).encode("utf-8")).hexdigest()
+                # 内容变化或对象已不在缓存中(被删除或驱逐)时需要写入
+                if old_digest != digests[key] or key not in existing_keys:
+                    changes[key] = value
+            result = (keys, digests, changes)
+        metrics.ALARM_CACHE_TASK_TIME.labels(str(bk_biz_id), cls.type, str(exc)).observe(time.time() - biz_start_time)
+        return result
 
-        new_keys = []
+    @classmethod
+    def write_biz_caches(cls, biz_results):
+        """
+        合并各业务的待写入对象后写入缓存
+        多个业务下存在相同的对象key时，以业务列表中靠后的业务为准，与逐个业务刷新时的结果保持一致
+        :param biz_results: [(bk_biz_id, diff_biz_cache 的返回值)]，按业务列表顺序排列
+        :return: 写入的对象数量
+        """
+        owners = {}
+        for bk_biz_id, result in biz_results:
+            if result is None:
+                continue
+            for key in result[0]:
+                owners[key] = bk_biz_id
+
+        changed_count = 0
+        writes = []
+        biz_keys = []
+        for bk_biz_id, result in biz_results:
+            if result is None:
+                continue
+            keys, digests, changes = result
+
+            biz_changed_count = 0
+            for key, value in changes.items():
+                if owners[key] != bk_biz_id:
+                    continue
+                writes.append((key, value, digests[key]))
+                biz_changed_count += 1
+
+            biz_keys.append((str(bk_biz_id), json.dumps(keys)))
+            metrics.ALARM_CACHE_CHANGED_KEY_COUNT.labels(str(bk_biz_id), cls.type).inc(biz_changed_count)
+            changed_count += biz_changed_count
+
+        # 更新对象缓存，分批执行，避免单个 pipeline 过大
+        for chunk in chunks(writes, 5000):
+            pipeline = cls.cache.pipeline()
+            for key, value, digest in chunk:
+                pipeline.hset(cls.CACHE_KEY, key, value)
+                pipeline.hset(cls.get_digest_key(), key, digest)
+            pipeline.execute()
+
+        # 按业务设置key列表，用于差量更新
+        pipeline = cls.cache.pipeline()
+        for bk_biz_id, keys in biz_keys:
+            pipeline.hset(cls.get_biz_cache_key(), bk_biz_id, keys)
+        pipeline.expire(cls.CACHE_KEY, cls.CACHE_TIMEOUT)
+        pipeline.expire(cls.get_digest_key(), cls.CACHE_TIMEOUT)
+        pipeline.execute()
+        return changed_count
 
+    @classmethod
+    def clean_deleted(cls, biz_ids, updated_count, start_time):
+        """
+        清理已被删除的业务及对象数据
+        """
         biz_cache_key = cls.get_biz_cache_key()
 
-        for bk_biz_id in biz_ids:
-            biz_start_time = time.time()
-            exc = None
-            try:
-                i18n.set_biz(bk_biz_id)
-                objs = cls.refresh_by_biz(bk_biz_id)
-            except Exception as e:
-                # 如果接口调用异常，则不更新
-                cls.logger.exception("get data by biz fail, bk_biz_id: {}, {}".format(bk_biz_id, e))
-                exc = e
-            else:
-                # 更新对象缓存
-                pipeline = cls.cache.pipeline()
-                for key, obj in list(objs.items()):
-                    pipeline.hset(cls.CACHE_KEY, key, cls.serialize(obj))
-                    new_keys.append(key)
-
-                # 按业务设置key列表，用于差量更新
-                pipeline.hset(biz_cache_key, str(bk_biz_id), json.dumps(list(objs.keys())))
-
-                pipeline.expire(cls.CACHE_KEY, cls.CACHE_TIMEOUT)
-                pipeline.execute()
-            metrics.ALARM_CACHE_TASK_TIME.labels(str(bk_biz_id), cls.type, str(exc)).observe(
-                time.time() - biz_start_time
-            )
-
         # 清理已被删除的业务数据
         old_biz_ids = set(cls.cache.hkeys(biz_cache_key))
         new_biz_ids = {str(biz_id) for biz_id in biz_ids}
@@ -243,11 +502,22 @@ class RefreshByBizMixin(object):
             cls.cache.hdel(cls.CACHE_KEY, *deleted_keys)
         cls.cache.expire(cls.CACHE_KEY, cls.CACHE_TIMEOUT)
 
+        # 清理多余的对象内容摘要
+        deleted_digest_keys = set(cls.cache.hkeys(cls.get_digest_key())) - set(new_keys)
+        if deleted_digest_keys:
+            cls.cache.hdel(cls.get_digest_key(), *deleted_digest_keys)
+
         metrics.ALARM_CACHE_TASK_TIME.labels("0", cls.type, "None").observe(time.time() - start_time)
 
+        # 数据无变化时，不需要清理各进程的进程内缓存
+        if updated_count or deleted_keys:
+            cls.publish_version()
+
         cls.logger.info(
-            "cache_key({}) refresh CMDB data finished, amount: updated: {}, removed: {}, "
-            "removed_biz: {}".format(cls.CACHE_KEY, len(new_keys), len(deleted_keys), len(deleted_biz_ids))
+            "cache_key({}) refresh CMDB data finished, amount: total: {}, updated: {}, removed: {}, "
+            "removed_biz: {}".format(
+                cls.CACHE_KEY, len(new_keys), updated_count, len(deleted_keys), len(deleted_biz_ids)
+            )
         )
 
     @classmethod
@@ -255,4 +525,55 @@ class RefreshByBizMixin(object):
         """
         清理缓存
         """
-        cls.cache.delete(cls.CACHE_KEY, cls.get_biz_cache_key())
+        cls.cache.delete(cls.CACHE_KEY, cls.get_biz_cache_key(), cls.get_digest_key(), cls.get_full_refresh_key())
+        cls.publish_version()
+
+
+def refresh_by_biz_managers(managers):
+    """
+    按业务刷新多个缓存
+    1. 同一业务下的各缓存共用一份业务数据快照，避免重复请求 CMDB 接口
+    2. 业务之间并发刷新，并发数由 CMDB_CACHE_REFRESH_CONCURRENCY 控制
+    3. 对比对象的内容摘要，仅写入发生变化或缓存中缺失的对象
+    4. 每隔 CMDB_CACHE_FULL_REFRESH_INTERVAL 全量写入一次，修复缓存中被改动的对象
+    :param managers: RefreshByBizMixin 缓存列表
+    """
+    for manager in managers:
+        manager.logger.info("refresh CMDB data started.")
+
+    start_time = time.time()
+    business_list = api.cmdb.get_business()
+
+    if not business_list:
+        return
+
+    biz_ids = [business.bk_biz_id for business in business_list]
+
+    # 缓存不存在(首次刷新或已过期)或到达全量刷新周期时全量写入
+    full_managers = {
+        manager
+        for manager in managers
+        if not manager.cache.exists(manager.CACHE_KEY) or not manager.cache.exists(manager.get_full_refresh_key())
+    }
+    existing_keys = {manager: set(manager.cache.hkeys(manager.CACHE_KEY)) for manager in managers}
+
+    def refresh_biz(bk_biz_id):
+        snapshot = BizSnapshot(bk_biz_id)
+        return [
+            manager.diff_biz_cache(snapshot, existing_keys[manager], full=manager in full_managers)
+            for manager in managers
+        ]
+
+    concurrency = min(settings.CMDB_CACHE_REFRESH_CONCURRENCY, len(biz_ids))
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(refresh_biz, biz_ids))
+    else:
+        results = [refresh_biz(bk_biz_id) for bk_biz_id in biz_ids]
+
+    for index, manager in enumerate(managers):
+        biz_results = [(bk_biz_id, result[index]) for bk_biz_id, result in zip(biz_ids, results)]
+        updated_count = manager.write_biz_caches(biz_results)
+        manager.clean_deleted(biz_ids, updated_count, start_time)
+        if manager in full_managers and settings.CMDB_CACHE_FULL_REFRESH_INTERVAL > 0:
+            manager.cache.set(manager.get_full_refresh_key(), 1, ex=settings.CMDB_CACHE_FULL_REFRESH_INTERVAL)
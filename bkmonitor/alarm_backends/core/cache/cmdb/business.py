@@ -68,6 +68,8 @@ class BusinessManager(CMDBCacheManager):
         pipeline.expire(cls.CACHE_KEY, cls.CACHE_TIMEOUT)
         pipeline.execute()
 
+        cls.publish_version()
+
         cls.logger.info(
             "refresh CMDB Business data finished, amount: updated: {}, removed: {}".format(
                 len(new_keys), len(deleted_keys)
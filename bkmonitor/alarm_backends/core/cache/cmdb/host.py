@@ -12,10 +12,14 @@ specific language governing permissions and limitations under the License.
 import json
 from typing import List
 
-from alarm_backends.core.cache.cmdb.base import CMDBCacheManager, RefreshByBizMixin
+from alarm_backends.core.cache.cmdb.base import (
+    BizSnapshot,
+    CMDBCacheManager,
+    RefreshByBizMixin,
+    refresh_by_biz_managers,
+)
 from api.cmdb.define import Host, TopoTree
 from bkmonitor.utils.local import local
-from core.drf_resource import api
 
 setattr(local, "host_cache", {})
 
@@ -56,7 +60,11 @@ class HostIDManager(RefreshByBizMixin, CMDBCacheManager):
 
     @classmethod
     def refresh_by_biz(cls, bk_biz_id):
-        hosts: List[Host] = api.cmdb.get_host_by_topo_node(bk_biz_id=bk_biz_id)
+        return cls.refresh_by_snapshot(BizSnapshot(bk_biz_id))
+
+    @classmethod
+    def refresh_by_snapshot(cls, snapshot):
+        hosts: List[Host] = snapshot.hosts
         return {
             cls.key_to_internal_value(host.bk_host_id): "{}|{}".format(
                 host.bk_host_innerip or host.bk_host_innerip_v6, host.bk_cloud_id
@@ -86,7 +94,11 @@ class HostAgentIDManager(RefreshByBizMixin, CMDBCacheManager):
 
     @classmethod
     def refresh_by_biz(cls, bk_biz_id):
-        hosts: List[Host] = api.cmdb.get_host_by_topo_node(bk_biz_id=bk_biz_id)
+        return cls.refresh_by_snapshot(BizSnapshot(bk_biz_id))
+
+    @classmethod
+    def refresh_by_snapshot(cls, snapshot):
+        hosts: List[Host] = snapshot.hosts
         return {cls.key_to_internal_value(host.bk_agent_id): host.bk_host_id for host in hosts if host.bk_agent_id}
 
 
@@ -161,6 +173,8 @@ class HostIPManager(CMDBCacheManager):
 
         cls.cache.expire(cls.CACHE_KEY, cls.CACHE_TIMEOUT)
 
+        cls.publish_version()
+
         cls.logger.info(
             "cache_key({}) refresh CMDB data finished, amount: updated: {}, removed: {}".format(
                 cls.CACHE_KEY, len(ip_mapping), len(deleted_keys)
@@ -216,7 +230,7 @@ class HostManager(RefreshByBizMixin, CMDBCacheManager):
             if host:
                 return host
         # 尝试使用bk_host_id获取主机信息
-        host = cls.cache.hget(cls.CACHE_KEY, bk_host_id)
+        host = cls.get_by_key(bk_host_id)
         if not host:
             # 如果没有获取到主机信息，则尝试使用ip获取主机信息
             host_key = HostIDManager.get(bk_host_id)
@@ -227,8 +241,6 @@ class HostManager(RefreshByBizMixin, CMDBCacheManager):
 
             if not host:
                 return
-        else:
-            host = cls.deserialize(host)
 
         # 本地缓存主机信息
         if using_mem:
@@ -238,9 +250,13 @@ class HostManager(RefreshByBizMixin, CMDBCacheManager):
 
     @classmethod
     def refresh_by_biz(cls, bk_biz_id):
-        hosts = api.cmdb.get_host_by_topo_node(bk_biz_id=bk_biz_id)  # type: list[Host]
-        topo_tree = api.cmdb.get_topo_tree(bk_biz_id=bk_biz_id)  # type: TopoTree
-        biz_sets = api.cmdb.get_set(bk_biz_id=bk_biz_id)
+        return cls.refresh_by_snapshot(BizSnapshot(bk_biz_id))
+
+    @classmethod
+    def refresh_by_snapshot(cls, snapshot):
+        hosts = snapshot.hosts  # type: list[Host]
+        topo_tree = snapshot.topo_tree  # type: TopoTree
+        biz_sets = snapshot.sets
         # 填充拓扑链
         topo_link_dict = topo_tree.convert_to_topo_link()
         for host in hosts:
@@ -262,7 +278,6 @@ class HostManager(RefreshByBizMixin, CMDBCacheManager):
 
 
 def main():
-    HostIDManager.refresh()
-    HostManager.refresh()
+    # 主机相关缓存共用同一份业务数据快照
+    refresh_by_biz_managers([HostIDManager, HostManager, HostAgentIDManager])
     HostIPManager.refresh()
-    HostAgentIDManager.refresh()
@@ -206,6 +206,17 @@ NO_DATA_LIST_KEY = register_key_with_config(
     }
 )
 
+NO_DATA_LAST_SEEN_KEY = register_key_with_config(
+    {
+        "label": "[access]无数据告警各维度最近上报时间",
+        "key_type": "hash",
+        "key_tpl": "access.nodata.last_seen.{strategy_id}.{item_id}",
+        "field_tpl": "{dimensions_md5}",
+        "ttl": 10 * CONST_MINUTES,
+        "backend": "queue",
+    }
+)
+
 HISTORY_DATA_KEY = register_key_with_config(
     {
         "label": "[detect]待检测数据对应历史数据",
@@ -217,6 +228,17 @@ HISTORY_DATA_KEY = register_key_with_config(
     }
 )
 
+HISTORY_SERIES_KEY = register_key_with_config(
+    {
+        "label": "[detect]待检测数据对应历史数据(按时间序列存储)",
+        "key_type": "hash",
+        "key_tpl": "detect.history.series.{strategy_id}.{item_id}",
+        "field_tpl": "{dimensions_md5}",
+        "ttl": 30 * CONST_MINUTES,
+        "backend": "service",
+    }
+)
+
 ANOMALY_LIST_KEY = register_key_with_config(
     {
         "label": "[detect]检测结果详情队列",
@@ -290,6 +312,27 @@ ACCESS_DUPLICATE_KEY = register_key_with_config(
     }
 )
 
+ACCESS_DATA_LOAD_KEY = register_key_with_config(
+    {
+        "label": "[access]业务数据拉取耗时统计",
+        "key_type": "hash",
+        "key_tpl": "access.data.load.{window}",
+        "field_tpl": "{bk_biz_id}",
+        "ttl": 40 * CONST_MINUTES,
+        "backend": "service",
+    }
+)
+
+ACCESS_DATA_LOAD_WINDOW_KEY = register_key_with_config(
+    {
+        "label": "[access]按负载分配业务使用的统计窗口",
+        "key_type": "string",
+        "key_tpl": "access.data.load.window",
+        "ttl": 10 * CONST_MINUTES,
+        "backend": "service",
+    }
+)
+
 ACCESS_PRIORITY_KEY = register_key_with_config(
     {
         "label": "[access]数据拉取优先级",
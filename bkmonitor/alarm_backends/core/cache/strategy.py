@@ -17,7 +17,7 @@ from collections import defaultdict
 from datetime import datetime, timedelta
 from itertools import chain, groupby
 from operator import itemgetter
-from typing import Callable, Dict, Iterable, List, Set, Tuple, Union
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 import arrow
 from django.conf import settings
@@ -559,7 +559,18 @@ class StrategyCacheManager(CacheManager):
         """
         从缓存中获取策略详情
         """
-        strategy = json.loads(cls.cache.get(cls.CACHE_KEY_TEMPLATE.format(strategy_id=strategy_id)) or "null")
+        return cls.parse_strategy(cls.get_raw_strategy_by_id(strategy_id))
+
+    @classmethod
+    def get_raw_strategy_by_id(cls, strategy_id: int) -> Optional[str]:
+        """
+        获取未解析的策略缓存，内容不变时可复用已解析的结果
+        """
+        return cls.cache.get(cls.CACHE_KEY_TEMPLATE.format(strategy_id=strategy_id))
+
+    @classmethod
+    def parse_strategy(cls, data: Optional[str]) -> Dict:
+        strategy = json.loads(data or "null")
         # 兼容旧版策略
         strategy = Strategy.convert_v1_to_v2(strategy)
         return strategy
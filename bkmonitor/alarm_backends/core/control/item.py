@@ -9,9 +9,10 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import copy
 import logging
 from collections import defaultdict
-from typing import List
+from typing import Iterator, List, Union
 
 from django.conf import settings
 from django.db.models.sql import AND, OR
@@ -22,6 +23,7 @@ from bkmonitor.data_source import load_data_source
 from bkmonitor.data_source.unify_query.query import UnifyQuery
 from bkmonitor.strategy.new_strategy import get_metric_id
 from bkmonitor.utils.range import load_condition_instance
+from bkmonitor.utils.range.compiler import compile_all, compile_condition, compile_target_condition
 from bkmonitor.utils.range.target import TargetCondition
 from constants.strategy import AGG_METHOD_REAL_TIME
 
@@ -102,12 +104,36 @@ class Item(DetectMixin, CheckMixin, DoubleCheckMixin):
             functions=self.functions,
         )
 
-    def query_record(self, start_time: int, end_time: int) -> List:
-        records = self.query.query_data(start_time * 1000, end_time * 1000)
+    def query_record(self, start_time: int, end_time: int, iterator: bool = False) -> Union[List, Iterator]:
+        """
+        查询数据记录
+        :param iterator: 是否以生成器形式逐条返回，适用于逐条消费数据的场景
+        """
+        records = self.query.query_data(start_time * 1000, end_time * 1000, iterator=iterator)
+        if iterator:
+            return self._iter_records(records)
+
         for record in records:
             record["_time_"] //= 1000
         return records
 
+    @staticmethod
+    def _iter_records(records: Iterator) -> Iterator:
+        for record in records:
+            record["_time_"] //= 1000
+            yield record
+
+    def clone(self, **query_config_updates) -> "Item":
+        """
+        基于当前配置构建独立的监控项副本
+        策略注册表中的监控项在进程内共享，需要临时修改查询配置时应使用副本，避免影响其他使用方
+        :param query_config_updates: 需要覆盖到每个查询配置上的字段
+        """
+        item_config = copy.deepcopy(self.item_config)
+        for query_config in item_config.get("query_configs") or []:
+            query_config.update(query_config_updates)
+        return Item(item_config, self.strategy)
+
     @cached_property
     def target_condition_obj(self):
         if not self.target or not self.target[0]:
@@ -177,21 +203,32 @@ class Item(DetectMixin, CheckMixin, DoubleCheckMixin):
                     and_cond.append(t)
                 return load_condition_instance([and_cond])
 
-    def is_range_match(self, dimensions):
-        # 1. 匹配监控目标
-        is_match = True
-        target_condition_obj = self.target_condition_obj
-        if target_condition_obj:
-            is_match = target_condition_obj.is_match(dimensions)
-
-        # 2. 匹配监控条件(即where条件)
-        agg_condition_target_obj = self.agg_condition_obj
-        if agg_condition_target_obj:
-            is_match = is_match and agg_condition_target_obj.is_match(dimensions)
+    @cached_property
+    def condition_matcher(self):
+        """
+        监控条件及额外内置条件编译后的匹配函数
+        """
+        return compile_all(
+            [
+                compile_condition(condition_obj) if condition_obj else None
+                for condition_obj in (self.agg_condition_obj, self.extra_agg_condition_obj)
+            ]
+        )
 
-        # 3. 匹配额外的内置监控条件(针对磁盘、网络做的特殊处理)
-        extra_agg_condition_target_obj = self.extra_agg_condition_obj
-        if extra_agg_condition_target_obj:
-            is_match = is_match and extra_agg_condition_target_obj.is_match(dimensions)
+    @cached_property
+    def range_matcher(self):
+        """
+        监控目标、监控条件及额外内置条件编译后的匹配函数
+        """
+        target_condition_obj = self.target_condition_obj
+        return compile_all(
+            [
+                # 1. 匹配监控目标
+                compile_target_condition(target_condition_obj) if target_condition_obj else None,
+                # 2. 匹配监控条件(即where条件)及额外的内置监控条件(针对磁盘、网络做的特殊处理)
+                self.condition_matcher,
+            ]
+        )
 
-        return is_match
+    def is_range_match(self, dimensions):
+        return self.range_matcher(dimensions)
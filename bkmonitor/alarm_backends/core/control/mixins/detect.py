@@ -12,6 +12,7 @@ import logging
 from collections import OrderedDict, defaultdict
 from typing import TYPE_CHECKING, Type
 
+from django.conf import settings
 from django.utils.module_loading import import_string
 from django.utils.translation import ugettext as _
 
@@ -81,46 +82,51 @@ class DetectMixin(object):
             else:
                 # 组合策略
                 anomaly_records = []
-                for data_point in data_points:
-                    ap = None
-                    prefix = suffix = ""
-                    for d in detector_list:
-                        try:
-                            single_ret = d.detect(data_point)
-
-                            # != "or" 兼容connector未配置或配错的情况，默认都使用and
-                            if not single_ret:
+                try:
+                    for data_point in self._filter_candidates(detector_list, data_points, algorithm_connector):
+                        ap = None
+                        prefix = suffix = ""
+                        for d in detector_list:
+                            try:
+                                single_ret = d.detect(data_point)
+
+                                # != "or" 兼容connector未配置或配错的情况，默认都使用and
+                                if not single_ret:
+                                    if algorithm_connector != "or":
+                                        ap = None
+                                        break
+                                    else:
+                                        continue
+
+                                single_ap = d.gen_anomaly_point(data_point, single_ret, level, auto_format=False)
+                                if not prefix:
+                                    prefix, suffix = d.anomaly_message_template_tuple(data_point)
+                                    # print(prefix, suffix)
+                                if ap:
+                                    ap.anomaly_message += _(" 同时 ") + single_ap.anomaly_message
+                                else:
+                                    ap = single_ap
+
+                                # 如果算法为or，则只需要一个算法匹配即可立即退出
+                                if algorithm_connector == "or":
+                                    break
+                            except Exception:
                                 if algorithm_connector != "or":
                                     ap = None
                                     break
-                                else:
-                                    continue
-
-                            single_ap = d.gen_anomaly_point(data_point, single_ret, level, auto_format=False)
-                            if not prefix:
-                                prefix, suffix = d.anomaly_message_template_tuple(data_point)
-                                # print(prefix, suffix)
-                            if ap:
-                                ap.anomaly_message += _(" 同时 ") + single_ap.anomaly_message
-                            else:
-                                ap = single_ap
-
-                            # 如果算法为or，则只需要一个算法匹配即可立即退出
-                            if algorithm_connector == "or":
-                                break
-                        except Exception:
-                            if algorithm_connector != "or":
-                                ap = None
-                                break
-
-                    if ap:
-                        ap.anomaly_message = prefix + ap.anomaly_message + suffix
-                        logger.info(
-                            "[detect] strategy({}) item({}) level[{}] 发现异常点: {}".format(
-                                ap.data_point.item.strategy.id, ap.data_point.item.id, level, ap.__dict__
+
+                        if ap:
+                            ap.anomaly_message = prefix + ap.anomaly_message + suffix
+                            logger.info(
+                                "[detect] strategy({}) item({}) level[{}] 发现异常点: {}".format(
+                                    ap.data_point.item.strategy.id, ap.data_point.item.id, level, ap.__dict__
+                                )
                             )
-                        )
-                        anomaly_records.append(ap)
+                            anomaly_records.append(ap)
+                finally:
+                    # 预筛选上下文仅在本批次内有效，异常退出时同样需要清理
+                    for detector in detector_list:
+                        detector.clear_batch_contexts()
 
             self._update_monitor_d_checkpoint(data_points, anomaly_records, level)
 
@@ -130,6 +136,29 @@ class DetectMixin(object):
 
         return list(detected_result_dict.values())
 
+    @staticmethod
+    def _filter_candidates(detector_list, data_points, algorithm_connector):
+        """
+        组合策略批量预筛选，任一算法不支持批量模式时退化为逐点检测
+        """
+        if not settings.DETECT_BATCH_ENABLED:
+            return data_points
+
+        results = []
+        for detector in detector_list:
+            try:
+                result = detector.batch_filter(data_points)
+            except Exception as e:
+                logger.exception("[detect] batch filter error, fallback to per point detect: %s", e)
+                return data_points
+            if result is None:
+                return data_points
+            results.append(result)
+
+        # != "or" 兼容connector未配置或配错的情况，默认都使用and
+        merge = any if algorithm_connector == "or" else all
+        return [data_point for data_point, *candidates in zip(data_points, *results) if merge(candidates)]
+
     def _update_anomaly_info_with_point(self, anomaly_point, level, info_collection=None):
         info_collection = info_collection or {
             "data": anomaly_point.data_point.as_dict(),
@@ -36,7 +36,10 @@ class CheckMixin(object):
         no_data_config = getattr(self, "no_data_config", {})
         return int(no_data_config.get("level", NO_DATA_LEVEL))
 
-    def check(self, data_points, check_timestamp):
+    def check(self, data_points, check_timestamp, require_new_data=False):
+        """
+        :param require_new_data: 数据点为各维度最近上报时间，上报时间未晚于该维度上次检测记录的上报时间时视为无新数据
+        """
         scenario_cls = import_string("alarm_backends.service.nodata.scenarios.base.SCENARIO_CLS")
         scenario = self.strategy.scenario
         if scenario not in scenario_cls:
@@ -101,7 +104,8 @@ class CheckMixin(object):
                     last_check_cache_key, last_checkpoint_cache_field
                 )
                 if target_dms_md5 not in dimensions_md5_timestamp or (
-                    last_point and dimensions_md5_timestamp[target_dms_md5] < int(last_point)
+                    last_point
+                    and self._is_stale_point(dimensions_md5_timestamp[target_dms_md5], last_point, require_new_data)
                 ):
                     anomaly_data.append(self._produce_anomaly_info(check_timestamp, target_inst_dms, target_dms_md5))
                     logger.warning(
@@ -152,6 +156,15 @@ class CheckMixin(object):
         )
         return anomaly_data
 
+    @staticmethod
+    def _is_stale_point(timestamp, last_point, require_new_data=False):
+        """
+        判断维度上报时间是否早于上次检测记录的上报时间
+        """
+        if require_new_data:
+            return timestamp <= int(last_point)
+        return timestamp < int(last_point)
+
     @staticmethod
     def _process_dimensions(no_data_dimensions, data_points):
         # 上报数据维度
@@ -9,12 +9,17 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import hashlib
 import json
 import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
 
 import arrow
+from django.conf import settings
 from django.utils.functional import cached_property
 from django.utils.translation import ugettext as _
 
@@ -26,6 +31,7 @@ from alarm_backends.core.control.item import Item
 from alarm_backends.core.i18n import i18n
 from bkmonitor.utils import time_tools
 from core.errors.alarm_backends import StrategyItemNotFound
+from core.prometheus import metrics
 
 logger = logging.getLogger("core.control")
 
@@ -34,11 +40,16 @@ class Strategy(object):
     def __init__(self, strategy_id, default_config=None):
         self.id = self.strategy_id = strategy_id
         self._config = default_config
+        self._registry_entry = None
 
     @property
     def config(self) -> dict:
         if self._config is None:
-            self._config = StrategyCacheManager.get_strategy_by_id(self.strategy_id) or {}
+            if settings.STRATEGY_REGISTRY_ENABLED:
+                self._registry_entry = StrategyRegistry.get(self.strategy_id)
+                self._config = self._registry_entry.strategy.config if self._registry_entry else {}
+            else:
+                self._config = StrategyCacheManager.get_strategy_by_id(self.strategy_id) or {}
         return self._config
 
     @property
@@ -107,6 +118,10 @@ class Strategy(object):
 
     @cached_property
     def items(self):
+        # 策略配置未变化时，复用注册表中已构建的监控项
+        if self.config and self._registry_entry and self._registry_entry.strategy is not self:
+            return self._registry_entry.strategy.items
+
         results = []
         item_list = self.config.get("items") or []
         for item_config in item_list:
@@ -202,7 +217,17 @@ class Strategy(object):
         client = key.STRATEGY_SNAPSHOT_KEY.client
         update_time = self.config.get("update_time")
         snapshot_key = key.STRATEGY_SNAPSHOT_KEY.get_key(strategy_id=self.id, update_time=update_time)
-        client.set(snapshot_key, json.dumps(self.config), ex=CONST_ONE_HOUR)
+
+        # 策略配置未变化且快照距离过期时间较长时，不再重复写入
+        entry = self._registry_entry
+        if entry and entry.snapshot_key == snapshot_key and time.time() - entry.snapshot_time < CONST_ONE_HOUR / 2:
+            metrics.STRATEGY_SNAPSHOT_WRITE_COUNT.labels(result="skip").inc()
+        else:
+            client.set(snapshot_key, json.dumps(self.config), ex=CONST_ONE_HOUR)
+            metrics.STRATEGY_SNAPSHOT_WRITE_COUNT.labels(result="write").inc()
+            if entry:
+                entry.snapshot_key, entry.snapshot_time = snapshot_key, time.time()
+
         setattr(self, "snapshot_key", snapshot_key)
         return snapshot_key
 
@@ -300,3 +325,63 @@ class Strategy(object):
         if item == "snapshot_key":
             return self.gen_strategy_snapshot()
         return super(Strategy, self).__getattribute__(item)
+
+
+class StrategyRegistryEntry(object):
+    def __init__(self, strategy_id, digest: str, config: Dict):
+        self.digest = digest
+        # 注册表持有的策略对象，监控项绑定到该对象上，在策略配置变化前一直复用
+        self.strategy = Strategy(strategy_id, default_config=config)
+        self.strategy._registry_entry = self
+        # 最近一次写入的快照key及写入时间
+        self.snapshot_key = None
+        self.snapshot_time = 0
+
+
+class StrategyRegistry(object):
+    """
+    进程内策略注册表
+    按策略缓存内容的摘要判断策略是否变化，未变化时复用已解析的策略配置及已构建的监控项
+    """
+
+    # 策略ID -> StrategyRegistryEntry
+    _entries = OrderedDict()
+    # 同一进程内多个线程共享注册表，读写均需加锁
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, strategy_id) -> Optional[StrategyRegistryEntry]:
+        data = StrategyCacheManager.get_raw_strategy_by_id(strategy_id)
+        if not data:
+            with cls._lock:
+                cls._entries.pop(strategy_id, None)
+            return None
+
+        digest = hashlib.md5(data.encode("utf-8")).hexdigest()
+        with cls._lock:
+            entry = cls._entries.get(strategy_id)
+            if entry and entry.digest == digest:
+                cls._entries.move_to_end(strategy_id)
+                metrics.STRATEGY_REGISTRY_COUNT.labels(result="hit").inc()
+                return entry
+
+        metrics.STRATEGY_REGISTRY_COUNT.labels(result="miss").inc()
+        config = StrategyCacheManager.parse_strategy(data)
+        if not config:
+            with cls._lock:
+                cls._entries.pop(strategy_id, None)
+            return None
+
+        # 解析及构建策略对象耗时较长，不在锁内执行
+        entry = StrategyRegistryEntry(strategy_id, digest, config)
+        with cls._lock:
+            cls._entries[strategy_id] = entry
+            cls._entries.move_to_end(strategy_id)
+            while len(cls._entries) > settings.STRATEGY_REGISTRY_SIZE:
+                cls._entries.popitem(last=False)
+        return entry
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
@@ -8,12 +8,12 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-import json
 from abc import ABCMeta
 
 import six
 
 from alarm_backends.core.cache import key
+from alarm_backends.core.storage import queue_codec
 
 
 class BaseAbnormalPushProcessor(six.with_metaclass(ABCMeta, object)):
@@ -30,8 +30,8 @@ class BaseAbnormalPushProcessor(six.with_metaclass(ABCMeta, object)):
         pipeline = key.ANOMALY_LIST_KEY.client.pipeline(transaction=False)
         for item_id, outputs in six.iteritems(outputs):
             if outputs:
-                outputs_data = [json.dumps(i) for i in outputs]
-                anomaly_count += len(outputs_data)
+                outputs_data = queue_codec.dumps(outputs)
+                anomaly_count += len(outputs)
                 anomaly_signal_list.append("{strategy_id}.{item_id}".format(strategy_id=strategy_id, item_id=item_id))
 
                 anomaly_queue_key = key.ANOMALY_LIST_KEY.get_key(strategy_id=strategy_id, item_id=item_id)
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+ES 批量写入服务
+
+每种文档类型(AlertDocument/AlertLog/EventDocument 等)对应一个写入器:
+1. write: 同步写入，按索引并发请求，仅重试失败的文档，最终失败时与 bulk_create 一致抛出 BulkIndexError
+2. submit: 异步写入，文档放入有界队列后立即返回，由后台线程按数量或时间间隔批量写入
+   队列满时调用方等待，等待超时后先等待队列中的文档写入完成，再由调用方同步写入剩余文档，避免内存无限增长
+3. 后台线程写入失败的可重试文档，在写入后续文档前按轮次继续重试，重试轮数用尽或不可重试时记录失败
+4. celery 任务结束时最多等待一段时间，未写入完成的文档留在队列中由后台线程继续写入
+   worker 子进程退出时等待队列中的文档写入完成，进程被强制 kill 时只会丢失队列中未写入的文档
+
+同一进程内同一文档的写入顺序与提交顺序一致
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from celery.signals import task_postrun, worker_process_shutdown
+from django.conf import settings
+from elasticsearch.helpers import BulkIndexError, streaming_bulk
+
+from bkmonitor.documents.base import BulkActionType
+from core.prometheus import metrics
+
+logger = logging.getLogger("core.storage")
+
+# 可重试的错误状态码，其他错误(如 409 冲突、mapping 不匹配)重试也无法成功
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def is_retryable(error_item: Dict) -> bool:
+    info = list(error_item.values())[0]
+    # 连接异常等情况下整个请求失败
+    return "exception" in info or info.get("status") in RETRY_STATUS_CODES
+
+
+class DocumentBulkWriter:
+    """
+    单个文档类型的批量写入器
+    """
+
+    def __init__(self, document_cls):
+        self.document_cls = document_cls
+        self.name = document_cls.__name__
+        self.batch_size = settings.ES_BULK_WRITER_BATCH_SIZE
+        self.flush_interval = settings.ES_BULK_WRITER_FLUSH_INTERVAL
+        self.queue_size = settings.ES_BULK_WRITER_QUEUE_SIZE
+        self.put_timeout = settings.ES_BULK_WRITER_PUT_TIMEOUT
+        self.concurrency = settings.ES_BULK_WRITER_CONCURRENCY
+        self.max_retries = settings.ES_BULK_WRITER_MAX_RETRIES
+        self.retry_rounds = settings.ES_BULK_WRITER_RETRY_ROUNDS
+        self.task_flush_timeout = settings.ES_BULK_WRITER_TASK_FLUSH_TIMEOUT
+        self.retry_backoff = 1
+        self.max_retry_backoff = 30
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._executor = None
+        self._thread = None
+        self._closed = False
+
+    def _ensure_started(self):
+        """
+        启动后台线程，子进程中需要重新创建(fork 后线程不会被继承)
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+            self._thread = threading.Thread(target=self._run, name=f"bulk-writer-{self.name}", daemon=True)
+            self._closed = False
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _report_queue_size(self):
+        metrics.ES_BULK_WRITER_QUEUE_SIZE.labels(document=self.name).set(self._queue.qsize())
+
+    def write(self, documents, action=BulkActionType.CREATE):
+        """
+        同步写入
+        :raise BulkIndexError: 存在写入失败的文档
+        """
+        self._ensure_started()
+        errors = self.bulk([doc.prepare_action(action) for doc in documents])
+        if errors:
+            metrics.ES_BULK_WRITER_DOCUMENT_COUNT.labels(document=self.name, status="failed").inc(len(errors))
+            raise BulkIndexError("%i document(s) failed to index." % len(errors), errors)
+
+    def submit(self, documents, action=BulkActionType.CREATE) -> int:
+        """
+        异步写入
+        :return: 放入队列的文档数量，其余文档由调用方同步写入
+        """
+        self._ensure_started()
+        overflow = []
+        for doc in documents:
+            bulk_action = doc.prepare_action(action)
+            if overflow:
+                overflow.append(bulk_action)
+                continue
+            try:
+                self._queue.put(bulk_action, timeout=self.put_timeout)
+            except queue.Full:
+                overflow.append(bulk_action)
+        self._report_queue_size()
+
+        if overflow:
+            # 队列已满，说明 ES 写入跟不上，由调用方同步写入进行反压
+            # 先等待已入队的文档写入完成，避免同一文档的旧版本晚于新版本写入
+            logger.warning("[bulk writer] %s queue is full, write %s documents directly", self.name, len(overflow))
+            self.flush()
+            self._write_batch(overflow)
+        return len(documents) - len(overflow)
+
+    def flush(self, timeout=None) -> bool:
+        """
+        等待队列中的文档写入完成
+        :param timeout: 最长等待时间(秒)，为 None 时一直等待
+        :return: 是否全部写入完成
+        """
+        if self._pid != os.getpid():
+            return True
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.1)
+        return not self._queue.unfinished_tasks
+
+    def _run(self):
+        while True:
+            batch = self._get_batch()
+            if batch:
+                try:
+                    self._write_batch(batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+            self._report_queue_size()
+
+    def _write_batch(self, actions: List[Dict]):
+        """
+        写入一批文档，可重试的失败文档按轮次继续重试，全部完成后才返回，保证后续文档的写入顺序
+        """
+        for round_times in range(self.retry_rounds + 1):
+            try:
+                failed = self._bulk(actions)
+            except Exception as e:  # noqa
+                logger.exception("[bulk writer] %s flush error: %s", self.name, e)
+                failed = [(action, {"index": {"_id": action.get("_id"), "exception": str(e)}}) for action in actions]
+
+            # 同一文档在一批中出现多次时，只需重试最后一个版本
+            retry_actions = OrderedDict()
+            errors = []
+            for action, item in failed:
+                if round_times < self.retry_rounds and is_retryable(item):
+                    retry_actions[(action["_index"], action.get("_id"))] = action
+                else:
+                    errors.append(item)
+            self._handle_errors(errors)
+
+            if not retry_actions:
+                return
+            actions = list(retry_actions.values())
+            logger.warning(
+                "[bulk writer] %s retry %s failed documents, round: %s", self.name, len(actions), round_times + 1
+            )
+            time.sleep(min(self.retry_backoff * 2**round_times, self.max_retry_backoff))
+
+    def _get_batch(self) -> List[Dict]:
+        """
+        获取一批待写入的文档，达到批量大小或等待超过刷新间隔时返回
+        """
+        batch = []
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _handle_errors(self, errors):
+        if errors:
+            metrics.ES_BULK_WRITER_DOCUMENT_COUNT.labels(document=self.name, status="failed").inc(len(errors))
+            logger.error("[bulk writer] %s save document error: %s", self.name, errors[:10])
+
+    def bulk(self, actions: List[Dict]) -> List[Dict]:
+        """
+        按索引分组并发写入
+        :return: 写入失败的文档
+        """
+        return [item for _, item in self._bulk(actions)]
+
+    def _bulk(self, actions: List[Dict]) -> List[tuple]:
+        """
+        按索引分组并发写入
+        :return: 写入失败的 (文档, 错误信息) 列表
+        """
+        if not actions:
+            return []
+
+        start_time = time.time()
+        index_actions = OrderedDict()
+        for action in actions:
+            index_actions.setdefault(action["_index"], []).append(action)
+
+        errors = []
+        if len(index_actions) == 1:
+            errors.extend(self._bulk_index(actions))
+        else:
+            for index_errors in self._executor.map(self._bulk_index, index_actions.values()):
+                errors.extend(index_errors)
+
+        metrics.ES_BULK_WRITER_FLUSH_TIME.labels(document=self.name).observe(time.time() - start_time)
+        # 失败数量在最终放弃重试时统计
+        metrics.ES_BULK_WRITER_DOCUMENT_COUNT.labels(document=self.name, status="success").inc(
+            len(actions) - len(errors)
+        )
+        return errors
+
+    def _bulk_index(self, actions: List[Dict]) -> List[tuple]:
+        """
+        写入单个索引，仅重试可重试的失败文档
+        :return: 写入失败的 (文档, 错误信息) 列表
+        """
+        client = self.document_cls._get_connection()
+        errors = []
+        for retry_times in range(self.max_retries + 1):
+            retry_actions = []
+            results = streaming_bulk(
+                client,
+                actions,
+                chunk_size=self.batch_size,
+                raise_on_error=False,
+                raise_on_exception=False,
+                request_timeout=self.document_cls.ES_REQUEST_TIMEOUT,
+            )
+            # 未开启 streaming_bulk 自身的重试时，结果与文档顺序一致
+            for action, (ok, item) in zip(actions, results):
+                if ok:
+                    continue
+                if retry_times < self.max_retries and is_retryable(item):
+                    retry_actions.append(action)
+                else:
+                    errors.append((action, item))
+
+            if not retry_actions:
+                break
+            actions = retry_actions
+            time.sleep(self.retry_backoff * 2 ** retry_times)
+        return errors
+
+    def close(self, timeout=None):
+        """
+        等待队列中的文档写入完成
+        """
+        if self._pid != os.getpid() or self._closed:
+            return
+        self._closed = True
+        self.flush(timeout)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_bulk_writer(document_cls) -> DocumentBulkWriter:
+    """
+    获取文档类型对应的批量写入器
+    """
+    writer = _writers.get(document_cls)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(document_cls)
+            if writer is None:
+                writer = _writers[document_cls] = DocumentBulkWriter(document_cls)
+    return writer
+
+
+@task_postrun.connect
+def flush_all(*args, **kwargs):
+    """
+    celery 任务结束时等待本任务提交的文档写入完成
+    celery worker 子进程达到最大任务数后通过 os._exit 退出，不会执行 atexit，不能依赖退出时写入
+    ES 写入缓慢时最多等待 task_flush_timeout 秒，避免阻塞后续任务，未写入的文档由后台线程继续写入
+    """
+    for writer in list(_writers.values()):
+        try:
+            if not writer.flush(timeout=writer.task_flush_timeout):
+                logger.warning(
+                    "[bulk writer] %s flush timeout, %s documents left in queue",
+                    writer.name,
+                    writer._queue.unfinished_tasks,
+                )
+        except Exception as e:  # noqa
+            logger.exception("[bulk writer] %s flush error: %s", writer.name, e)
+
+
+@worker_process_shutdown.connect
+def pool_process_shutdown_handler(signal=None, sender=None, **kwargs):
+    close_all()
+
+
+@atexit.register
+def close_all():
+    for writer in list(_writers.values()):
+        try:
+            writer.close()
+        except Exception:  # noqa
+            pass
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+access -> detect -> trigger 之间 redis 队列的数据编码
+
+队列中的每个元素为以下两种格式之一:
+1. 旧格式: 单条记录的 json 字符串，如 {"record_id": "xxx", "value": 1, ...}
+2. 打包格式(v1): "PK1|" + json([schemas, rows])
+   - schemas: 记录的结构列表，每个结构为叶子节点的路径列表，如 [["record_id"], ["dimensions", "ip"], ...]
+   - rows: 每条记录为 [schema 下标, 叶子值1, 叶子值2, ...]
+   同一批次内结构相同的记录(如同一个 item 的维度 key)只保存一次 key，显著降低队列内存及序列化开销
+
+读取端同时兼容两种格式，滚动升级时先升级所有读取端，再通过 ALARM_QUEUE_PACKED_ENCODING 开启打包写入
+"""
+
+import json
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+
+PACKED_PREFIX_V1 = "PK1|"
+
+
+def is_packed_enabled() -> bool:
+    return settings.ALARM_QUEUE_PACKED_ENCODING
+
+
+def get_chunk_size() -> int:
+    return max(int(settings.ALARM_QUEUE_PACKED_CHUNK_SIZE), 1)
+
+
+def max_messages(record_limit: int) -> int:
+    """
+    将记录数限制换算为队列元素数限制，打包格式下一个元素包含多条记录
+    """
+    if not is_packed_enabled():
+        return record_limit
+    return max(record_limit // get_chunk_size(), 1)
+
+
+def _flatten(record: Dict, prefix: tuple, paths: list, values: list):
+    for k, v in record.items():
+        # 与 json 序列化保持一致，key 统一转为字符串
+        path = prefix + (str(k),)
+        if isinstance(v, dict) and v:
+            _flatten(v, path, paths, values)
+        else:
+            paths.append(path)
+            values.append(v)
+
+
+def _unflatten(paths: List[List[str]], values: list) -> Dict:
+    record = {}
+    for path, value in zip(paths, values):
+        node = record
+        for k in path[:-1]:
+            node = node.setdefault(k, {})
+        node[path[-1]] = value
+    return record
+
+
+def pack(records: List[Dict]) -> str:
+    """
+    将一批记录打包为单个队列元素
+    """
+    schema_index = {}
+    schemas = []
+    rows = []
+    for record in records:
+        paths, values = [], []
+        _flatten(record, (), paths, values)
+        signature = tuple(paths)
+        index = schema_index.get(signature)
+        if index is None:
+            index = schema_index[signature] = len(schemas)
+            schemas.append(paths)
+        values.insert(0, index)
+        rows.append(values)
+    return PACKED_PREFIX_V1 + json.dumps([schemas, rows], separators=(",", ":"))
+
+
+def unpack(message: str) -> List[Dict]:
+    """
+    解析单个队列元素，兼容旧格式
+    :raise ValueError: 非期望格式的数据
+    """
+    if message.startswith(PACKED_PREFIX_V1):
+        schemas, rows = json.loads(message[len(PACKED_PREFIX_V1) :])
+        return [_unflatten(schemas[row[0]], row[1:]) for row in rows]
+    return [json.loads(message)]
+
+
+def dumps(records: Iterable[Dict], packed: bool = None) -> List[str]:
+    """
+    将记录编码为队列元素列表
+    :param records: 记录列表
+    :param packed: 是否使用打包格式，默认读取配置
+    """
+    if packed is None:
+        packed = is_packed_enabled()
+
+    if not packed:
+        return [json.dumps(record) for record in records]
+
+    records = list(records)
+    chunk_size = get_chunk_size()
+    return [pack(records[offset : offset + chunk_size]) for offset in range(0, len(records), chunk_size)]
+
+
+def loads(messages: Iterable[str]) -> List[Dict]:
+    """
+    解析队列元素列表，非期望格式的元素将抛出 ValueError
+    """
+    records = []
+    for message in messages:
+        records.extend(unpack(message))
+    return records
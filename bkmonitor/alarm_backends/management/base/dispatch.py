@@ -15,6 +15,9 @@ from alarm_backends.management.hashring import HashRing
 
 
 class DefaultDispatchMixin(AbstractDispatchMixin):
+    # 按负载分配时，单次最多偏离哈希环分配的目标数量
+    dispatch_max_moves = None
+
     def dispatch_all_hosts(self, hosts):
         if isinstance(hosts, (list, tuple)):
             hosts = {host: 1 for host in hosts}
@@ -24,9 +27,15 @@ class DefaultDispatchMixin(AbstractDispatchMixin):
         host_targets_dict = {host: list() for host in hosts}
         if targets:
             host_ring = HashRing(hosts)
-            for target in targets:
-                host = host_ring.get_node(target)
-                host_targets_dict[host].append(target)
+            target_loads = self.query_target_loads()
+            if target_loads:
+                host_targets_dict = host_ring.dispatch_with_load(
+                    targets, target_loads, max_moves=self.dispatch_max_moves
+                )
+            else:
+                for target in targets:
+                    host = host_ring.get_node(target)
+                    host_targets_dict[host].append(target)
 
         return targets, host_targets_dict
 
@@ -55,3 +64,9 @@ class DefaultDispatchMixin(AbstractDispatchMixin):
 
     def query_instance_targets(self, host_targets):
         return host_targets
+
+    def query_target_loads(self):
+        """
+        目标负载，key 为目标的字符串形式，为空时按哈希环分配
+        """
+        return None
@@ -19,6 +19,8 @@ from alarm_backends.core.cache.strategy import StrategyCacheManager
 from alarm_backends.core.cluster import filter_bk_biz_ids
 from alarm_backends.management.base.base import ConsulDispatchCommand
 from alarm_backends.management.base.loaders import load_handler_cls
+from alarm_backends.service.access import AccessType
+from alarm_backends.service.access.data.load import get_biz_loads
 from bkmonitor import models
 
 logger = logging.getLogger(__name__)
@@ -111,3 +113,19 @@ class Command(ConsulDispatchCommand):
         data.sort()
 
         return data
+
+    @property
+    def dispatch_max_moves(self):
+        return settings.ACCESS_DATA_DISPATCH_MAX_MOVES
+
+    def query_target_loads(self):
+        """
+        按业务数据拉取耗时分配业务，避免耗时较高的业务集中在同一台机器
+        """
+        if self._ACCESS_TYPE_ != AccessType.Data or not settings.ACCESS_DATA_LOAD_AWARE_DISPATCH:
+            return None
+        try:
+            return get_biz_loads()
+        except Exception:  # noqa
+            logger.exception("get access biz loads failed, dispatch by hash ring")
+            return None
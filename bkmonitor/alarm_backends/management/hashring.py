@@ -10,7 +10,9 @@ specific language governing permissions and limitations under the License.
 """
 
 
+import threading
 from bisect import bisect_left
+from collections import OrderedDict
 from hashlib import md5
 
 import six
@@ -18,29 +20,132 @@ from six.moves import range
 
 
 class HashRing(object):
+    # 节点名 -> 虚拟节点哈希值列表，节点变更时仅需计算新增节点的哈希值
+    _vnode_hashes = {}
+    # (节点及权重, 单节点虚拟节点数) -> (哈希环, 哈希值到节点的映射)，节点不变时直接复用
+    _rings = OrderedDict()
+    MAX_CACHED_NODES = 10000
+    MAX_CACHED_RINGS = 16
+    # 缓存为类属性，多线程同时构建哈希环时需加锁
+    _cache_lock = threading.RLock()
+
     def __init__(self, nodes, num_vnodes=2 ** 16):
         self.nodes = nodes
 
-        self.ring = []
-        self.hash2node = {}
-
         self.num_vnodes = num_vnodes
         sum_weight = sum(nodes.values())
         multiple = max(int(self.num_vnodes // sum_weight), 1)
         self.vnodes = multiple * sum_weight
 
-        for node, weight in six.iteritems(nodes):
-            for i in range(multiple):
-                h = self._hash(str(node) + str(i))
-                self.ring.append(h)
-                self.hash2node[h] = node
+        self.ring, self.hash2node = self._get_ring(multiple)
+
+    def _get_ring(self, multiple):
+        cache_key = (tuple(six.iteritems(self.nodes)), multiple)
+        with self._cache_lock:
+            cached = self._rings.get(cache_key)
+            if cached is not None:
+                self._rings.move_to_end(cache_key)
+                return cached
+
+            ring = []
+            hash2node = {}
+            for node in self.nodes:
+                for h in self._get_vnode_hashes(node, multiple):
+                    ring.append(h)
+                    hash2node[h] = node
+            ring.sort()
 
-        self.ring.sort()
+            self._rings[cache_key] = (ring, hash2node)
+            while len(self._rings) > self.MAX_CACHED_RINGS:
+                self._rings.popitem(last=False)
+        return ring, hash2node
 
-    def _hash(self, key):
+    @classmethod
+    def _get_vnode_hashes(cls, node, multiple):
+        name = str(node)
+        with cls._cache_lock:
+            hashes = cls._vnode_hashes.get(name)
+            if hashes is None:
+                if len(cls._vnode_hashes) >= cls.MAX_CACHED_NODES:
+                    cls._vnode_hashes.clear()
+                hashes = cls._vnode_hashes[name] = []
+            # 虚拟节点数增加时，只计算新增部分
+            for i in range(len(hashes), multiple):
+                hashes.append(cls._hash(name + str(i)))
+            return hashes[:multiple]
+
+    @classmethod
+    def clear_cache(cls):
+        with cls._cache_lock:
+            cls._vnode_hashes.clear()
+            cls._rings.clear()
+
+    @staticmethod
+    def _hash(key):
         return int(md5(str(key).encode("utf-8")).hexdigest(), 16) % (2 ** 32)
 
     def get_node(self, key):
         h = self._hash(key)
         n = bisect_left(self.ring, h) % self.vnodes
         return self.hash2node[self.ring[n]]
+
+    def iter_nodes(self, key):
+        """
+        沿哈希环顺时针依次返回不重复的节点，第一个节点与 get_node 一致
+        """
+        h = self._hash(key)
+        n = bisect_left(self.ring, h) % self.vnodes
+        seen = set()
+        for offset in range(len(self.ring)):
+            node = self.hash2node[self.ring[(n + offset) % len(self.ring)]]
+            if node in seen:
+                continue
+            seen.add(node)
+            yield node
+            if len(seen) == len(self.nodes):
+                return
+
+    def dispatch_with_load(self, targets, loads, balance_factor=1.25, max_moves=None):
+        """
+        带负载上限的一致性哈希分配
+        每个节点的负载上限为 平均负载(按权重) * balance_factor，目标优先分配到 get_node 对应的节点，
+        超出上限时沿哈希环顺时针寻找下一个未超限的节点。负载较高的目标优先分配，相同输入的分配结果一致
+        :param targets: 目标列表
+        :param loads: 目标负载，key 为目标的字符串形式，缺失的目标按已知目标的平均负载计算
+        :param balance_factor: 负载上限系数
+        :param max_moves: 单次分配中最多偏离哈希环分配的目标数量，为 None 时不限制。
+            限制的是相对哈希环分配的偏离量，而不是相对上一次分配结果的迁移量：前后两次分配偏离的目标可能完全不同，
+            两次重平衡之间迁移的目标数量最多可达 2 * max_moves
+        :return: {节点: [目标列表]}，目标保持原有顺序
+        """
+        known_loads = [loads[str(target)] for target in targets if str(target) in loads]
+        default_load = sum(known_loads) / len(known_loads) if known_loads else 1
+        target_loads = {target: loads.get(str(target), default_load) for target in targets}
+
+        total_load = sum(target_loads.values())
+        sum_weight = sum(self.nodes.values())
+        capacities = {
+            node: total_load * weight / sum_weight * balance_factor for node, weight in six.iteritems(self.nodes)
+        }
+        node_loads = {node: 0 for node in self.nodes}
+
+        moves = 0
+        target_nodes = {}
+        for target in sorted(targets, key=lambda t: (-target_loads[t], str(t))):
+            load = target_loads[target]
+            node = self.get_node(target)
+            if max_moves is None or moves < max_moves:
+                for candidate in self.iter_nodes(target):
+                    # 空闲节点总是可以接收，避免单个目标负载超过上限时无法分配
+                    if not node_loads[candidate] or node_loads[candidate] + load <= capacities[candidate]:
+                        if candidate != node:
+                            moves += 1
+                        node = candidate
+                        break
+            target_nodes[target] = node
+            node_loads[node] += load
+
+        node_targets = {node: [] for node in self.nodes}
+        for target in targets:
+            node_targets[target_nodes[target]].append(target)
+        return node_targets
@@ -59,6 +59,13 @@ class Fuller(object):
         """
         pass
 
+    def full_many(self, records):
+        """
+        Supplement dimension information for a batch of records.
+        """
+        for record in records:
+            self.full(record)
+
 
 class Fullerer(object):
     def __init__(self):
@@ -77,6 +84,10 @@ class Fullerer(object):
         for f in self.fullers:
             f.full(record)
 
+    def full_many(self, records):
+        for f in self.fullers:
+            f.full_many(records)
+
 
 ####################################
 #           Base Record            #
@@ -158,11 +169,11 @@ class BaseAccessProcess(Filterer, Fullerer):
         raise NotImplementedError("push must be implemented " "by BaseAccessProcess subclasses")
 
     def handle(self):
+        # 补充维度：比如：业务、集群、模块等信息
+        self.full_many(self.record_list)
+
         record_list = []
         for r in self.record_list:
-            # 补充维度：比如：业务、集群、模块等信息
-            self.full(r)
-
             new_r_list = r.full()
             if not new_r_list:
                 continue
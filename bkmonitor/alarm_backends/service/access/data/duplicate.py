@@ -8,51 +8,168 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
 from alarm_backends.core.cache import key
+from bkmonitor.utils.common_utils import chunks
+
+
+class RecentRecordIdCache:
+    """
+    进程内最近已写入/已确认存在的 record_id 缓存(LRU)，按 record_id 总数限制容量
+    缓存有效期与去重 key 的过期时间一致，命中即可确认重复，无需访问 redis
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.size = 0
+        self._data = OrderedDict()
+        # 数据拉取在多个线程中执行，读写均需加锁
+        self._lock = threading.Lock()
+
+    def contains(self, dup_key, record_id):
+        with self._lock:
+            entry = self._data.get(dup_key)
+            if entry is None:
+                return False
+            expire_at, record_ids = entry
+            if expire_at < time.time():
+                self._remove(dup_key)
+                return False
+            self._data.move_to_end(dup_key)
+            return record_id in record_ids
+
+    def add(self, dup_key, record_ids):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            entry = self._data.get(dup_key)
+            if entry is None:
+                # 以首次写入时间计算过期，保证不晚于 redis 中 key 的过期时间
+                entry = self._data[dup_key] = (time.time() + self.ttl, set())
+            else:
+                self._data.move_to_end(dup_key)
+            cached_ids = entry[1]
+            count = len(cached_ids)
+            cached_ids.update(record_ids)
+            self.size += len(cached_ids) - count
+
+            while self.size > self.max_size and self._data:
+                self._remove(next(iter(self._data)))
+
+    def _remove(self, dup_key):
+        _, record_ids = self._data.pop(dup_key)
+        self.size -= len(record_ids)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+
+RECENT_RECORD_IDS = RecentRecordIdCache(
+    max_size=settings.ACCESS_DUPLICATE_LOCAL_CACHE_SIZE, ttl=key.ACCESS_DUPLICATE_KEY.ttl
+)
 
 
 class Duplicate:
-    def __init__(self, strategy_group_key, strategy_id=None):
+    # 批量模式下单次 pipeline 的最大命令数
+    PIPELINE_CHUNK_SIZE = 10000
+
+    def __init__(self, strategy_group_key, strategy_id=None, batch=None):
         self.strategy_group_key = strategy_group_key
         self.record_ids_cache = {}
         self.pending_to_add = {}
         self.strategy_id = strategy_id
+        # 批量模式：仅校验本批次 record_id 是否存在，不再拉取整个集合
+        self.batch = settings.ACCESS_DUPLICATE_BATCH_ENABLED if batch is None else batch
+        # 批量模式下已确认是否存在的 record_id
+        self.checked_record_ids = {}
 
         self.client = key.ACCESS_DUPLICATE_KEY.client
 
+    def get_dup_key(self, time):
+        dup_key = key.ACCESS_DUPLICATE_KEY.get_key(strategy_group_key=self.strategy_group_key, dt_event_time=time)
+        if self.strategy_id is not None:
+            dup_key.strategy_id = self.strategy_id
+        return dup_key
+
     def get_record_ids(self, time):
         # 保证每个时间点仅调用一次redis， 即使无数据也缓存下来。
-        dup_key = key.ACCESS_DUPLICATE_KEY.get_key(strategy_group_key=self.strategy_group_key, dt_event_time=time)
+        dup_key = self.get_dup_key(time)
         if dup_key not in self.record_ids_cache:
-            if self.strategy_id is not None:
-                dup_key.strategy_id = self.strategy_id
             self.record_ids_cache[dup_key] = self.client.smembers(dup_key)
 
         return self.record_ids_cache[dup_key]
 
+    def prefetch(self, records):
+        """
+        批量确认记录是否已存在，所有时间点合并为一次 pipeline 请求，仅传输本批次的 record_id
+        """
+        pending = {}
+        for record in records:
+            dup_key = self.get_dup_key(record.time)
+            record_id = str(record.record_id)
+            checked_ids = self.checked_record_ids.setdefault(dup_key, set())
+            if record_id in checked_ids:
+                continue
+            checked_ids.add(record_id)
+
+            if RECENT_RECORD_IDS.contains(dup_key, record_id):
+                self.record_ids_cache.setdefault(dup_key, set()).add(record_id)
+                continue
+            pending.setdefault(dup_key, []).append(record_id)
+
+        commands = [(dup_key, record_id) for dup_key, record_ids in pending.items() for record_id in record_ids]
+        for chunked_commands in chunks(commands, self.PIPELINE_CHUNK_SIZE):
+            pipeline = self.client.pipeline(transaction=False)
+            for dup_key, record_id in chunked_commands:
+                pipeline.sismember(dup_key, record_id)
+
+            existed = {}
+            for (dup_key, record_id), is_member in zip(chunked_commands, pipeline.execute()):
+                if is_member:
+                    existed.setdefault(dup_key, set()).add(record_id)
+
+            for dup_key, record_ids in existed.items():
+                self.record_ids_cache.setdefault(dup_key, set()).update(record_ids)
+                RECENT_RECORD_IDS.add(dup_key, record_ids)
+
     def is_duplicate(self, record):
         """
         判断数据是否重复
         采用redis的集合功能。以分钟+维度作为key，值为record_id的集合
         """
-        record_ids = self.get_record_ids(record.time)
-        return str(record.record_id) in record_ids
+        if not self.batch:
+            record_ids = self.get_record_ids(record.time)
+            return str(record.record_id) in record_ids
+
+        dup_key = self.get_dup_key(record.time)
+        record_id = str(record.record_id)
+        if record_id not in self.checked_record_ids.get(dup_key, ()):
+            self.prefetch([record])
+        return record_id in self.record_ids_cache.get(dup_key, ())
 
     def add_record(self, record):
         # 原方案，将需要新增的点和已经存在的点放一起。然后再批量刷进redis。
         # 优化：仅把新增的点，单独列出（后续推到redis）。
         # 同步更新新的record到内存record_ids_cache中（但不再将缓存的所有点全推给redis）
-        dup_key = key.ACCESS_DUPLICATE_KEY.get_key(
-            strategy_group_key=self.strategy_group_key, dt_event_time=record.time
-        )
+        dup_key = self.get_dup_key(record.time)
         self.record_ids_cache.setdefault(dup_key, set()).add(record.record_id)
         self.pending_to_add.setdefault(dup_key, set()).add(record.record_id)
+        if self.batch:
+            self.checked_record_ids.setdefault(dup_key, set()).add(str(record.record_id))
 
     def refresh_cache(self):
         pipeline = self.client.pipeline(transaction=False)
         for dup_key, record_ids in self.pending_to_add.items():
-            if self.strategy_id is not None:
-                dup_key.strategy_id = self.strategy_id
             pipeline.sadd(dup_key, *record_ids)
             pipeline.expire(dup_key, key.ACCESS_DUPLICATE_KEY.ttl)
+            if self.batch:
+                RECENT_RECORD_IDS.add(dup_key, {str(record_id) for record_id in record_ids})
         pipeline.execute()
@@ -12,8 +12,13 @@ specific language governing permissions and limitations under the License.
 
 from itertools import chain
 
-from alarm_backends.core.cache.cmdb import HostManager, ServiceInstanceManager
+from alarm_backends.core.cache.cmdb import (
+    HostIDManager,
+    HostManager,
+    ServiceInstanceManager,
+)
 from alarm_backends.service.access.base import Fuller
+from bkmonitor.utils.local import local
 from constants.data_source import DataSourceLabel, DataTypeLabel
 
 
@@ -32,18 +37,14 @@ class TopoNodeFuller(Fuller):
         """
         return scenario in ("os", "host_process")
 
-    def full(self, record):
+    @staticmethod
+    def convert_fta_dimensions(record):
         """
-        维度补充(当策略目标是CMDB节点时，需要在数据的维度中补充CMDB节点的信息)
-
-        1. 如果数据来源"服务"层，则补充"实例"所属的CMDB节点信息，以及主机信息，否则进入下一步
-        2. 如果数据来源"主机"层，则补充"主机"所属的CMDB节点信息
+        如果是自愈事件，标准字段为 ip, bk_cloud_id 因此需要先进行转换
         """
         dimensions = record.dimensions
-
         for item in record.items:
             if (DataSourceLabel.BK_FTA, DataTypeLabel.EVENT) in item.data_source_types:
-                # 如果是自愈事件，标准字段为 ip, bk_cloud_id 因此需要先进行转换
                 if "ip" in dimensions:
                     dimensions["bk_target_ip"] = dimensions["ip"]
                 if "bk_cloud_id" in dimensions:
@@ -52,6 +53,37 @@ class TopoNodeFuller(Fuller):
                     dimensions["bk_target_service_instance_id"] = dimensions["bk_service_instance_id"]
                 break
 
+    @staticmethod
+    def get_topo_nodes(obj):
+        """
+        展开主机/服务实例的拓扑链，得到所属的拓扑节点列表
+        """
+        if not obj.topo_link:
+            return []
+        return list({node.id for node in chain(*list(obj.topo_link.values()))})
+
+    @staticmethod
+    def get_service_instance_id(dimensions):
+        return dimensions.get("bk_target_service_instance_id") or dimensions.get("service_instance_id")
+
+    @staticmethod
+    def get_host_key(dimensions):
+        bk_target_ip = dimensions.get("bk_target_ip") or dimensions.get("ip")
+        if bk_target_ip is None:
+            return
+        bk_target_cloud_id = dimensions.get("bk_target_cloud_id", "0") or dimensions.get("bk_cloud_id", "0")
+        return HostManager.key_to_internal_value(bk_target_ip, bk_target_cloud_id)
+
+    def full(self, record):
+        """
+        维度补充(当策略目标是CMDB节点时，需要在数据的维度中补充CMDB节点的信息)
+
+        1. 如果数据来源"服务"层，则补充"实例"所属的CMDB节点信息，以及主机信息，否则进入下一步
+        2. 如果数据来源"主机"层，则补充"主机"所属的CMDB节点信息
+        """
+        dimensions = record.dimensions
+        self.convert_fta_dimensions(record)
+
         # 按主机ID补全维度
         bk_host_id = dimensions.get("bk_host_id")
         if bk_host_id:
@@ -61,16 +93,13 @@ class TopoNodeFuller(Fuller):
                 dimensions["bk_target_cloud_id"] = str(host.bk_cloud_id)
 
         # 按服务实例补全维度
-        service_instance_id = dimensions.get("bk_target_service_instance_id") or dimensions.get("service_instance_id")
+        service_instance_id = self.get_service_instance_id(dimensions)
         if service_instance_id:
             service_instance = ServiceInstanceManager.get(service_instance_id)
             if service_instance:
-                bk_topo_node = []
-                if service_instance.topo_link:
-                    bk_topo_node = list({node.id for node in chain(*list(service_instance.topo_link.values()))})
                 dimensions["bk_target_ip"] = service_instance.ip
                 dimensions["bk_target_cloud_id"] = service_instance.bk_cloud_id
-                dimensions["bk_topo_node"] = bk_topo_node
+                dimensions["bk_topo_node"] = self.get_topo_nodes(service_instance)
                 return
 
         # 主机补全维度
@@ -83,9 +112,120 @@ class TopoNodeFuller(Fuller):
         if not host:
             return
 
-        bk_topo_node = []
-        if host.topo_link:
-            bk_topo_node = list({node.id for node in chain(*list(host.topo_link.values()))})
-        dimensions["bk_topo_node"] = bk_topo_node
+        dimensions["bk_topo_node"] = self.get_topo_nodes(host)
         if "bk_host_id" not in dimensions:
             dimensions["bk_host_id"] = host.bk_host_id
+
+    @staticmethod
+    def get_hosts_by_id(bk_host_ids):
+        """
+        按主机ID批量获取主机，缓存中不存在的主机ID再通过主机ID与IP的映射按IP获取，与 get_by_id 一致
+        """
+        if not bk_host_ids:
+            return {}
+
+        hosts = HostManager.multi_get_with_dict(bk_host_ids)
+        missing_ids = [bk_host_id for bk_host_id, host in hosts.items() if not host]
+        if not missing_ids:
+            return hosts
+
+        host_keys = {
+            bk_host_id: host_key
+            for bk_host_id, host_key in HostIDManager.multi_get_with_dict(missing_ids).items()
+            if host_key
+        }
+        if host_keys:
+            hosts_by_key = HostManager.multi_get_with_dict(set(host_keys.values()))
+            for bk_host_id, host_key in host_keys.items():
+                hosts[bk_host_id] = hosts_by_key.get(host_key)
+        return hosts
+
+    @staticmethod
+    def get_hosts_by_key(host_keys):
+        """
+        按 ip|bk_cloud_id 批量获取主机，优先读取本地内存，与 HostManager.get(using_mem=True) 一致
+        """
+        hosts = {}
+        missing_keys = []
+        for host_key in host_keys:
+            host = local.host_cache.get(host_key)
+            if host is None:
+                missing_keys.append(host_key)
+            else:
+                hosts[host_key] = host
+
+        if not missing_keys:
+            return hosts
+
+        for host_key, host in HostManager.multi_get_with_dict(missing_keys).items():
+            hosts[host_key] = host
+            if host is not None:
+                local.host_cache[host_key] = host
+        return hosts
+
+    def full_many(self, records):
+        """
+        批量维度补充，结果与逐条调用 full 一致
+        同一批次中的主机及服务实例分别通过一次批量查询获取，拓扑节点列表按主机/服务实例只展开一次
+        """
+        topo_nodes_cache = {}
+
+        def get_topo_nodes(cache_key, obj):
+            if cache_key not in topo_nodes_cache:
+                topo_nodes_cache[cache_key] = self.get_topo_nodes(obj)
+            # 每条数据使用独立的列表，避免后续修改相互影响
+            return list(topo_nodes_cache[cache_key])
+
+        dimensions_list = []
+        for record in records:
+            self.convert_fta_dimensions(record)
+            dimensions_list.append(record.dimensions)
+
+        # 按主机ID补全维度
+        bk_host_ids = {str(dimensions["bk_host_id"]) for dimensions in dimensions_list if dimensions.get("bk_host_id")}
+        hosts = self.get_hosts_by_id(bk_host_ids)
+        for dimensions in dimensions_list:
+            bk_host_id = dimensions.get("bk_host_id")
+            host = hosts.get(str(bk_host_id)) if bk_host_id else None
+            if host:
+                dimensions["bk_target_ip"] = host.ip
+                dimensions["bk_target_cloud_id"] = str(host.bk_cloud_id)
+
+        # 按服务实例补全维度
+        service_instance_ids = set()
+        for dimensions in dimensions_list:
+            service_instance_id = self.get_service_instance_id(dimensions)
+            if service_instance_id:
+                service_instance_ids.add(ServiceInstanceManager.key_to_internal_value(service_instance_id))
+        service_instances = (
+            ServiceInstanceManager.multi_get_with_dict(service_instance_ids) if service_instance_ids else {}
+        )
+
+        host_dimensions_list = []
+        for dimensions in dimensions_list:
+            service_instance_id = self.get_service_instance_id(dimensions)
+            if service_instance_id:
+                service_instance_key = ServiceInstanceManager.key_to_internal_value(service_instance_id)
+                service_instance = service_instances.get(service_instance_key)
+                if service_instance:
+                    dimensions["bk_target_ip"] = service_instance.ip
+                    dimensions["bk_target_cloud_id"] = service_instance.bk_cloud_id
+                    dimensions["bk_topo_node"] = get_topo_nodes(
+                        ("service_instance", service_instance_key), service_instance
+                    )
+                    continue
+            host_dimensions_list.append(dimensions)
+
+        # 主机补全维度
+        host_keys = {self.get_host_key(dimensions) for dimensions in host_dimensions_list}
+        host_keys.discard(None)
+        hosts = self.get_hosts_by_key(host_keys)
+        for dimensions in host_dimensions_list:
+            host_key = self.get_host_key(dimensions)
+            host = hosts.get(host_key) if host_key else None
+            if not host:
+                continue
+
+            dimensions["bk_topo_node"] = get_topo_nodes(("host", host_key), host)
+            if "bk_host_id" not in dimensions:
+                dimensions["bk_host_id"] = host.bk_host_id
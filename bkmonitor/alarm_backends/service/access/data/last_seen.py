@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+无数据检测维度最近上报时间
+
+access 按无数据维度降维后，记录每个维度的最近上报时间，field 为维度 md5，value 为 [上报时间, 维度]
+无数据检测只需读取该结构判断各维度是否有新数据上报，无需将原始数据重复写入无数据检测队列
+"""
+import json
+from typing import Dict, List, Optional
+
+from alarm_backends.core.cache.key import NO_DATA_LAST_SEEN_KEY
+from bkmonitor.utils.common_utils import count_md5
+
+# 超过该周期数未上报的维度将被清理
+EXPIRE_PERIODS = 60
+
+
+def get_agg_interval(item) -> int:
+    return min(int(query_config["agg_interval"]) for query_config in item.query_configs)
+
+
+def reduce_dimensions(dimensions: Dict, no_data_dimensions: List[str]) -> Optional[Dict]:
+    """
+    按无数据维度降维，数据中缺少无数据维度时返回 None
+    """
+    if set(no_data_dimensions) - set(dimensions.keys()):
+        return None
+    return {k: v for k, v in dimensions.items() if k in no_data_dimensions}
+
+
+def update_last_seen(item, records, client=None):
+    """
+    更新各维度最近上报时间
+    :param item: 监控项
+    :param records: DataRecord 列表
+    """
+    no_data_dimensions = item.no_data_config.get("agg_dimension", [])
+    last_seen = {}
+    for record in records:
+        dimensions = reduce_dimensions(record.data["dimensions"], no_data_dimensions)
+        # 维度不完整的数据在无数据检测中视为无效数据
+        if dimensions is None:
+            continue
+        dimensions_md5 = count_md5(dimensions)
+        if dimensions_md5 not in last_seen or record.time > last_seen[dimensions_md5][0]:
+            last_seen[dimensions_md5] = (record.time, dimensions)
+
+    if not last_seen:
+        return
+
+    client = client or NO_DATA_LAST_SEEN_KEY.client
+    cache_key = NO_DATA_LAST_SEEN_KEY.get_key(strategy_id=item.strategy.strategy_id, item_id=item.id)
+    pipeline = client.pipeline(transaction=False)
+    pipeline.hmset(
+        cache_key,
+        {
+            NO_DATA_LAST_SEEN_KEY.get_field(dimensions_md5=dimensions_md5): json.dumps(value)
+            for dimensions_md5, value in last_seen.items()
+        },
+    )
+    # 避免监控周期大于默认key过期时间，引起数据丢失
+    pipeline.expire(cache_key, max([NO_DATA_LAST_SEEN_KEY.ttl, get_agg_interval(item) * 5]))
+    pipeline.execute()
+
+
+def list_last_seen_data(item, check_timestamp: int) -> List[Dict]:
+    """
+    获取所有未过期维度及其最近上报时间，转换为无数据检测的数据格式
+    是否有新数据上报由无数据检测按维度与上次检测记录的上报时间比对，迟到的数据同样能被识别
+    :param item: 监控项
+    :param check_timestamp: 本次检测时间点
+    """
+    client = NO_DATA_LAST_SEEN_KEY.client
+    cache_key = NO_DATA_LAST_SEEN_KEY.get_key(strategy_id=item.strategy.strategy_id, item_id=item.id)
+    expire_before = check_timestamp - get_agg_interval(item) * EXPIRE_PERIODS
+
+    data = []
+    expired_fields = []
+    for field, value in client.hgetall(cache_key).items():
+        try:
+            timestamp, dimensions = json.loads(value)
+        except (TypeError, ValueError):
+            expired_fields.append(field)
+            continue
+
+        if timestamp < expire_before:
+            expired_fields.append(field)
+            continue
+
+        # 晚于检测时间点的数据说明维度仍在上报，按检测时间点计算，避免记录为检测点导致下个周期误判为无新数据
+        timestamp = min(timestamp, check_timestamp)
+        data.append(
+            {
+                "record_id": "{}.{}".format(field, timestamp),
+                "value": None,
+                "values": {"timestamp": timestamp},
+                "dimensions": dimensions,
+                "time": timestamp,
+            }
+        )
+
+    if expired_fields:
+        client.hdel(cache_key, *expired_fields)
+    return data
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+业务数据拉取耗时统计，用于 access(data) 按负载分配业务
+
+耗时按固定时间窗口累加，分配时读取已结束且不再写入的窗口。
+读取的窗口由首个读取的机器写入 redis 并在窗口有效期内共享，各机器不依赖本机时钟选择窗口，
+避免时钟偏差导致在窗口切换附近读取到不同的负载，使业务同时被多台机器处理或无机器处理
+"""
+import logging
+import time
+from typing import Dict
+
+from alarm_backends.core.cache.key import (
+    ACCESS_DATA_LOAD_KEY,
+    ACCESS_DATA_LOAD_WINDOW_KEY,
+)
+
+logger = logging.getLogger("access.data")
+
+# 统计窗口长度(秒)
+LOAD_WINDOW = 10 * 60
+
+
+def get_window(timestamp=None) -> int:
+    return int((timestamp or time.time()) // LOAD_WINDOW)
+
+
+def record_process_time(bk_biz_id, cost: float):
+    """
+    记录业务数据拉取耗时
+    """
+    cache_key = ACCESS_DATA_LOAD_KEY.get_key(window=get_window())
+    field = ACCESS_DATA_LOAD_KEY.get_field(bk_biz_id=bk_biz_id)
+    try:
+        pipeline = ACCESS_DATA_LOAD_KEY.client.pipeline(transaction=False)
+        pipeline.hincrbyfloat(cache_key, field, cost)
+        pipeline.expire(cache_key, ACCESS_DATA_LOAD_KEY.ttl)
+        pipeline.execute()
+    except Exception as e:  # noqa
+        logger.warning("record access process time of biz(%s) failed: %s", bk_biz_id, e)
+
+
+def get_dispatch_window() -> int:
+    """
+    获取按负载分配使用的统计窗口
+    上一个窗口结束时仍可能有任务在写入，因此使用再前一个窗口。窗口由首个读取的机器写入，有效期内各机器共用
+    """
+    cache_key = ACCESS_DATA_LOAD_WINDOW_KEY.get_key()
+    client = ACCESS_DATA_LOAD_WINDOW_KEY.client
+    window = client.get(cache_key)
+    if window is None:
+        client.set(cache_key, get_window() - 2, nx=True, ex=ACCESS_DATA_LOAD_WINDOW_KEY.ttl)
+        window = client.get(cache_key)
+    return int(window)
+
+
+def get_biz_loads() -> Dict[str, float]:
+    """
+    获取各业务的数据拉取耗时
+    """
+    cache_key = ACCESS_DATA_LOAD_KEY.get_key(window=get_dispatch_window())
+    loads = {}
+    for bk_biz_id, cost in ACCESS_DATA_LOAD_KEY.client.hgetall(cache_key).items():
+        try:
+            loads[bk_biz_id] = float(cost)
+        except (TypeError, ValueError):
+            continue
+    return loads
@@ -37,6 +37,7 @@ from alarm_backends.core.cluster import get_cluster
 from alarm_backends.core.control.checkpoint import Checkpoint
 from alarm_backends.core.control.item import Item
 from alarm_backends.core.control.strategy import Strategy
+from alarm_backends.core.storage import queue_codec
 from alarm_backends.core.storage.redis import Cache
 from alarm_backends.management.hashring import HashRing
 from alarm_backends.service.access import base
@@ -47,6 +48,8 @@ from alarm_backends.service.access.data.filters import (
     RangeFilter,
 )
 from alarm_backends.service.access.data.fullers import TopoNodeFuller
+from alarm_backends.service.access.data.last_seen import update_last_seen
+from alarm_backends.service.access.data.load import record_process_time
 from alarm_backends.service.access.data.records import DataRecord
 from alarm_backends.service.access.priority import PriorityChecker
 from bkmonitor.utils.common_utils import count_md5, get_local_ip
@@ -128,7 +131,7 @@ class BaseAccessDataProcess(base.BaseAccessProcess):
         output_key = data_list_key.get_key(strategy_id=item.strategy.strategy_id, item_id=item.id)
         queue_length = client.llen(output_key)
         # 超过最大检测长度10倍(50w)说明detect模块处理能力不足,数据将被丢弃。
-        if queue_length > settings.SQL_MAX_LIMIT * 10:
+        if queue_length > queue_codec.max_messages(settings.SQL_MAX_LIMIT * 10):
             msg = (
                 f"Critical: strategy({item.strategy.strategy_id}), item({item.id})"
                 f"The number of ({output_key}) records to be detected has "
@@ -141,7 +144,7 @@ class BaseAccessDataProcess(base.BaseAccessProcess):
         _offset = 0
         while _offset < len(record_list):
             chunk_records = record_list[_offset : _offset + 10000]
-            pipeline.lpush(output_key, *[json.dumps(record.data) for record in chunk_records])
+            pipeline.lpush(output_key, *queue_codec.dumps(record.data for record in chunk_records))
             _offset += 10000
         # 避免监控周期大于默认key过期时间，引起数据丢失
         agg_interval = min(query_config["agg_interval"] for query_config in item.query_configs)
@@ -202,7 +205,11 @@ class BaseAccessDataProcess(base.BaseAccessProcess):
 
             # 推送无数据处理
             if item.no_data_config["is_enabled"]:
-                self._push(item, records, output_client, key.NO_DATA_LIST_KEY)
+                if settings.NODATA_LAST_SEEN_ENABLED:
+                    # 仅记录各维度最近上报时间，无需将数据重复写入无数据检测队列
+                    update_last_seen(item, records, output_client)
+                else:
+                    self._push(item, records, output_client, key.NO_DATA_LIST_KEY)
 
         # 推送数据处理信号
         if records:
@@ -302,6 +309,9 @@ class AccessDataProcess(BaseAccessDataProcess):
         if from_timestamp > until_timestamp:
             return
 
+        # 以下会临时修改查询配置，使用副本避免影响注册表中共享的监控项
+        first_item = first_item.clone()
+
         # 由于某些数据源需要进行策略分组，因此需要将条件置为空
         if not (first_item.data_source_types & MULTI_METRIC_DATA_SOURCES):
             first_item.data_sources[0]._advance_where = []
@@ -326,9 +336,6 @@ class AccessDataProcess(BaseAccessDataProcess):
         # 如果最大的localTime离得太近，那就存下until_timestamp，下次再拉取数据
         if DataSourceLabel.BK_DATA in first_item.data_source_labels:
             max_local_time = self.get_max_local_time(item_records)
-            first_item.data_sources[0].metrics = [
-                m for m in first_item.data_sources[0].metrics if m["field"] != "localTime"
-            ]
             if now_timestamp - max_local_time.timestamp() <= settings.BKDATA_LOCAL_TIME_THRESHOLD:
                 ACCESS_END_TIME_KEY.client.set(
                     ACCESS_END_TIME_KEY.get_key(group_key=self.strategy_group_key),
@@ -353,8 +360,12 @@ class AccessDataProcess(BaseAccessDataProcess):
                 have_priority = True
                 break
 
-        for record in reversed(item_records):
-            point = DataRecord(self.items, record)
+        points = [DataRecord(self.items, record) for record in reversed(item_records)]
+        # 批量确认重复数据，所有时间点合并为一次请求
+        if dup_obj.batch:
+            dup_obj.prefetch([point for point in points if point.value is not None])
+
+        for point in points:
             if point.value is not None:
                 # 去除重复数据
                 if dup_obj.is_duplicate(point):
@@ -423,7 +434,11 @@ class AccessDataProcess(BaseAccessDataProcess):
 
         exc = super(AccessDataProcess, self).process()
 
-        metrics.ACCESS_DATA_PROCESS_TIME.labels(strategy_group_key=metrics.TOTAL_TAG).observe(time.time() - start_time)
+        cost = time.time() - start_time
+        metrics.ACCESS_DATA_PROCESS_TIME.labels(strategy_group_key=metrics.TOTAL_TAG).observe(cost)
+        if settings.ACCESS_DATA_LOAD_AWARE_DISPATCH and self.items:
+            # 策略分组关联的策略归属同一业务
+            record_process_time(self.items[0].strategy.bk_biz_id, cost)
         metrics.ACCESS_DATA_PROCESS_COUNT.labels(
             strategy_group_key=metrics.TOTAL_TAG,
             status=metrics.StatusEnum.from_exc(exc),
@@ -664,9 +679,7 @@ class AccessRealTimeDataProcess(BaseAccessDataProcess):
             standard_raw_data.update(raw_data["metrics"])
             standard_raw_data.update(raw_data["dimensions"])
 
-            item = strategy.items[0]
-            item.data_sources[0].group_by = dimensions
-            item.query_configs[0]["agg_dimension"] = dimensions
+            item = self.get_real_time_item(strategy, dimensions)
             new_record_list.append(DataRecord(item, standard_raw_data))
         return new_record_list
 
@@ -675,10 +688,21 @@ class AccessRealTimeDataProcess(BaseAccessDataProcess):
         获取策略配置
         """
         if time.time() - self.strategy_cache.get(strategy_id, {}).get("time", 0) > 60:
-            self.strategy_cache[strategy_id] = {"time": time.time(), "strategy": Strategy(strategy_id)}
+            self.strategy_cache[strategy_id] = {"time": time.time(), "strategy": Strategy(strategy_id), "items": {}}
 
         return self.strategy_cache[strategy_id]["strategy"]
 
+    def get_real_time_item(self, strategy: Strategy, dimensions: List[str]) -> Item:
+        """
+        获取按topic维度聚合的监控项
+        策略的监控项在进程内共享，不能直接修改其聚合维度，因此按维度缓存监控项副本，随策略缓存一起刷新
+        """
+        items = self.strategy_cache[strategy.id].setdefault("items", {})
+        key = tuple(dimensions)
+        if key not in items:
+            items[key] = strategy.items[0].clone(agg_dimension=list(dimensions))
+        return items[key]
+
     def run_poller(self, once=False):
         while True:
             self.consumers_lock.acquire()
@@ -793,11 +817,11 @@ class AccessRealTimeDataProcess(BaseAccessDataProcess):
                     except Exception as e:
                         logger.warning("%s loads alarm(%s) failed", record.topic, record.value, e)
 
+                # 补充维度：比如：业务、集群、模块等信息
+                self.full_many(records)
+
                 record_list = []
                 for r in records:
-                    # 补充维度：比如：业务、集群、模块等信息
-                    self.full(r)
-
                     new_r_list = r.full()
                     if not new_r_list:
                         continue
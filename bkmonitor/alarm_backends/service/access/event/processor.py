@@ -23,6 +23,7 @@ from alarm_backends.core.cluster import get_cluster
 from alarm_backends.core.control.strategy import Strategy
 from alarm_backends.core.detect_result import ANOMALY_LABEL, CheckResult
 from alarm_backends.core.lock.service_lock import service_lock
+from alarm_backends.core.storage import queue_codec
 from alarm_backends.core.storage.kafka import KafkaQueue
 from alarm_backends.service.access.base import BaseAccessProcess
 from alarm_backends.service.access.data.filters import HostStatusFilter, RangeFilter
@@ -136,12 +137,11 @@ class BaseAccessEventProcess(BaseAccessProcess, QoSMixin):
         # 1. split by strategy_id
         pending_to_push = {}
         for e in self.record_list:
-            data_str = e.to_str()
             for item in e.items:
                 strategy_id = item.strategy.id
                 item_id = item.id
                 if e.is_retains[item_id] and not e.inhibitions[item_id]:
-                    pending_to_push.setdefault(strategy_id, {}).setdefault(item_id, []).append(data_str)
+                    pending_to_push.setdefault(strategy_id, {}).setdefault(item_id, []).append(e.data)
 
         # 2. push to the queue by strategy_id
         anomaly_signal_list = []
@@ -152,7 +152,7 @@ class BaseAccessEventProcess(BaseAccessProcess, QoSMixin):
             metrics.ACCESS_PROCESS_PUSH_DATA_COUNT.labels(metrics.TOTAL_TAG, "event").inc(record_count)
             for item_id, event_list in list(item_to_event_record.items()):
                 queue_key = key.ANOMALY_LIST_KEY.get_key(strategy_id=strategy_id, item_id=item_id)
-                pipeline.lpush(queue_key, *event_list)
+                pipeline.lpush(queue_key, *queue_codec.dumps(event_list))
                 anomaly_signal_list.append("{}.{}".format(strategy_id, item_id))
                 pipeline.expire(queue_key, key.ANOMALY_LIST_KEY.ttl)
         pipeline.execute()
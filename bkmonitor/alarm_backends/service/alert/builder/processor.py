@@ -12,6 +12,7 @@ import logging
 import time
 from typing import List
 
+from django.conf import settings
 from django.utils.translation import ugettext as _
 from elasticsearch.helpers import BulkIndexError
 
@@ -20,6 +21,7 @@ from alarm_backends.core.alert import Alert, Event
 from alarm_backends.core.alert.alert import AlertUIDManager
 from alarm_backends.core.cache.key import ALERT_UPDATE_LOCK
 from alarm_backends.core.lock.service_lock import multi_service_lock
+from alarm_backends.core.storage.bulk_writer import get_bulk_writer
 from alarm_backends.service.alert.enricher import AlertEnrichFactory, EventEnrichFactory
 from alarm_backends.service.alert.manager.tasks import send_check_task
 from alarm_backends.service.alert.processor import BaseAlertProcessor
@@ -238,7 +240,11 @@ class AlertBuilder(BaseAlertProcessor):
 
         start_time = time.time()
         try:
-            EventDocument.bulk_create(event_documents)
+            if settings.ES_BULK_WRITER_ENABLED:
+                # 事件需要根据写入结果判断是否重复，因此同步写入
+                get_bulk_writer(EventDocument).write(event_documents)
+            else:
+                EventDocument.bulk_create(event_documents)
         except BulkIndexError as e:
             for err in e.errors:
                 # 记录保存失败的事件ID
@@ -14,14 +14,17 @@ import time
 from collections import defaultdict
 from typing import List
 
+from django.conf import settings
 from elasticsearch.helpers import BulkIndexError
 
 from alarm_backends.core.alert import Alert, Event
 from alarm_backends.core.alert.alert import AlertCache
 from alarm_backends.core.cache.key import ALERT_CONTENT_KEY, ALERT_DEDUPE_CONTENT_KEY
-from alarm_backends.service.composite.tasks import check_action_and_composite
+from alarm_backends.core.storage.bulk_writer import get_bulk_writer
+from alarm_backends.service.composite.tasks import check_action_and_composite, check_action_and_composite_batch
 from bkmonitor.documents import AlertDocument, AlertLog
 from bkmonitor.documents.base import BulkActionType
+from bkmonitor.utils.common_utils import chunks
 
 
 class BaseAlertProcessor:
@@ -139,6 +142,18 @@ class BaseAlertProcessor:
             )
             return alerts
 
+        if settings.ES_BULK_WRITER_ENABLED:
+            # 异步写入，避免 ES 延迟阻塞告警处理
+            submitted_count = get_bulk_writer(AlertDocument).submit(alert_documents, action=action)
+            self.logger.info(
+                "submit alert document with action(%s): ignored(%d), submitted(%d), saved(%d)",
+                action,
+                len(alerts) - len(alert_documents),
+                submitted_count,
+                len(alert_documents) - submitted_count,
+            )
+            return alerts
+
         start_time = time.time()
         errors = []
         try:
@@ -170,6 +185,15 @@ class BaseAlertProcessor:
         if not log_documents:
             return []
 
+        if settings.ES_BULK_WRITER_ENABLED:
+            submitted_count = get_bulk_writer(AlertLog).submit(log_documents)
+            self.logger.info(
+                "submit alert log document: submitted(%d), saved(%d)",
+                submitted_count,
+                len(log_documents) - submitted_count,
+            )
+            return
+
         start_time = time.time()
         errors = []
         try:
@@ -190,10 +214,16 @@ class BaseAlertProcessor:
         if not alerts:
             return
 
-        for alert in alerts:
-            if alert.is_blocked:
-                # 如果告警被熔断，不发送composite事件
-                continue
-            check_action_and_composite.delay(alert_key=alert.key, alert_status=alert.status)
+        # 如果告警被熔断，不发送composite事件
+        alert_signals = [
+            {"alert_key": alert.key, "alert_status": alert.status} for alert in alerts if not alert.is_blocked
+        ]
+        if settings.ALERT_SIGNAL_BATCH_SIZE > 0:
+            # 批量发送，同一批次的告警在 composite 中共享策略查询
+            for signals in chunks(alert_signals, settings.ALERT_SIGNAL_BATCH_SIZE):
+                check_action_and_composite_batch.delay(alert_signals=signals)
+        else:
+            for alert_signal in alert_signals:
+                check_action_and_composite.delay(**alert_signal)
 
         self.logger.info("send alert signals: total(%d)", len(alerts))
@@ -47,7 +47,9 @@ class CompositeProcessor:
     # 关联告警检测窗口大小（单位 s）
     COMPOSITE_CHECK_WINDOW_SIZE = 60 * 60
 
-    def __init__(self, alert: Alert, alert_status: str = "", composite_strategy_ids: list = None):
+    def __init__(
+        self, alert: Alert, alert_status: str = "", composite_strategy_ids: list = None, shared_cache: dict = None
+    ):
         self.alert: Alert = alert
         self.alert_status = alert_status or self.alert.status
         # 此处仅做告警关联，不需要重复清洗数据
@@ -56,22 +58,55 @@ class CompositeProcessor:
         self.strategies = []
         self.actions = []
         self.events = []
-        self._strategy_cache = {}
+        # 批量处理时，同一批次的告警共享策略相关的缓存，避免重复查询
+        self.shared_cache = {} if shared_cache is None else shared_cache
+        self._strategy_cache = self.shared_cache.setdefault("strategy_names", {})
+
+    def get_fta_alert_strategy_ids(self):
+        """
+        获取告警关联的策略ID
+        """
+        cache = self.shared_cache.setdefault("fta_alert_strategy_ids", {})
+        if self.alert.strategy_id:
+            cache_key = ("strategy", self.alert.strategy_id)
+            if cache_key not in cache:
+                cache[cache_key] = StrategyCacheManager.get_fta_alert_strategy_ids(strategy_id=self.alert.strategy_id)
+        else:
+            cache_key = ("alert", self.alert.alert_name)
+            if cache_key not in cache:
+                cache[cache_key] = StrategyCacheManager.get_fta_alert_strategy_ids(alert_name=self.alert.alert_name)
+        return cache[cache_key]
+
+    def get_strategies(self, strategy_ids):
+        """
+        获取策略配置，仅查询缓存中不存在的策略
+        """
+        cache = self.shared_cache.setdefault("strategies", {})
+        missing_strategy_ids = [strategy_id for strategy_id in strategy_ids if strategy_id not in cache]
+        if missing_strategy_ids:
+            for strategy_id in missing_strategy_ids:
+                cache[strategy_id] = None
+            for strategy in StrategyCacheManager.get_strategy_by_ids(missing_strategy_ids):
+                cache[strategy["id"]] = strategy
+        return [cache[strategy_id] for strategy_id in strategy_ids if cache.get(strategy_id)]
+
+    def in_alarm_time(self, strategy):
+        """
+        判断策略是否在生效时间内，同一批次内的结果可复用
+        """
+        cache = self.shared_cache.setdefault("in_alarm_time", {})
+        if strategy["id"] not in cache:
+            cache[strategy["id"]] = Strategy(strategy["id"], strategy).in_alarm_time()
+        return cache[strategy["id"]]
 
     def pull(self):
         if not self.strategy_ids:
             # 如果没有提供策略ID，则获取所有告警关联的策略
-            if self.alert.strategy_id:
-                strategy_ids_by_biz = StrategyCacheManager.get_fta_alert_strategy_ids(
-                    strategy_id=self.alert.strategy_id
-                )
-            else:
-                strategy_ids_by_biz = StrategyCacheManager.get_fta_alert_strategy_ids(alert_name=self.alert.alert_name)
-
+            strategy_ids_by_biz = self.get_fta_alert_strategy_ids()
             self.strategy_ids = strategy_ids_by_biz.get(str(self.alert.bk_biz_id), [])
 
         if self.strategy_ids:
-            self.strategies = StrategyCacheManager.get_strategy_by_ids(self.strategy_ids)
+            self.strategies = self.get_strategies(self.strategy_ids)
 
     def add_action(self, strategy_id, signal, alert_ids, severity, dimensions):
         """
@@ -740,7 +775,7 @@ class CompositeProcessor:
         if not self.is_composite_strategy() and not self.alert.is_no_data():
             self.pull()
             for strategy in self.strategies:
-                in_alarm_time, message = Strategy(strategy["id"], strategy).in_alarm_time()
+                in_alarm_time, message = self.in_alarm_time(strategy)
                 if not in_alarm_time:
                     logger.info("[composite] strategy(%s) not in alarm time: %s, skipped", strategy["id"], message)
                     continue
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import logging
+from typing import Dict, List
 
 from celery.task import task
 
@@ -45,8 +46,17 @@ def check_action_and_composite(
         logger.info("[composite] alert(%s) not found, skip it", alert_key)
         return
 
+    process_alert(alert, alert_status, composite_strategy_ids)
+    metrics.report_all()
+
+
+def process_alert(alert: Alert, alert_status: str, composite_strategy_ids: list = None, shared_cache: dict = None):
+    """
+    告警关联检测及处理信号推送
+    :param shared_cache: 同一批次告警共享的策略缓存
+    """
     if not alert.bk_biz_id:
-        logger.info("[composite] alert(%s) bk_biz_id is empty, skip it", alert_key)
+        logger.info("[composite] alert(%s) bk_biz_id is empty, skip it", alert.key)
         return
 
     exc = None
@@ -54,7 +64,10 @@ def check_action_and_composite(
     try:
         with metrics.COMPOSITE_PROCESS_TIME.labels(strategy_id=metrics.TOTAL_TAG).time():
             processor = CompositeProcessor(
-                alert=alert, alert_status=alert_status, composite_strategy_ids=composite_strategy_ids
+                alert=alert,
+                alert_status=alert_status,
+                composite_strategy_ids=composite_strategy_ids,
+                shared_cache=shared_cache,
             )
             processor.process()
     except Exception as e:
@@ -64,4 +77,32 @@ def check_action_and_composite(
     metrics.COMPOSITE_PROCESS_COUNT.labels(
         strategy_id=metrics.TOTAL_TAG, status=metrics.StatusEnum.from_exc(exc), exception=exc
     ).inc()
+
+
+@task(ignore_result=True, queue="celery_composite")
+def check_action_and_composite_batch(alert_signals: List[Dict]):
+    """
+    批量处理告警信号，告警快照批量获取，同一批次的告警共享策略缓存
+    :param alert_signals: 告警信号列表 [{"alert_key": AlertKey, "alert_status": "ABNORMAL"}]
+    """
+    alert_keys = [alert_signal["alert_key"] for alert_signal in alert_signals]
+    try:
+        alerts = {str(alert.id): alert for alert in Alert.mget(alert_keys)}
+    except Exception as e:
+        # 批量获取失败时，逐条处理
+        logger.exception("[composite] mget alerts error: %s, process one by one", e)
+        for alert_signal in alert_signals:
+            check_action_and_composite(**alert_signal)
+        return
+
+    shared_cache = {}
+    for alert_signal in alert_signals:
+        alert_key = alert_signal["alert_key"]
+        alert = alerts.get(str(alert_key.alert_id))
+        if not alert:
+            # 批量获取未命中时走逐条处理，由 Alert.get 从ES兜底查询，仍找不到时再推迟检测
+            check_action_and_composite(**alert_signal)
+            continue
+        process_alert(alert, alert_signal["alert_status"], shared_cache=shared_cache)
+
     metrics.report_all()
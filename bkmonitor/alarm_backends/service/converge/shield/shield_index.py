@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+屏蔽配置倒排索引
+
+每条屏蔽配置的维度条件最外层为 AND，只要其中一个"等于"条件不满足即可判定不匹配。
+因此从每条配置中挑选一个"等于"条件(策略ID、拓扑节点、维度值等)，以 (字段, 值) 作为索引 key，
+告警匹配时只需按告警维度取出候选配置，再对候选配置做完整的时间及维度判断，结果与逐条匹配一致。
+无法建立索引的配置(如仅包含正则、不等于条件)仍会逐条匹配。
+"""
+
+import logging
+from collections import defaultdict
+
+import arrow
+
+from alarm_backends.core.cache.shield import ShieldCacheManager
+from alarm_backends.service.converge.shield.shield_obj import AlertShieldObj
+from bkmonitor.utils.range.conditions import AndCondition, EqualCondition, OrCondition
+
+logger = logging.getLogger("fta_action.shield")
+
+
+def get_field_signature(cond_field):
+    """
+    字段签名，签名相同的字段从告警维度中取值的方式相同
+    IP 类字段会根据配置值是否为字典(带云区域)采用不同的取值方式，因此需要区分
+    """
+    value = cond_field.value
+    if value and isinstance(value, (list, tuple)):
+        value = value[0]
+    value_keys = tuple(sorted(value)) if isinstance(value, dict) else None
+    return cond_field.__class__, cond_field.name, value_keys
+
+
+class AlertShieldIndex:
+    """
+    单个业务的屏蔽配置索引
+    """
+
+    # 优先使用策略ID建立索引，区分度最高
+    PREFERRED_INDEX_FIELDS = ("strategy_id",)
+
+    def __init__(self, configs):
+        self.configs = configs
+        self.shield_objs = []
+        # 屏蔽时间范围，用于快速过滤未开始或已结束的配置
+        self.time_ranges = []
+        # 字段签名 -> 字段所在条件，用于从告警维度中取值
+        self.conditions = {}
+        # (字段签名, 字段值) -> 配置下标集合
+        self.index = defaultdict(set)
+        # 无法建立索引的配置下标
+        self.unindexed = []
+
+        for config in configs:
+            self.add(AlertShieldObj(config))
+
+    def add(self, shield_obj: AlertShieldObj):
+        position = len(self.shield_objs)
+        self.shield_objs.append(shield_obj)
+
+        time_check = shield_obj.time_check
+        self.time_ranges.append(
+            (
+                time_check.begin_datetime.timestamp if time_check.begin_datetime else None,
+                time_check.end_datetime.timestamp if time_check.end_datetime else None,
+            )
+        )
+
+        index_conditions = self.select_index_conditions(shield_obj.dimension_check)
+        if index_conditions is None:
+            self.unindexed.append(position)
+            return
+
+        for condition in index_conditions:
+            signature = get_field_signature(condition.cond_field)
+            self.conditions.setdefault(signature, condition)
+            for value in condition.cond_field.to_str_list():
+                self.index[(signature, value)].add(position)
+
+    @classmethod
+    def is_index_condition(cls, condition):
+        # 仅"等于"条件可建立索引，维度不存在时必须判定为不匹配
+        return type(condition) is EqualCondition and not condition.default_value_if_not_exists
+
+    @classmethod
+    def select_index_conditions(cls, dimension_check: AndCondition):
+        """
+        选出用于建立索引的条件列表，告警命中其中任意一个条件才可能匹配该配置
+        :return: 无法建立索引时返回 None
+        """
+        equal_conditions = [c for c in dimension_check.conditions if cls.is_index_condition(c)]
+        if equal_conditions:
+            return [min(equal_conditions, key=cls.get_condition_priority)]
+
+        for condition in dimension_check.conditions:
+            if not isinstance(condition, OrCondition) or not condition.conditions:
+                continue
+            # 或条件的每个分支都能建立索引时，以各分支索引条件的并集作为候选
+            branch_conditions = []
+            for branch in condition.conditions:
+                if not isinstance(branch, AndCondition):
+                    break
+                equal_conditions = [c for c in branch.conditions if cls.is_index_condition(c)]
+                if not equal_conditions:
+                    break
+                branch_conditions.append(min(equal_conditions, key=cls.get_condition_priority))
+            else:
+                return branch_conditions
+        return None
+
+    @classmethod
+    def get_condition_priority(cls, condition):
+        not_preferred = condition.cond_field.name not in cls.PREFERRED_INDEX_FIELDS
+        return not_preferred, len(condition.cond_field.to_str_list())
+
+    def is_time_in_range(self, position, timestamp):
+        begin_time, end_time = self.time_ranges[position]
+        if begin_time is not None and timestamp < begin_time:
+            return False
+        if end_time is not None and timestamp > end_time:
+            return False
+        return True
+
+    def get_candidates(self, dimension, source_time=None):
+        """
+        根据告警维度获取可能匹配的屏蔽配置，按配置原有顺序返回
+        """
+        source_time = source_time or arrow.now()
+        positions = set(self.unindexed)
+        for signature, condition in self.conditions.items():
+            existed, data_field = condition.get_field(dimension)
+            if not existed:
+                continue
+            for value in data_field.to_str_list():
+                positions.update(self.index.get((signature, value), ()))
+
+        timestamp = source_time.timestamp
+        return [
+            self.shield_objs[position]
+            for position in sorted(positions)
+            if self.is_time_in_range(position, timestamp)
+        ]
+
+    def match(self, alert):
+        """
+        获取告警匹配的屏蔽配置
+        """
+        if not self.shield_objs:
+            return []
+        source_time = arrow.now()
+        dimension = self.shield_objs[0].get_dimension(alert)
+        return [
+            shield_obj
+            for shield_obj in self.get_candidates(dimension, source_time)
+            if shield_obj.is_dimension_match(dimension, source_time)
+        ]
+
+
+class ShieldIndexManager:
+    """
+    进程内的屏蔽配置索引，屏蔽缓存刷新导致内容变化时重建
+    """
+
+    # 业务ID -> (屏蔽配置缓存原始内容, 索引)
+    _indexes = {}
+
+    @classmethod
+    def get_index(cls, bk_biz_id) -> AlertShieldIndex:
+        data = ShieldCacheManager.get_raw_shields_by_biz_id(bk_biz_id)
+        cached = cls._indexes.get(bk_biz_id)
+        if cached and cached[0] == data:
+            return cached[1]
+
+        index = AlertShieldIndex(ShieldCacheManager.parse_shields(data))
+        if not data:
+            cls._indexes.pop(bk_biz_id, None)
+            return index
+
+        cls._indexes[bk_biz_id] = (data, index)
+        logger.info(
+            "rebuild shield index of biz(%s), shield count(%s), unindexed count(%s)",
+            bk_biz_id,
+            len(index.shield_objs),
+            len(index.unindexed),
+        )
+        return index
+
+    @classmethod
+    def clear(cls):
+        cls._indexes.clear()
@@ -426,5 +426,11 @@ class AlertShieldObj(ShieldObj):
         return new_dimensions
 
     def is_match(self, alert: AlertDocument):
-        source_time = arrow.now()
-        return self.time_check.is_match(source_time) and self.dimension_check.is_match(self.get_dimension(alert))
+        return self.is_dimension_match(self.get_dimension(alert))
+
+    def is_dimension_match(self, dimension, source_time=None):
+        """
+        根据已获取的告警维度判断是否匹配，便于多条屏蔽配置复用同一份维度
+        """
+        source_time = source_time or arrow.now()
+        return self.time_check.is_match(source_time) and self.dimension_check.is_match(dimension)
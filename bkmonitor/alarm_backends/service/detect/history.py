@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+同环比历史数据存储(按时间序列)
+
+每个监控项一个 hash，field 为维度 md5，value 为该时间序列在各偏移量下的环形缓冲区:
+    {"<start>-<end>": [最新时间点, [值, ...]]}
+环形缓冲区长度固定，时间点 ts 的值位于下标 (ts // 周期) % 长度，缓冲区覆盖 (最新时间点 - 长度 * 周期, 最新时间点]
+
+特殊 field __meta__ 记录各偏移量已经查询过的时间范围 {"<start>-<end>": [开始时间, 结束时间)}，
+范围内缺失的值表示该时间点无数据，不需要重复查询；同时记录上次清理时间，定期清理不再上报的时间序列
+
+检测时只需一次 HMGET 获取当前批次涉及的时间序列，解码后通过 (维度 md5, 时间点) 直接取值
+"""
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from alarm_backends.core.cache import key
+
+META_FIELD = "__meta__"
+
+
+def get_series_md5(point) -> str:
+    return point.record_id.split(".")[0]
+
+
+def get_group(start: int, end: int) -> str:
+    return f"{start}-{end}"
+
+
+class HistorySeriesStore:
+    """
+    单个监控项的历史数据存储
+    """
+
+    def __init__(self, item):
+        self.item = item
+        self.interval = int(item.query_configs[0]["agg_interval"])
+        self.client = key.HISTORY_SERIES_KEY.client
+        self.cache_key = key.HISTORY_SERIES_KEY.get_key(strategy_id=item.strategy.id, item_id=item.id)
+
+        # 偏移量 -> [开始时间, 结束时间)
+        self.coverage = {}
+        # 维度 md5 -> {偏移量: [最新时间点, 环形缓冲区]}
+        self.series = {}
+        # (维度 md5, 时间点) -> 值
+        self.lookup = {}
+        self.pruned_at = 0
+        self._loaded = set()
+        self._changed = set()
+        self._meta_changed = False
+
+    def get_capacity(self, group: str) -> int:
+        """
+        环形缓冲区长度，覆盖偏移区间及之后若干个周期，时间窗口推移时可复用已查询的数据
+        """
+        start, end = (int(offset) for offset in group.split("-"))
+        return (end - start) // self.interval + 1 + settings.DETECT_HISTORY_SERIES_WINDOW
+
+    def load(self, series_md5s: Iterable[str]):
+        """
+        加载时间序列，首次加载时同时获取查询范围
+        """
+        fields = [md5 for md5 in set(series_md5s) if md5 not in self._loaded]
+        if not self._loaded:
+            fields.insert(0, META_FIELD)
+        if not fields:
+            return
+
+        values = self.client.hmget(self.cache_key, fields)
+        self._loaded.update(fields)
+        for field, value in zip(fields, values):
+            if not value:
+                continue
+            try:
+                value = json.loads(value)
+            except (TypeError, ValueError):
+                continue
+
+            if field == META_FIELD:
+                self.coverage.update(value.get("coverage", {}))
+                self.pruned_at = value.get("pruned_at", 0)
+                continue
+
+            self.series[field] = value
+            for ring in value.values():
+                self._update_lookup(field, ring)
+
+    def _update_lookup(self, series_md5: str, ring: List):
+        latest, values = ring
+        capacity = len(values)
+        for timestamp in range(latest - (capacity - 1) * self.interval, latest + self.interval, self.interval):
+            value = values[(timestamp // self.interval) % capacity]
+            if value is not None:
+                self.lookup[(series_md5, timestamp)] = value
+
+    def is_covered(self, from_timestamp: int, until_timestamp: int) -> bool:
+        """
+        时间范围内的每个时间点是否都已查询过(任一偏移量查询过即可)
+        """
+        for timestamp in range(from_timestamp, until_timestamp, self.interval):
+            for begin, end in self.coverage.values():
+                if begin <= timestamp < end:
+                    break
+            else:
+                return False
+        return True
+
+    def get_missing_range(self, group: str, from_timestamp: int, until_timestamp: int) -> Tuple[int, int]:
+        """
+        获取需要查询的时间范围，时间窗口推移时只需查询新增部分
+        """
+        if group in self.coverage:
+            begin, end = self.coverage[group]
+            if begin <= from_timestamp < end:
+                return end, until_timestamp
+        return from_timestamp, until_timestamp
+
+    def mark_covered(self, group: str, from_timestamp: int, until_timestamp: int):
+        if from_timestamp >= until_timestamp:
+            return
+
+        if group in self.coverage:
+            begin, end = self.coverage[group]
+            # 与已查询的范围相交或相邻时合并
+            if from_timestamp <= end and begin <= until_timestamp:
+                from_timestamp, until_timestamp = min(begin, from_timestamp), max(end, until_timestamp)
+
+        # 查询范围不能超出环形缓冲区覆盖的范围
+        from_timestamp = max(from_timestamp, until_timestamp - self.get_capacity(group) * self.interval)
+        self.coverage[group] = [from_timestamp, until_timestamp]
+        self._meta_changed = True
+
+    def add(self, group: str, points: List):
+        """
+        写入数据点
+        """
+        series_values = {}
+        for point in points:
+            series_md5 = get_series_md5(point)
+            self.lookup[(series_md5, point.timestamp)] = point.value
+            if point.timestamp % self.interval == 0:
+                series_values.setdefault(series_md5, {})[point.timestamp] = point.value
+
+        self.load(series_values.keys())
+        capacity = self.get_capacity(group)
+        for series_md5, values in series_values.items():
+            rings = self.series.setdefault(series_md5, {})
+            rings[group] = self._merge(rings.get(group), values, capacity)
+            self._changed.add(series_md5)
+
+    def _merge(self, ring: Optional[List], values: Dict[int, float], capacity: int) -> List:
+        latest = max(values)
+        if ring and len(ring[1]) == capacity:
+            ring_latest, ring_values = ring[0], list(ring[1])
+            if latest > ring_latest:
+                # 时间窗口推移，清理被覆盖的旧数据
+                if latest - ring_latest >= capacity * self.interval:
+                    ring_values = [None] * capacity
+                else:
+                    for timestamp in range(ring_latest + self.interval, latest + self.interval, self.interval):
+                        ring_values[(timestamp // self.interval) % capacity] = None
+            latest = max(latest, ring_latest)
+        else:
+            ring_values = [None] * capacity
+
+        earliest = latest - (capacity - 1) * self.interval
+        for timestamp, value in values.items():
+            if timestamp >= earliest:
+                ring_values[(timestamp // self.interval) % capacity] = value
+        return [latest, ring_values]
+
+    def is_expired(self, rings: Dict) -> bool:
+        """
+        时间序列在各偏移量已查询的范围内均无数据
+        """
+        for group, (latest, __) in rings.items():
+            if group not in self.coverage or latest >= self.coverage[group][0]:
+                return False
+        return True
+
+    def prune(self, pipeline):
+        """
+        清理不再上报的时间序列，避免维度变化频繁时 hash 无限增长
+        """
+        expired_fields = []
+        for field, value in self.client.hgetall(self.cache_key).items():
+            if field == META_FIELD or field in self._changed:
+                continue
+            try:
+                if self.is_expired(json.loads(value)):
+                    expired_fields.append(field)
+            except (TypeError, ValueError):
+                expired_fields.append(field)
+        if expired_fields:
+            pipeline.hdel(self.cache_key, *expired_fields)
+
+    def save(self):
+        if not (self._changed or self._meta_changed):
+            return
+
+        pipeline = self.client.pipeline(transaction=False)
+        now = int(time.time())
+        if now - self.pruned_at > key.HISTORY_SERIES_KEY.ttl:
+            self.prune(pipeline)
+            self.pruned_at = now
+            self._meta_changed = True
+
+        mapping = {
+            series_md5: json.dumps(self.series[series_md5], separators=(",", ":")) for series_md5 in self._changed
+        }
+        if self._meta_changed:
+            mapping[META_FIELD] = json.dumps(
+                {"coverage": self.coverage, "pruned_at": self.pruned_at}, separators=(",", ":")
+            )
+
+        pipeline.hmset(self.cache_key, mapping)
+        pipeline.expire(self.cache_key, key.HISTORY_SERIES_KEY.ttl)
+        pipeline.execute()
+        self._changed = set()
+        self._meta_changed = False
+
+    def get_value(self, series_md5: str, timestamp: int):
+        return self.lookup.get((series_md5, timestamp))
+
+    def get_values(self, series_md5s: List[str], timestamps: List[int]) -> List:
+        """
+        批量获取历史值，不存在时为 None
+        """
+        lookup = self.lookup
+        return [lookup.get(pair) for pair in zip(series_md5s, timestamps)]
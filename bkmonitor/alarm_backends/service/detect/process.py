@@ -9,7 +9,6 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-import json
 import logging
 import time
 
@@ -20,6 +19,7 @@ from alarm_backends.core.control.strategy import Strategy
 from alarm_backends.core.i18n import i18n
 from alarm_backends.core.lock.service_lock import service_lock
 from alarm_backends.core.processor.base import BaseAbnormalPushProcessor
+from alarm_backends.core.storage import queue_codec
 from alarm_backends.service.detect import DataPoint
 from core.prometheus import metrics
 
@@ -62,11 +62,12 @@ class DetectProcess(BaseAbnormalPushProcessor):
 
         total_points = client.llen(data_channel)
         assert settings.SQL_MAX_LIMIT > 0, "SQL_MAX_LIMIT should bigger than zero"
-        offset = min([total_points, settings.SQL_MAX_LIMIT])
+        max_messages = queue_codec.max_messages(settings.SQL_MAX_LIMIT)
+        offset = min([total_points, max_messages])
         if offset == 0:
             logger.info("[detect] strategy({}) item({}) 暂无待检测数据".format(self.strategy_id, item.id))
             return
-        if offset == settings.SQL_MAX_LIMIT:
+        if offset == max_messages:
             self.is_busy = True
             logger.error(
                 "[detect] strategy({}) item({}) 待检测数据量达到配置值"
@@ -75,9 +76,6 @@ class DetectProcess(BaseAbnormalPushProcessor):
 
         records = client.lrange(data_channel, -offset, -1)
 
-        # 上报detect拉取数据量
-        metrics.DETECT_PROCESS_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG, type="pull").inc(len(records))
-
         unexpected_record_count = 0
         last_unexpected_record = None
         if records:
@@ -85,9 +83,10 @@ class DetectProcess(BaseAbnormalPushProcessor):
             # 队列左进右出，lrange 取出时需要做一次倒序才能保证先进先出
             for record in reversed(records):
                 try:
-                    data_point = DataPoint(json.loads(record), item)
-                    # fill data point into inputs list
-                    self.inputs[item.id].append(data_point)
+                    # 打包格式的单个元素包含多条记录，元素内部按写入顺序排列
+                    for data in queue_codec.unpack(record):
+                        # fill data point into inputs list
+                        self.inputs[item.id].append(DataPoint(data, item))
                 except ValueError:
                     unexpected_record_count += 1
                     last_unexpected_record = record
@@ -97,6 +96,10 @@ class DetectProcess(BaseAbnormalPushProcessor):
                     " 其中之一: {}".format(self.strategy_id, item.id, unexpected_record_count, last_unexpected_record)
                 )
 
+            # 上报detect拉取数据量
+            metrics.DETECT_PROCESS_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG, type="pull").inc(
+                len(self.inputs[item.id])
+            )
             logger.info(
                 "[detect] strategy({}) item({}) 拉取数据({})条".format(self.strategy_id, item.id, len(self.inputs[item.id]))
             )
@@ -14,6 +14,7 @@ import functools
 import inspect
 import json
 import logging
+import operator
 
 from django.conf import settings
 from django.template import Context, Template
@@ -23,6 +24,11 @@ from six.moves import range
 from alarm_backends.core.cache import key
 from alarm_backends.service.access.data.records import DataRecord
 from alarm_backends.service.detect import AnomalyDataPoint, DataPoint
+from alarm_backends.service.detect.history import (
+    HistorySeriesStore,
+    get_group,
+    get_series_md5,
+)
 from alarm_backends.templatetags.unit import unit_auto_convert, unit_convert_min
 from core.errors.alarm_backends.detect import (
     HistoryDataNotExists,
@@ -33,12 +39,37 @@ from core.unit import load_unit
 
 logger = logging.getLogger("detect")
 
+# 表达式比较符与比较函数的映射，供批量检测使用
+COMPARE_OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
 
 class DetectContext(dict):
     def __getattr__(self, item):
         return self.__getitem__(item)
 
 
+class BatchUnitConverter(object):
+    """
+    批量单位转换，与 unit_convert_min 结果一致，但同一单位只加载一次
+    """
+
+    def __init__(self):
+        self._units = {}
+
+    def convert_min(self, value, unit, suffix=None):
+        unit_obj = self._units.get(unit)
+        if unit_obj is None:
+            unit_obj = self._units[unit] = load_unit(unit)
+        return unit_obj.convert_to_max(value, suffix, decimal=settings.POINT_PRECISION)[0]
+
+
 class Algorithms(object):
     """
     检测算法基类，定义一个算法对象。
@@ -102,6 +133,37 @@ class Algorithms(object):
                 f"[detect result]: \t{ret}\n"
             )
 
+    def batch_filter(self, data_points):
+        """
+        批量预筛选
+        :return: 与 data_points 等长的布尔列表，False 表示该点必然不是异常点；
+                 返回 None 表示当前算法不支持批量模式，需逐点检测
+        """
+        return None
+
+    def filter_candidates(self, data_points):
+        """
+        基于批量预筛选结果，过滤出可能异常的数据点，不支持批量模式时原样返回
+        """
+        if not settings.DETECT_BATCH_ENABLED or not data_points:
+            return data_points
+
+        try:
+            candidates = self.batch_filter(data_points)
+        except Exception as e:
+            logger.exception("[detect] batch filter error, fallback to per point detect: %s", e)
+            return data_points
+
+        if candidates is None:
+            return data_points
+        return [data_point for data_point, candidate in zip(data_points, candidates) if candidate]
+
+    def clear_batch_contexts(self):
+        """
+        清理批量预筛选时暂存的上下文
+        """
+        self._batch_contexts = {}
+
     def detect(self, data_point):
         """
         返回异常数据点对象
@@ -131,19 +193,23 @@ class Algorithms(object):
         if isinstance(data_points, DataPoint):
             data_points = [data_points]
         anomaly_points = []
-        for data_point in data_points:
-            try:
-                check_result = self.detect(data_point)
-            except Exception:
-                continue
-            if check_result:
-                ap = self.gen_anomaly_point(data_point, check_result, level)
-                logger.info(
-                    "[detect] strategy({}) item({}) level[{}] 发现异常点: {}".format(
-                        ap.data_point.item.strategy.id, ap.data_point.item.id, level, ap.__dict__
+        try:
+            # 批量预筛选后，仅对候选点走逐点检测，保证异常点及异常描述与逐点检测完全一致
+            for data_point in self.filter_candidates(data_points):
+                try:
+                    check_result = self.detect(data_point)
+                except Exception:
+                    continue
+                if check_result:
+                    ap = self.gen_anomaly_point(data_point, check_result, level)
+                    logger.info(
+                        "[detect] strategy({}) item({}) level[{}] 发现异常点: {}".format(
+                            ap.data_point.item.strategy.id, ap.data_point.item.id, level, ap.__dict__
+                        )
                     )
-                )
-                anomaly_points.append(ap)
+                    anomaly_points.append(ap)
+        finally:
+            self.clear_batch_contexts()
 
         return anomaly_points
 
@@ -282,6 +348,20 @@ class BasicAlgorithmsCollection(Algorithms):
 
         return anomaly
 
+    def batch_filter(self, data_points):
+        """
+        合并子算法的批量预筛选结果，任一子算法不支持批量模式则整体不支持
+        """
+        results = []
+        for detector in self.detectors:
+            result = detector.batch_filter(data_points)
+            if result is None:
+                return None
+            results.append(result)
+
+        merge = all if self.expr_op == "and" else any
+        return [merge(candidates) for candidates in zip(*results)]
+
     def get_context(self, data_point):
         context = super(BasicAlgorithmsCollection, self).get_context(data_point)
         context.update(
@@ -296,6 +376,10 @@ class HistoryPointFetcher(object):
 
     def query_history_points(self, data_points):
         item = data_points[0].item
+        if settings.DETECT_HISTORY_SERIES_ENABLED:
+            self._query_history_series(item, data_points)
+            return
+
         # 按时间从小到大排序
         sorted_data_points = sorted(data_points, key=lambda x: x.timestamp)
         offsets = self.get_history_offsets(item)
@@ -326,7 +410,8 @@ class HistoryPointFetcher(object):
                 # 历史时刻的数据都已经查过
                 continue
 
-            item_records = item.query_record(from_timestamp, until_timestamp)
+            # 逐条解析历史数据，避免一次性构造所有记录
+            item_records = item.query_record(from_timestamp, until_timestamp, iterator=True)
             for record in item_records:
                 point = DataRecord(item, record)
                 if point.value:
@@ -335,6 +420,45 @@ class HistoryPointFetcher(object):
             self._local_history_storage = {}
             self._publish_history_points(item, records)
 
+    def _query_history_series(self, item, data_points):
+        """
+        按时间序列获取历史数据，仅加载当前批次涉及的时间序列，已查询过的时间范围不再重复查询
+        """
+        store = HistorySeriesStore(item)
+        store.load(get_series_md5(point) for point in data_points)
+
+        agg_interval = item.query_configs[0]["agg_interval"]
+        min_timestamp = min(point.timestamp for point in data_points)
+        max_timestamp = max(point.timestamp for point in data_points)
+        for offset in self.get_history_offsets(item):
+            if isinstance(offset, tuple):
+                start, end = offset
+            else:
+                start = end = offset
+            group = get_group(start, end)
+
+            if end == 0:
+                store.add(group, data_points)
+                store.mark_covered(group, min_timestamp, max_timestamp + agg_interval)
+                continue
+
+            from_timestamp, until_timestamp = min_timestamp - end, max_timestamp - start + agg_interval
+            if store.is_covered(from_timestamp, until_timestamp):
+                continue
+
+            # 时间窗口推移时，只查询新增的时间范围
+            from_timestamp, until_timestamp = store.get_missing_range(group, from_timestamp, until_timestamp)
+            records = []
+            for record in item.query_record(from_timestamp, until_timestamp, iterator=True):
+                point = DataRecord(item, record)
+                if point.value:
+                    records.append(adapter_data_access_2_detect(point, item))
+            store.add(group, records)
+            store.mark_covered(group, from_timestamp, until_timestamp)
+
+        store.save()
+        self._history_store = store
+
     def _check_history_points(self, item, history_timestamp):
         """
         检查历史时刻的数据是否已经拉取过，如果存在，则更新过期时间。
@@ -371,6 +495,24 @@ class HistoryPointFetcher(object):
         """
         获取当前数据点对应的历史数据点
         """
+        store = getattr(self, "_history_store", None)
+        if store is not None:
+            value = store.get_value(get_series_md5(point), history_timestamp)
+            if value is None:
+                if getattr(self, "_default", None) is not None:
+                    return DataPoint({"value": self._default, "time": history_timestamp}, item)
+                return
+            return DataPoint(
+                {
+                    "record_id": "{}.{}".format(get_series_md5(point), history_timestamp),
+                    "value": value,
+                    "values": {"timestamp": history_timestamp},
+                    "dimensions": getattr(point, "dimensions", {}),
+                    "time": history_timestamp,
+                },
+                item,
+            )
+
         client = key.HISTORY_DATA_KEY.client
         history_key = key.HISTORY_DATA_KEY.get_key(
             strategy_id=item.strategy.id, item_id=item.id, timestamp=history_timestamp
@@ -389,6 +531,23 @@ class HistoryPointFetcher(object):
 
         return DataPoint(json.loads(raw_data), item)
 
+    def fetch_history_values(self, data_points, offset):
+        """
+        批量获取数据点在指定偏移量的历史值，不存在时为默认值(未设置默认值时为 None)
+        仅按时间序列存储历史数据时可用，否则返回 None
+        """
+        store = getattr(self, "_history_store", None)
+        if store is None:
+            return None
+
+        values = store.get_values(
+            [get_series_md5(point) for point in data_points], [point.timestamp - offset for point in data_points]
+        )
+        default = getattr(self, "_default", None)
+        if default is not None:
+            values = [default if value is None else value for value in values]
+        return values
+
     def get_history_offsets(self, item):
         """
         获取历史数据的偏移时间，所有同比环比类算法必须实现该方法。
@@ -446,6 +605,74 @@ class RangeRatioAlgorithmsCollection(BasicAlgorithmsCollection, HistoryPointFetc
         env.update(self.validated_config)
         return env
 
+    def batch_filter(self, data_points):
+        """
+        同环比批量预筛选，只支持使用默认上升/下降表达式的算法
+        """
+        if type(self).gen_expr is not RangeRatioAlgorithmsCollection.gen_expr:
+            return None
+
+        floor, ceil = self.validated_config["floor"], self.validated_config["ceil"]
+        converter = BatchUnitConverter()
+        history_values = self.batch_history_values(data_points)
+        self.clear_batch_contexts()
+        candidates = []
+        for index, data_point in enumerate(data_points):
+            context = None
+            try:
+                if history_values is None:
+                    context = self.get_context(data_point)
+                    unit, value = context["unit"], context["value"]
+                    floor_history_value = context.get("floor_history_value")
+                    ceil_history_value = context.get("ceil_history_value")
+                else:
+                    unit, value = data_point.unit, data_point.value
+                    floor_history_value, ceil_history_value = history_values[index]
+
+                if (floor and floor_history_value is None) or (ceil and ceil_history_value is None):
+                    # 历史数据不存在，交由逐点检测处理
+                    candidates.append(True)
+                    continue
+
+                value = converter.convert_min(value, unit)
+                is_anomaly = False
+                if floor:
+                    limit = converter.convert_min(floor_history_value, unit) * (100 - floor) * 0.01
+                    is_anomaly = bool((value or limit) and (value <= limit))
+                if ceil and not is_anomaly:
+                    limit = converter.convert_min(ceil_history_value, unit) * (100 + ceil) * 0.01
+                    is_anomaly = bool((value or limit) and (value >= limit))
+            except Exception:
+                # 异常情况交由逐点检测处理
+                is_anomaly = True
+            if is_anomaly and context is not None:
+                # 候选点逐点检测时复用已计算的上下文，避免重复获取历史数据
+                self._batch_contexts[id(data_point)] = context
+            candidates.append(is_anomaly)
+        return candidates
+
+    def get_context(self, data_point):
+        batch_contexts = getattr(self, "_batch_contexts", None)
+        if batch_contexts and id(data_point) in batch_contexts:
+            return batch_contexts[id(data_point)]
+        return super(RangeRatioAlgorithmsCollection, self).get_context(data_point)
+
+    def batch_history_values(self, data_points):
+        """
+        批量获取下降/上升比较的历史值，仅默认的历史数据获取方式支持，否则返回 None
+        默认获取方式取第一个偏移量的历史数据点，下降/上升使用相同的历史值，与 extra_context 一致
+        :return: [(floor_history_value, ceil_history_value)]，历史数据不存在时为 None
+        """
+        if type(self).history_point_fetcher is not RangeRatioAlgorithmsCollection.history_point_fetcher:
+            return None
+        if type(self).extra_context is not RangeRatioAlgorithmsCollection.extra_context:
+            return None
+        offset = self.get_history_offsets(data_points[0].item)[0]
+        values = self.fetch_history_values(data_points, offset)
+        if values is None:
+            return None
+        return [(value, value) for value in values]
+
     def history_point_fetcher(self, data_point, **kwargs):
         """
         同比环比类算法特有方法，获取历史数据。
@@ -29,6 +29,7 @@ logger = logging.getLogger("detect")
 class AdvancedRingRatio(AdvancedYearRound):
     config_serializer = AdvancedRingRatioSerializer
     expr_op = "or"
+    history_value_abs = False
 
     floor_desc_tpl = _(
         "{% load unit %}较前{{floor_interval}}个时间点的{{fetch_desc}}({{floor_history_value|auto_unit:unit}})下降超过{{floor}}%"
@@ -84,6 +85,18 @@ class AdvancedRingRatio(AdvancedYearRound):
         )
         return [(1 * agg_interval, max_interval * agg_interval)]
 
+    def get_interval_offsets(self, item, interval):
+        """
+        获取前 interval 个周期的偏移量，与 history_point_fetcher 一致
+        """
+        agg_interval = item.query_configs[0]["agg_interval"]
+        return [agg_interval * cycle for cycle in range(1, (interval or 0) + 1)]
+
+    def batch_history_values(self, data_points):
+        if type(self).extra_context is not AdvancedRingRatio.extra_context:
+            return None
+        return self.batch_interval_history_values(data_points)
+
     def history_point_fetcher(self, data_point, **kwargs):
         """
         :return: list(data_point)
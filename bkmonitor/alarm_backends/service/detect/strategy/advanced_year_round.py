@@ -30,6 +30,8 @@ logger = logging.getLogger("detect")
 class AdvancedYearRound(RangeRatioAlgorithmsCollection):
     config_serializer = AdvancedYearRoundSerializer
     expr_op = "or"
+    # 历史值是否取绝对值，与 extra_context 一致
+    history_value_abs = True
 
     floor_desc_tpl = _(
         "{% load unit %}较前{{floor_interval}}天内同一时刻绝对值的{{fetch_desc}}"
@@ -89,6 +91,54 @@ class AdvancedYearRound(RangeRatioAlgorithmsCollection):
             )
         ]
 
+    def get_interval_offsets(self, item, interval):
+        """
+        获取前 interval 天同一时刻的偏移量，与 history_point_fetcher 一致
+        """
+        return self.get_history_offsets(item)[: interval or 0]
+
+    def batch_history_values(self, data_points):
+        if type(self).extra_context is not AdvancedYearRound.extra_context:
+            return None
+        return self.batch_interval_history_values(data_points)
+
+    def batch_interval_history_values(self, data_points):
+        """
+        按下降/上升各自的比较周期批量计算历史值，与 extra_context 一致，仅按时间序列存储历史数据时可用
+        :return: [(floor_history_value, ceil_history_value)]，历史数据不存在时为 None
+        """
+        if getattr(self, "_history_store", None) is None:
+            return None
+
+        item = data_points[0].item
+        floor_offsets = self.get_interval_offsets(item, self.validated_config["floor_interval"])
+        ceil_offsets = self.get_interval_offsets(item, self.validated_config["ceil_interval"])
+        return list(
+            zip(
+                self.aggregate_history_values(data_points, floor_offsets),
+                self.aggregate_history_values(data_points, ceil_offsets),
+            )
+        )
+
+    def aggregate_history_values(self, data_points, offsets):
+        """
+        按获取方式(均值/瞬间值)计算数据点在多个偏移量的历史值
+        """
+        offset_values = [self.fetch_history_values(data_points, offset) for offset in offsets]
+        history_values = []
+        for index in range(len(data_points)):
+            values = [values[index] for values in offset_values if values[index] is not None]
+            if self.history_value_abs:
+                values = [abs(value) for value in values]
+
+            if not values:
+                history_values.append(None)
+            elif self.validated_config["fetch_type"] == "avg":
+                history_values.append(round(sum(values) * 1.0 / len(values), settings.POINT_PRECISION))
+            else:
+                history_values.append(values[-1])
+        return history_values
+
     def history_point_fetcher(self, data_point, **kwargs):
         """
         :return: list(data_point)
@@ -19,7 +19,12 @@ import logging
 from django.utils.safestring import mark_safe
 from six.moves import zip
 
-from alarm_backends.service.detect.strategy import BasicAlgorithmsCollection, ExprDetectAlgorithms
+from alarm_backends.service.detect.strategy import (
+    COMPARE_OPERATORS,
+    BasicAlgorithmsCollection,
+    BatchUnitConverter,
+    ExprDetectAlgorithms,
+)
 from bkmonitor.strategy.serializers import ThresholdSerializer, allowed_threshold_method
 from core.errors.alarm_backends.detect import InvalidThresholdConfig
 
@@ -61,6 +66,33 @@ class AndThreshold(BasicAlgorithmsCollection):
         for args in zip(expr_list, tpl_list):
             yield ExprDetectAlgorithms(*args)
 
+    def batch_filter(self, data_points):
+        """
+        批量计算所有数据点是否同时满足全部阈值条件
+        """
+        converter = BatchUnitConverter()
+        conditions = {}
+        candidates = []
+        for data_point in data_points:
+            try:
+                unit = data_point.unit
+                if unit not in conditions:
+                    # 阈值按单位只转换一次
+                    conditions[unit] = [
+                        (
+                            COMPARE_OPERATORS[allowed_threshold_method[t_config["method"]]],
+                            converter.convert_min(t_config["threshold"], unit, self.unit),
+                        )
+                        for t_config in self.validated_config
+                    ]
+                value = converter.convert_min(data_point.value, unit)
+                is_anomaly = all(compare(value, threshold) for compare, threshold in conditions[unit])
+            except Exception:
+                # 异常情况交由逐点检测处理
+                is_anomaly = True
+            candidates.append(is_anomaly)
+        return candidates
+
 
 class Threshold(AndThreshold):
     config_serializer = ThresholdSerializer
@@ -69,3 +101,7 @@ class Threshold(AndThreshold):
     def gen_expr(self):
         for t_config in self.validated_config:
             yield AndThreshold(t_config, self.unit)
+
+    def batch_filter(self, data_points):
+        # 多组阈值条件之间为或关系，按子算法合并
+        return BasicAlgorithmsCollection.batch_filter(self, data_points)
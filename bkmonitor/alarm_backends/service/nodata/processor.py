@@ -10,10 +10,10 @@ specific language governing permissions and limitations under the License.
 """
 
 
-import json
 import logging
 
 import arrow
+from django.conf import settings
 
 from alarm_backends.constants import LATEST_NO_DATA_CHECK_POINT
 from alarm_backends.core.cache import key
@@ -21,6 +21,8 @@ from alarm_backends.core.control.strategy import Strategy
 from alarm_backends.core.i18n import i18n
 from alarm_backends.core.lock.service_lock import service_lock
 from alarm_backends.core.processor.base import BaseAbnormalPushProcessor
+from alarm_backends.core.storage import queue_codec
+from alarm_backends.service.access.data.last_seen import list_last_seen_data
 from alarm_backends.service.access.data.token import TokenBucket
 from alarm_backends.service.detect import DataPoint
 from core.prometheus import metrics
@@ -33,12 +35,13 @@ class CheckProcessor(BaseAbnormalPushProcessor):
         self.strategy_id = strategy_id
         self.inputs = {}
         self.outputs = {}
+        # 使用维度最近上报时间检测的监控项
+        self.last_seen_item_ids = set()
         self.strategy = Strategy(strategy_id)
         i18n.set_biz(self.strategy.bk_biz_id)
 
     def pull_data(self, item, check_timestamp, inputs=None):
         """
-        :
         :return: [datapoint, …]
         {
             "record_id":"f7659f5811a0e187c71d119c7d625f23",
@@ -58,6 +61,11 @@ class CheckProcessor(BaseAbnormalPushProcessor):
             # for debug
             self.inputs[item.id].extend(inputs)
             return
+
+        if settings.NODATA_LAST_SEEN_ENABLED:
+            self.pull_last_seen_data(item, check_timestamp)
+            return
+
         # pull data
         data_channel = key.NO_DATA_LIST_KEY.get_key(strategy_id=self.strategy_id, item_id=item.id)
         client = key.NO_DATA_LIST_KEY.client
@@ -72,7 +80,6 @@ class CheckProcessor(BaseAbnormalPushProcessor):
             return
 
         records = client.lrange(data_channel, -total_points, -1)
-        metrics.NODATA_PROCESS_PULL_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG).inc(len(records))
 
         unexpected_record_count = 0
         last_unexpected_record = None
@@ -84,26 +91,36 @@ class CheckProcessor(BaseAbnormalPushProcessor):
                 )
             )
             future_records = []
+            # 打包格式的队列元素包含多条记录，按解析后的记录数统计
+            pull_count = 0
             for record in records:
+                # 先解析到临时列表，打包数据部分解析失败时整条丢弃，避免只保留部分数据点
+                input_points, input_future_records = [], []
                 try:
-                    data_point = DataPoint(json.loads(record), item)
-                    if data_point.timestamp <= check_timestamp:
-                        self.inputs[item.id].append(data_point)
-                    else:
-                        future_records.append(record)
+                    for data in queue_codec.unpack(record):
+                        data_point = DataPoint(data, item)
+                        if data_point.timestamp <= check_timestamp:
+                            input_points.append(data_point)
+                        else:
+                            input_future_records.append(data)
                 except ValueError:
                     unexpected_record_count += 1
                     last_unexpected_record = record
+                    continue
+                self.inputs[item.id].extend(input_points)
+                future_records.extend(input_future_records)
+                pull_count += len(input_points) + len(input_future_records)
+            metrics.NODATA_PROCESS_PULL_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG).inc(pull_count)
 
             # 如果当前监测点之前无数据，但是未来有数据，那么取未来一个周期的数据
             if not self.inputs[item.id] and future_records:
                 record = future_records[0]
-                data_point = DataPoint(json.loads(record), item)
+                data_point = DataPoint(record, item)
                 earliest_future_timestamp = data_point.timestamp
                 earliest_future_points = [data_point]
                 earliest_future_records_idx = [0]
                 for index, record in enumerate(future_records[1:]):
-                    data_point = DataPoint(json.loads(record), item)
+                    data_point = DataPoint(record, item)
                     # 遇到更早时间数据，重置 earliest_future_points 和 earliest_future_records_idx
                     if data_point.timestamp < earliest_future_timestamp:
                         earliest_future_timestamp = data_point.timestamp
@@ -132,7 +149,7 @@ class CheckProcessor(BaseAbnormalPushProcessor):
 
             # 当前检测周期之后的数据或者未来周期非最早时间的数据，重新放入队列等待后续检测
             if future_records:
-                client.rpush(data_channel, *future_records)
+                client.rpush(data_channel, *queue_codec.dumps(future_records))
             if unexpected_record_count > 0:
                 logger.error(
                     "[nodata] strategy({}) item({}) check_timestamp({}) 发现非期望格式的待检测数据{}条,"
@@ -147,10 +164,26 @@ class CheckProcessor(BaseAbnormalPushProcessor):
                 )
             )
 
+    def pull_last_seen_data(self, item, check_timestamp):
+        """
+        获取各维度最近上报时间，由无数据检测按维度判断是否有新数据上报
+        """
+        records = list_last_seen_data(item, check_timestamp)
+        metrics.NODATA_PROCESS_PULL_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG).inc(len(records))
+        self.inputs[item.id] = [DataPoint(record, item) for record in records]
+        self.last_seen_item_ids.add(item.id)
+        logger.info(
+            "[nodata] strategy({}) item({}) check_timestamp({}) 拉取维度({})条".format(
+                self.strategy_id, item.id, check_timestamp, len(records)
+            )
+        )
+
     def handle_data(self, item, check_timestamp):
         # check no data
         data_points = self.inputs[item.id]
-        self.outputs[item.id] = item.check(data_points, check_timestamp)
+        self.outputs[item.id] = item.check(
+            data_points, check_timestamp, require_new_data=item.id in self.last_seen_item_ids
+        )
 
     def push_data(self):
         """
@@ -22,18 +22,8 @@ class DimensionRangeFilter(RangeFilter):
         """
         无数据历史维度范围过滤，过滤掉，返回True
         """
-        is_match = True
-        # 1. 匹配监控条件(即where条件)
-        agg_condition_obj = item.agg_condition_obj
-        if agg_condition_obj:
-            is_match = is_match and agg_condition_obj.is_match(dimensions)
-
-        # 2. 匹配额外的内置监控条件(针对磁盘、网络做的特殊处理)
-        extra_agg_condition_obj = item.extra_agg_condition_obj
-        if extra_agg_condition_obj:
-            is_match = is_match and extra_agg_condition_obj.is_match(dimensions)
-
-        is_filtered = not is_match
+        # 匹配监控条件(即where条件)及额外的内置监控条件(针对磁盘、网络做的特殊处理)
+        is_filtered = not item.condition_matcher(dimensions)
         if is_filtered:
             logger.debug(
                 "[nodata] history dimensions({dimensions}) does not match condition({condition})".format(
@@ -11,6 +11,7 @@ specific language governing permissions and limitations under the License.
 
 
 import logging
+from bisect import bisect_left, bisect_right
 
 from django.utils.translation import ugettext as _
 
@@ -20,10 +21,27 @@ from alarm_backends.core.control.record_parser import RecordParser
 from alarm_backends.core.control.strategy import Strategy
 from alarm_backends.core.detect_result import ANOMALY_LABEL
 from bkmonitor.models import AnomalyRecord
+from bkmonitor.utils.common_utils import chunks
 
 logger = logging.getLogger("trigger")
 
 
+class CheckResultWindow(object):
+    """
+    单个检测结果缓存(dimensions_md5 + level)在本地的有序副本，按分值区间滑动取数
+    """
+
+    def __init__(self, check_results):
+        # zrangebyscore 返回结果已按分值升序排列
+        self.check_results = check_results
+        self.scores = [score for _, score in check_results]
+
+    def range(self, min_score, max_score):
+        left = bisect_left(self.scores, min_score)
+        right = bisect_right(self.scores, max_score)
+        return self.check_results[left:right]
+
+
 class AnomalyChecker(object):
     """
     异常检测逻辑
@@ -54,6 +72,44 @@ class AnomalyChecker(object):
         # shortcut
         self.dimensions_md5 = self.record_parser.dimensions_md5
         self.source_time = self.record_parser.source_time
+        # 批量预取的检测结果窗口，key 为检测结果缓存 key
+        self.check_result_windows = {}
+
+    @classmethod
+    def prefetch_check_results(cls, checkers):
+        """
+        批量预取检测结果缓存
+        按 dimensions_md5 + level 分组合并各异常点的检测窗口，一次 pipeline 拉取所有分组的数据，
+        再由各异常点在本地窗口中按时间区间取数
+        """
+        check_ranges = {}
+        for checker in checkers:
+            for level in checker.point["anomaly"]:
+                trigger_config = checker.get_trigger_config(str(level))
+                if trigger_config is None:
+                    continue
+                check_cache_key, min_score, max_score = checker.get_check_range(str(level), trigger_config)
+                if check_cache_key in check_ranges:
+                    _min_score, _max_score = check_ranges[check_cache_key]
+                    min_score, max_score = min(min_score, _min_score), max(max_score, _max_score)
+                check_ranges[check_cache_key] = (min_score, max_score)
+
+        if not check_ranges:
+            return {}
+
+        # 分批执行 pipeline，避免单次请求过大阻塞 redis
+        check_result_windows = {}
+        for chunked_ranges in chunks(list(check_ranges.items()), 5000):
+            pipeline = CHECK_RESULT_CACHE_KEY.client.pipeline(transaction=False)
+            for check_cache_key, (min_score, max_score) in chunked_ranges:
+                pipeline.zrangebyscore(name=check_cache_key, min=min_score, max=max_score, withscores=True)
+            results = pipeline.execute()
+            for (check_cache_key, _), check_results in zip(chunked_ranges, results):
+                check_result_windows[check_cache_key] = CheckResultWindow(check_results)
+
+        for checker in checkers:
+            checker.check_result_windows = check_result_windows
+        return check_result_windows
 
     @staticmethod
     def is_no_data_point(point):
@@ -163,14 +219,13 @@ class AnomalyChecker(object):
                 anomaly_level = level
         return anomaly_level, anomaly_timestamps
 
-    def _check_anomaly_by_level(self, level):
+    def get_trigger_config(self, level):
         """
-        检测某个级别的异常点是否满足触发条件
+        获取某个级别的触发配置
         :param str level: 告警级别
-        :return: 二元组：是否被触发，异常次数
         """
         try:
-            trigger_config = self.trigger_configs[level]
+            return self.trigger_configs[level]
         except KeyError:
             trigger_configs = self.trigger_configs.values()
             if not trigger_configs:
@@ -180,11 +235,15 @@ class AnomalyChecker(object):
                         self.strategy_id, self.item_id, level
                     )
                 )
-                return False, []
+                return None
 
             # 默认兜底，trigger 配置当前所有告警级别默认一致
-            trigger_config = list(trigger_configs)[0]
+            return list(trigger_configs)[0]
 
+    def get_check_range(self, level, trigger_config):
+        """
+        获取检测结果缓存key及检测窗口的分值区间
+        """
         check_cache_key = CHECK_RESULT_CACHE_KEY.get_key(
             strategy_id=self.strategy_id,
             item_id=self.item_id,
@@ -193,9 +252,25 @@ class AnomalyChecker(object):
         )
         # 在对应的打点队列中取出打点信息。时间范围为source_time前后的一个窗口偏移量
         check_window_offset = trigger_config["check_window_size"] * self.check_window_unit - 1
-        check_results = CHECK_RESULT_CACHE_KEY.client.zrangebyscore(
-            name=check_cache_key, min=self.source_time - check_window_offset, max=self.source_time, withscores=True
-        )
+        return check_cache_key, self.source_time - check_window_offset, self.source_time
+
+    def _check_anomaly_by_level(self, level):
+        """
+        检测某个级别的异常点是否满足触发条件
+        :param str level: 告警级别
+        :return: 二元组：是否被触发，异常次数
+        """
+        trigger_config = self.get_trigger_config(level)
+        if trigger_config is None:
+            return False, []
+
+        check_cache_key, min_score, max_score = self.get_check_range(level, trigger_config)
+        if check_cache_key in self.check_result_windows:
+            check_results = self.check_result_windows[check_cache_key].range(min_score, max_score)
+        else:
+            check_results = CHECK_RESULT_CACHE_KEY.client.zrangebyscore(
+                name=check_cache_key, min=min_score, max=max_score, withscores=True
+            )
         # 统计包含异常标记的key的数量，并与trigger_count进行比较
         anomaly_timestamps = []
         for label, score in check_results:
@@ -22,6 +22,7 @@ from alarm_backends.core.cache.key import (
     TRIGGER_EVENT_LIST_KEY,
 )
 from alarm_backends.core.control.strategy import Strategy
+from alarm_backends.core.storage import queue_codec
 from alarm_backends.service.trigger.checker import AnomalyChecker
 from core.errors.alarm_backends import StrategyNotFound
 from core.prometheus import metrics
@@ -69,7 +70,6 @@ class TriggerProcessor(object):
         # 对列表做翻转，按数据从旧到新的顺序处理
         self.anomaly_points.reverse()
         if self.anomaly_points:
-            metrics.TRIGGER_PROCESS_PULL_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG).inc(len(self.anomaly_points))
             ANOMALY_LIST_KEY.client.ltrim(self.anomaly_list_key, 0, -len(self.anomaly_points) - 1)
             if len(self.anomaly_points) == self.MAX_PROCESS_COUNT:
                 # 拉取到的数量若等于最大数量，说明还没拉取完，下次需要再次拉取处理
@@ -144,26 +144,72 @@ class TriggerProcessor(object):
 
     def process(self):
         self.pull()
+        # 打包格式的队列元素包含多条记录，解析后再统计拉取的数据量
+        points = self.unpack_points()
+        if points:
+            metrics.TRIGGER_PROCESS_PULL_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG).inc(len(points))
 
         in_alarm_time, message = self.strategy.in_alarm_time()
         if not in_alarm_time:
             logger.info("[trigger] strategy(%s) not in alarm time: %s, skipped", self.strategy_id, message)
         else:
-            for point in self.anomaly_points:
+            checkers = []
+            for point in points:
                 try:
-                    self.process_point(point)
+                    checkers.append(self.get_checker(point))
                 except Exception as e:
                     error_message = "[process error] strategy({}), item({}) reason: {} \norigin data: {}".format(
                         self.strategy_id, self.item_id, e, point
                     )
                     logger.exception(error_message)
 
+            # 批量预取所有异常点的检测窗口，避免逐点请求redis
+            try:
+                AnomalyChecker.prefetch_check_results(checkers)
+            except Exception as e:
+                logger.exception(
+                    "[process error] strategy({}), item({}) prefetch check results error: {}".format(
+                        self.strategy_id, self.item_id, e
+                    )
+                )
+
+            for checker in checkers:
+                try:
+                    self.process_checker(checker)
+                except Exception as e:
+                    error_message = "[process error] strategy({}), item({}) reason: {} \norigin data: {}".format(
+                        self.strategy_id, self.item_id, e, checker.point
+                    )
+                    logger.exception(error_message)
+
         self.push()
 
-    def process_point(self, point):
-        point = json.loads(point)
+    def unpack_points(self):
+        """
+        解析拉取到的队列数据
+        """
+        points = []
+        for message in self.anomaly_points:
+            try:
+                points.extend(queue_codec.unpack(message))
+            except ValueError as e:
+                logger.exception(
+                    "[process error] strategy({}), item({}) unexpected message: {} \norigin data: {}".format(
+                        self.strategy_id, self.item_id, e, message
+                    )
+                )
+        return points
+
+    def get_checker(self, point):
         strategy = self.get_strategy_snapshot(point["strategy_snapshot_key"])
-        checker = AnomalyChecker(point, strategy, self.item_id)
+        return AnomalyChecker(point, strategy, self.item_id)
+
+    def process_point(self, point):
+        if isinstance(point, str):
+            point = json.loads(point)
+        self.process_checker(self.get_checker(point))
+
+    def process_checker(self, checker):
         anomaly_records, event_record = checker.check()
 
         # 暂存结果，最后批量保存
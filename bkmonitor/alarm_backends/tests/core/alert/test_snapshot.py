@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+
+import mock
+
+from alarm_backends.core.alert import snapshot
+
+ALERT_DATA = {
+    "id": "16424876305819838",
+    "alert_name": "CPU usage high",
+    "status": "ABNORMAL",
+    "dimensions": [{"key": "ip", "value": "127.0.0.1"}],
+    "extra_info": {"strategy": {"id": 1, "items": [{"name": "cpu usage"}] * 50}},
+}
+
+
+class TestSnapshotCodec(object):
+    def test_compressed_round_trip(self):
+        content = snapshot.dumps(ALERT_DATA)
+        value = snapshot.encode(content, compress=True)
+        assert value.startswith(snapshot.COMPRESSED_PREFIX_V1)
+        assert len(value) < len(content)
+        assert snapshot.loads(value) == (ALERT_DATA, snapshot.get_digest(content))
+
+    def test_json_round_trip(self):
+        value = json.dumps(ALERT_DATA)
+        assert snapshot.encode(value, compress=False) == value
+        assert snapshot.loads(value)[0] == ALERT_DATA
+
+    def test_small_content(self):
+        content = snapshot.dumps({"id": 1})
+        assert snapshot.encode(content, compress=True) == content
+
+
+class TestAlertSnapshotWriter(object):
+    def test_flush(self, settings):
+        settings.ALERT_SNAPSHOT_COMPRESS = False
+        unchanged_digest = snapshot.get_digest(snapshot.dumps({"id": 1}))
+
+        client = mock.MagicMock()
+        pipeline = client.pipeline.return_value
+        # 第二个快照仅刷新过期时间，但快照已过期
+        pipeline.execute.side_effect = [[True, True, False], [True]]
+
+        with mock.patch.object(snapshot.ALERT_SNAPSHOT_KEY, "client", client):
+            writer = snapshot.AlertSnapshotWriter()
+            writer.add("key0", {"id": 0})
+            writer.add("key1", {"id": 1}, unchanged_digest)
+            writer.add("key2", {"id": 1}, unchanged_digest)
+            # 同一个 key 仅写入最后一次
+            writer.add("key0", {"id": 0, "status": "CLOSED"})
+            assert writer.flush() == (2, 1)
+
+        assert pipeline.set.call_count == 2
+        assert pipeline.set.call_args_list[0][0][:2] == ("key0", '{"id":0,"status":"CLOSED"}')
+        assert pipeline.set.call_args_list[1][0][:2] == ("key2", '{"id":1}')
+        assert [call[0][0] for call in pipeline.expire.call_args_list] == ["key1", "key2"]
+        assert writer.flush() == (0, 0)
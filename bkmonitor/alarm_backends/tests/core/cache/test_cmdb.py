@@ -23,7 +23,14 @@ from alarm_backends.core.cache.cmdb import (
     ServiceInstanceManager,
     TopoManager,
 )
+from alarm_backends.core.cache.cmdb.base import (
+    CMDB_CACHE_VERSION_KEY,
+    CMDBCacheManager,
+    LocalObjectCache,
+    refresh_by_biz_managers,
+)
 from api.cmdb.define import Business, Host, Module, ServiceInstance, TopoNode, TopoTree
+from bkmonitor.utils.common_utils import chunks
 
 BIZ_IDS = [2, 3, 4, 5, 6, 10, 20, 21]
 
@@ -40,7 +47,7 @@ ALL_HOSTS = [
     Host(bk_host_innerip="10.0.0.6", bk_cloud_id=6, bk_host_id=6, bk_biz_id=4),
 ]
 
-get_hosts = mock.patch("alarm_backends.core.cache.cmdb.host.api.cmdb.get_host_by_topo_node").start()
+get_hosts = mock.patch("alarm_backends.core.cache.cmdb.base.api.cmdb.get_host_by_topo_node").start()
 get_hosts.side_effect = lambda bk_biz_id, **kwargs: [host for host in ALL_HOSTS if host.bk_biz_id == bk_biz_id]
 
 ALL_MODULES = [
@@ -100,7 +107,7 @@ TOPO_TREE = TopoTree(
     }
 )
 
-mock.patch("alarm_backends.core.cache.cmdb.host.api.cmdb.get_topo_tree", return_value=TOPO_TREE).start()
+mock.patch("alarm_backends.core.cache.cmdb.base.api.cmdb.get_topo_tree", return_value=TOPO_TREE).start()
 mock.patch("alarm_backends.core.cache.cmdb.service_instance.api.cmdb.get_topo_tree", return_value=TOPO_TREE).start()
 mock.patch("alarm_backends.core.cache.cmdb.service_instance.api.cmdb.get_set", return_value=[]).start()
 
@@ -246,7 +253,53 @@ class TestHostManager(TestCase):
         self.assertEqual(len(HostManager.cache.hkeys(HostManager.CACHE_KEY)), 0)
         self.assertEqual(len(HostManager.cache.hkeys(HostManager.get_biz_cache_key())), 0)
 
-    @mock.patch("alarm_backends.core.cache.cmdb.host.api.cmdb.get_host_by_topo_node")
+    def test_local_cache(self):
+        HostManager.refresh()
+        host = HostManager.get("10.0.0.1", 1)
+        # 返回的是缓存对象的拷贝，修改不影响后续获取
+        host.module_string = "m1"
+        self.assertFalse(hasattr(HostManager.get("10.0.0.1", 1), "module_string"))
+
+        # 刷新前，进程内缓存不感知 redis 中的变更
+        HostManager.cache.hdel(HostManager.CACHE_KEY, "10.0.0.1|1")
+        self.assertEqual(HostManager.get("10.0.0.1", 1), host)
+        self.assertEqual(HostManager.multi_get(["10.0.0.1|1"]), [host])
+
+        # 版本变更后，进程内缓存失效
+        HostManager.publish_version()
+        self.assertIsNone(HostManager.get("10.0.0.1", 1))
+        self.assertEqual(HostManager.multi_get(["10.0.0.1|1", "10.0.0.2|2"])[0], None)
+
+        # 不存在的对象不缓存，新增后无需等待版本变更即可获取
+        HostManager.cache.hset(HostManager.CACHE_KEY, "10.0.0.1|1", HostManager.serialize(ALL_HOSTS[0]))
+        self.assertEqual(HostManager.get("10.0.0.1", 1), ALL_HOSTS[0])
+
+    def test_local_cache_subscriber(self):
+        local_cache = LocalObjectCache(max_size=10, check_interval=60)
+        with self.settings(ROLE="web"), mock.patch.object(LocalObjectCache, "_subscribe") as subscribe:
+            local_cache.get(HostManager.CACHE_KEY, "10.0.0.1|1")
+        # 非后台 worker 进程不启动订阅线程
+        self.assertIsNone(local_cache._subscriber)
+        subscribe.assert_not_called()
+
+        local_cache = LocalObjectCache(max_size=10, check_interval=60)
+        with self.settings(ROLE="worker"), mock.patch.object(LocalObjectCache, "_subscribe") as subscribe:
+            local_cache.get(HostManager.CACHE_KEY, "10.0.0.1|1")
+            local_cache._subscriber.join()
+        subscribe.assert_called_once()
+
+    def test_local_cache_version_check(self):
+        local_cache = LocalObjectCache(max_size=10, check_interval=0)
+        with self.settings(ROLE="worker"), mock.patch.object(LocalObjectCache, "_ensure_subscriber", return_value=True):
+            local_cache.get(HostManager.CACHE_KEY, "10.0.0.1|1")
+            local_cache.set(HostManager.CACHE_KEY, "10.0.0.1|1", ALL_HOSTS[0])
+            self.assertEqual(local_cache.get(HostManager.CACHE_KEY, "10.0.0.1|1"), (True, ALL_HOSTS[0]))
+
+            # 订阅线程正常但通知丢失时，按间隔比对版本号后缓存失效
+            CMDBCacheManager.cache.hincrby(CMDB_CACHE_VERSION_KEY, HostManager.CACHE_KEY, 1)
+            self.assertEqual(local_cache.get(HostManager.CACHE_KEY, "10.0.0.1|1"), (False, None))
+
+    @mock.patch("alarm_backends.core.cache.cmdb.base.api.cmdb.get_host_by_topo_node")
     def test_refresh_exception(self, get_host_by_topo_node):
         get_host_by_topo_node.side_effect = lambda bk_biz_id, **kwargs: [
             host for host in ALL_HOSTS if host.bk_biz_id == bk_biz_id
@@ -312,6 +365,76 @@ class TestHostManager(TestCase):
         HostManager.refresh()
         self.assertEqual(8, len(HostManager.all()))
 
+    def test_refresh_changed_only(self):
+        HostManager.refresh()
+        # 对象内容未变化时不会重新写入
+        with mock.patch.object(HostManager, "clean_deleted", wraps=HostManager.clean_deleted) as clean_deleted:
+            HostManager.refresh()
+            # 第二个参数为写入的对象数量
+            self.assertEqual(clean_deleted.call_args[0][1], 0)
+        self.assertEqual(HostManager.get("10.0.0.1", 1), ALL_HOSTS[0])
+
+        # 缓存中缺失的对象会被补写
+        HostManager.cache.hdel(HostManager.CACHE_KEY, "10.0.0.2|2")
+        HostManager.refresh()
+        self.assertEqual(HostManager.get("10.0.0.2", 2), ALL_HOSTS[1])
+
+        # 缓存中被改动的对象在全量写入时修复
+        HostManager.cache.hset(HostManager.CACHE_KEY, "10.0.0.1|1", HostManager.serialize(ALL_HOSTS[1]))
+        with self.settings(CMDB_CACHE_FULL_REFRESH_INTERVAL=0):
+            HostManager.refresh()
+        self.assertEqual(HostManager.get("10.0.0.1", 1), ALL_HOSTS[0])
+
+        # 缓存被清理后全量写入
+        HostManager.cache.delete(HostManager.CACHE_KEY)
+        HostManager.refresh()
+        self.assertEqual(HostManager.get("10.0.0.1", 1), ALL_HOSTS[0])
+        self.assertEqual(len(HostManager.cache.hkeys(HostManager.CACHE_KEY)), len(ALL_HOSTS) * 2)
+
+    def test_refresh_chunked(self):
+        # 对象分批写入缓存
+        with mock.patch(
+            "alarm_backends.core.cache.cmdb.base.chunks", side_effect=lambda data, n: chunks(data, 3)
+        ) as chunks_mock:
+            HostManager.refresh()
+        chunks_mock.assert_called_once()
+        self.assertEqual(len(chunks_mock.call_args[0][0]), len(ALL_HOSTS) * 2)
+        self.assertEqual(len(HostManager.cache.hkeys(HostManager.CACHE_KEY)), len(ALL_HOSTS) * 2)
+        self.assertEqual(HostManager.get("10.0.0.1", 1), ALL_HOSTS[0])
+
+    @mock.patch("alarm_backends.core.cache.cmdb.base.api.cmdb.get_host_by_topo_node")
+    def test_refresh_shared_key(self, get_host_by_topo_node):
+        # 同一台主机同时出现在业务2和业务3中，以业务列表中靠后的业务为准
+        get_host_by_topo_node.side_effect = lambda bk_biz_id, **kwargs: [
+            Host(bk_host_innerip="10.0.0.1", bk_cloud_id=1, bk_host_id=1, bk_biz_id=bk_biz_id)
+        ]
+        with self.settings(CMDB_CACHE_REFRESH_CONCURRENCY=len(BIZ_IDS)):
+            HostManager.refresh()
+            self.assertEqual(HostManager.get("10.0.0.1", 1).bk_biz_id, BIZ_IDS[-1])
+
+            # 靠后的业务不再包含该主机时，以剩余业务中靠后的为准
+            get_host_by_topo_node.side_effect = lambda bk_biz_id, **kwargs: (
+                [Host(bk_host_innerip="10.0.0.1", bk_cloud_id=1, bk_host_id=1, bk_biz_id=bk_biz_id)]
+                if bk_biz_id in BIZ_IDS[:2]
+                else []
+            )
+            HostManager.refresh()
+            self.assertEqual(HostManager.get("10.0.0.1", 1).bk_biz_id, BIZ_IDS[1])
+
+    @mock.patch("alarm_backends.core.cache.cmdb.base.api.cmdb.get_host_by_topo_node")
+    def test_shared_snapshot(self, get_host_by_topo_node):
+        get_host_by_topo_node.side_effect = lambda bk_biz_id, **kwargs: [
+            host for host in ALL_HOSTS if host.bk_biz_id == bk_biz_id
+        ]
+        HostIDManager.clear()
+        refresh_by_biz_managers([HostIDManager, HostManager])
+
+        # 同一业务只请求一次主机接口
+        self.assertEqual(get_host_by_topo_node.call_count, len(BIZ_IDS))
+        self.assertEqual(HostIDManager.get(1), "10.0.0.1|1")
+        self.assertEqual(HostManager.get("10.0.0.1", 1).bk_host_id, 1)
+        HostIDManager.clear()
+
 
 class TestHostIDManager(TestCase):
     def setUp(self):
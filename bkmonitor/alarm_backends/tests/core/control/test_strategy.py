@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 import copy
+import json
+import threading
 from datetime import datetime
 
 import mock
 from django.test import TestCase
 
-from alarm_backends.core.control.strategy import Strategy
+from alarm_backends.core.control.strategy import Strategy, StrategyRegistry
 
 STRATEGY = {
     "bk_biz_id": 2,
@@ -99,3 +101,98 @@ class TestStrategy(TestCase):
             [],
         ]
         self.assertFalse(strategy.in_alarm_time(datetime.strptime("2022-01-01 01:00:00", "%Y-%m-%d %H:%M:%S"))[0])
+
+
+@mock.patch("alarm_backends.core.control.strategy.key")
+@mock.patch("alarm_backends.core.control.strategy.StrategyCacheManager.get_raw_strategy_by_id")
+class TestStrategyRegistry(TestCase):
+    def setUp(self):
+        StrategyRegistry.clear()
+
+    def test_reuse_items(self, get_raw_strategy_by_id, key):
+        get_raw_strategy_by_id.return_value = json.dumps(STRATEGY)
+        with self.settings(STRATEGY_REGISTRY_ENABLED=True):
+            strategy = Strategy(1)
+            self.assertEqual(strategy.config["name"], "test")
+            self.assertIs(Strategy(1).items, strategy.items)
+
+            strategy_config = copy.deepcopy(STRATEGY)
+            strategy_config["name"] = "changed"
+            get_raw_strategy_by_id.return_value = json.dumps(strategy_config)
+            self.assertEqual(Strategy(1).config["name"], "changed")
+
+            get_raw_strategy_by_id.return_value = None
+            self.assertEqual(Strategy(1).config, {})
+
+    def test_concurrent_access(self, get_raw_strategy_by_id, key):
+        get_raw_strategy_by_id.side_effect = lambda strategy_id: json.dumps(dict(STRATEGY, id=strategy_id))
+        errors = []
+
+        def worker(index):
+            try:
+                for i in range(200):
+                    strategy_id = (index + i) % 10
+                    self.assertEqual(StrategyRegistry.get(strategy_id).strategy.config["id"], strategy_id)
+            except Exception as e:  # noqa
+                errors.append(e)
+
+        # 多线程并发读写时，LRU 淘汰不会出错，注册表容量保持在上限内
+        with self.settings(STRATEGY_REGISTRY_SIZE=5):
+            threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            self.assertLessEqual(len(StrategyRegistry._entries), 5)
+
+    def test_snapshot_write_once(self, get_raw_strategy_by_id, key):
+        get_raw_strategy_by_id.return_value = json.dumps(STRATEGY)
+        with self.settings(STRATEGY_REGISTRY_ENABLED=True):
+            Strategy(1).gen_strategy_snapshot()
+            Strategy(1).gen_strategy_snapshot()
+            self.assertEqual(key.STRATEGY_SNAPSHOT_KEY.client.set.call_count, 1)
+
+            strategy_config = copy.deepcopy(STRATEGY)
+            strategy_config["update_time"] = 1
+            get_raw_strategy_by_id.return_value = json.dumps(strategy_config)
+            Strategy(1).gen_strategy_snapshot()
+            self.assertEqual(key.STRATEGY_SNAPSHOT_KEY.client.set.call_count, 2)
+
+    def test_clone_item(self, get_raw_strategy_by_id, key):
+        strategy_config = copy.deepcopy(STRATEGY)
+        strategy_config["items"] = [
+            {
+                "id": 1,
+                "name": "CPU使用率",
+                "expression": "a",
+                "query_configs": [
+                    {
+                        "alias": "a",
+                        "data_source_label": "bk_monitor",
+                        "data_type_label": "time_series",
+                        "result_table_id": "system.cpu_summary",
+                        "metric_field": "usage",
+                        "metric_id": "bk_monitor.system.cpu_summary.usage",
+                        "agg_method": "AVG",
+                        "agg_interval": 60,
+                        "agg_dimension": ["bk_target_ip", "bk_target_cloud_id"],
+                        "agg_condition": [],
+                    }
+                ],
+            }
+        ]
+        get_raw_strategy_by_id.return_value = json.dumps(strategy_config)
+        with self.settings(STRATEGY_REGISTRY_ENABLED=True):
+            item = Strategy(1).items[0]
+            cloned_item = item.clone(agg_dimension=["ip"])
+            self.assertIsNot(cloned_item, item)
+            self.assertEqual(cloned_item.data_sources[0].group_by, ["ip"])
+            self.assertEqual(cloned_item.query_configs[0]["agg_dimension"], ["ip"])
+
+            # 注册表中共享的监控项不受副本修改影响
+            cloned_item.data_sources[0]._advance_where = []
+            shared_item = Strategy(1).items[0]
+            self.assertIs(shared_item, item)
+            self.assertEqual(shared_item.data_sources[0].group_by, ["bk_target_ip", "bk_target_cloud_id"])
+            self.assertEqual(shared_item.query_configs[0]["agg_dimension"], ["bk_target_ip", "bk_target_cloud_id"])
@@ -10,8 +10,16 @@ specific language governing permissions and limitations under the License.
 """
 
 
+import pytest
+
+from bkmonitor.utils.range.compiler import (
+    compile_condition,
+    compile_target_condition,
+    filter_dimensions,
+)
 from bkmonitor.utils.range.conditions import (
     AndCondition,
+    Condition,
     EqualCondition,
     ExcludeCondition,
     GreaterCondition,
@@ -24,7 +32,8 @@ from bkmonitor.utils.range.conditions import (
     OrCondition,
     RegularCondition,
 )
-from bkmonitor.utils.range.fields import DimensionField
+from bkmonitor.utils.range.fields import DimensionField, IpDimensionField
+from bkmonitor.utils.range.target import TargetCondition
 
 
 class TestCondition(object):
@@ -211,3 +220,66 @@ class TestCondition(object):
         and_condition.add(condition3)
         assert not and_condition.is_match({"key": "123"})
         assert and_condition.is_match({"key": "1234235678"})
+
+
+class TestCompiledCondition(TestCondition):
+    """
+    复用条件测试用例，校验编译后的匹配函数与逐条件匹配结果一致
+    """
+
+    @pytest.fixture(autouse=True)
+    def compiled(self, monkeypatch):
+        condition_classes = [Condition]
+        for condition_class in condition_classes:
+            condition_classes.extend(condition_class.__subclasses__())
+            monkeypatch.setattr(condition_class, "is_match", lambda self, data: compile_condition(self)(data))
+
+    def test_default_value(self):
+        condition = EqualCondition(DimensionField("key", "value"), default_value_if_not_exists=True)
+        assert condition.is_match({})
+        assert not NotEqualCondition(DimensionField("key", "value")).is_match({})
+
+    def test_ip_field(self):
+        condition = EqualCondition(IpDimensionField("ip", [{"ip": "127.0.0.1", "bk_cloud_id": 0}]))
+        assert condition.is_match({"ip": "127.0.0.1", "bk_cloud_id": 0})
+        assert condition.is_match({"ip": "127.0.0.1"})
+        assert not condition.is_match({"ip": "127.0.0.1", "bk_cloud_id": 1})
+
+    def test_invalid_regular(self):
+        condition = RegularCondition(DimensionField("key", ["12(", r"\d+"]))
+        assert not condition.is_match({"key": "123"})
+        condition = RegularCondition(DimensionField("key", [r"\d+", "12("]))
+        assert condition.is_match({"key": "123"})
+
+
+def test_compile_target_condition():
+    target = [
+        [
+            {
+                "field": "bk_target_ip",
+                "method": "eq",
+                "value": [{"bk_target_ip": "127.0.0.1", "bk_target_cloud_id": 0}],
+            },
+            {"field": "host_topo_node", "method": "neq", "value": [{"bk_obj_id": "set", "bk_inst_id": 2}]},
+        ],
+        [{"field": "service_instance_id", "method": "eq", "value": [{"service_instance_id": 1}]}],
+    ]
+    dimensions_list = [
+        {"bk_target_ip": "127.0.0.1", "bk_target_cloud_id": 0, "bk_topo_node": ["set|1"]},
+        {"bk_target_ip": "127.0.0.1", "bk_target_cloud_id": 0, "bk_topo_node": ["set|2"]},
+        {"bk_target_ip": "127.0.0.1", "bk_target_cloud_id": 0, "bk_obj_id": "set", "bk_inst_id": 1},
+        {"bk_target_ip": "127.0.0.1", "bk_target_cloud_id": 0, "bk_topo_node": []},
+        {"bk_target_ip": "127.0.0.1", "bk_target_cloud_id": 0},
+        {"bk_target_ip": "127.0.0.2", "bk_target_cloud_id": 0, "bk_topo_node": ["set|1"]},
+        {"bk_topo_node": ["set|1"]},
+        {"service_instance_id": 1},
+        {"bk_target_service_instance_id": "2"},
+    ]
+    for conditions in [target, target[:1], target[1:], []]:
+        target_condition = TargetCondition(conditions)
+        matcher = compile_target_condition(target_condition)
+        for dimensions in dimensions_list:
+            assert matcher(dimensions) == target_condition.is_match(dimensions)
+
+    matcher = compile_target_condition(TargetCondition(target[:1]))
+    assert filter_dimensions(matcher, dimensions_list) == [dimensions_list[0], dimensions_list[2], dimensions_list[6]]
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import mock
+import pytest
+from elasticsearch.helpers import BulkIndexError
+
+from alarm_backends.core.storage import bulk_writer
+
+
+class FakeDocument(object):
+    ES_REQUEST_TIMEOUT = 30
+
+    def __init__(self, id, index="write_20240101_alert"):
+        self.id = id
+        self.index = index
+
+    def prepare_action(self, action):
+        return {"_op_type": action, "_index": self.index, "_id": self.id, "_source": {"id": self.id}}
+
+    @classmethod
+    def _get_connection(cls):
+        return mock.MagicMock()
+
+
+def _bulk_results(statuses):
+    """
+    根据每个文档的状态码生成 streaming_bulk 的结果
+    """
+
+    def streaming_bulk(client, actions, **kwargs):
+        results = []
+        for action in actions:
+            status = statuses[action["_id"]].pop(0)
+            item = {"create": {"_id": action["_id"], "_index": action["_index"], "status": status}}
+            results.append((status < 300, item))
+        return iter(results)
+
+    return streaming_bulk
+
+
+@pytest.fixture
+def writer(settings):
+    settings.ES_BULK_WRITER_BATCH_SIZE = 2
+    settings.ES_BULK_WRITER_FLUSH_INTERVAL = 0.1
+    settings.ES_BULK_WRITER_QUEUE_SIZE = 2
+    settings.ES_BULK_WRITER_PUT_TIMEOUT = 0.01
+    settings.ES_BULK_WRITER_CONCURRENCY = 2
+    settings.ES_BULK_WRITER_MAX_RETRIES = 2
+    settings.ES_BULK_WRITER_RETRY_ROUNDS = 1
+    settings.ES_BULK_WRITER_TASK_FLUSH_TIMEOUT = 1
+    writer = bulk_writer.DocumentBulkWriter(FakeDocument)
+    writer.retry_backoff = 0
+    return writer
+
+
+class TestDocumentBulkWriter(object):
+    def test_retry_failed_items(self, writer):
+        statuses = {1: [201], 2: [429, 201], 3: [409], 4: [503, 503, 503]}
+        with mock.patch.object(bulk_writer, "streaming_bulk", side_effect=_bulk_results(statuses)) as bulk_mock:
+            with pytest.raises(BulkIndexError) as e:
+                writer.write([FakeDocument(i) for i in range(1, 5)])
+
+        # 仅重试可重试的失败文档
+        assert [[a["_id"] for a in c[0][1]] for c in bulk_mock.call_args_list] == [[1, 2, 3, 4], [2, 4], [4]]
+        assert sorted(error["create"]["_id"] for error in e.value.errors) == [3, 4]
+
+    def test_bulk_by_index(self, writer):
+        statuses = {i: [201] for i in range(4)}
+        documents = [FakeDocument(i, index=f"write_2024010{i % 2}_alert") for i in range(4)]
+        with mock.patch.object(bulk_writer, "streaming_bulk", side_effect=_bulk_results(statuses)) as bulk_mock:
+            writer.write(documents)
+
+        requests = sorted([a["_id"] for a in c[0][1]] for c in bulk_mock.call_args_list)
+        assert requests == [[0, 2], [1, 3]]
+
+    def test_submit(self, writer):
+        statuses = {i: [201] for i in range(5)}
+
+        def flush(timeout=None):
+            batch = writer._get_batch()
+            writer._write_batch(batch)
+            for _ in batch:
+                writer._queue.task_done()
+
+        with mock.patch.object(bulk_writer, "streaming_bulk", side_effect=_bulk_results(statuses)) as bulk_mock:
+            with mock.patch.object(writer, "_run"), mock.patch.object(writer, "flush", side_effect=flush) as flush_mock:
+                assert writer.submit([FakeDocument(i) for i in range(5)]) == 2
+
+        # 队列满时先等待已入队的文档写入完成，再由调用方直接写入，保证写入顺序
+        flush_mock.assert_called_once()
+        assert [[a["_id"] for a in c[0][1]] for c in bulk_mock.call_args_list] == [[0, 1], [2, 3, 4]]
+
+    def test_write_batch_retry_rounds(self, writer):
+        statuses = {1: [201], 2: [503, 503, 503, 201], 3: [409]}
+        with mock.patch.object(bulk_writer, "streaming_bulk", side_effect=_bulk_results(statuses)) as bulk_mock:
+            writer._write_batch([FakeDocument(i).prepare_action("index") for i in range(1, 4)])
+
+        # 重试次数用尽后按轮次继续重试可重试的文档，不可重试的文档不再重试
+        assert [[a["_id"] for a in c[0][1]] for c in bulk_mock.call_args_list] == [[1, 2, 3], [2], [2], [2]]
+        assert statuses[2] == []
+
+    def test_flush(self, writer):
+        statuses = {i: [201] for i in range(2)}
+        with mock.patch.dict(bulk_writer._writers, {FakeDocument: writer}), mock.patch.object(
+            bulk_writer, "streaming_bulk", side_effect=_bulk_results(statuses)
+        ) as bulk_mock:
+            assert writer.submit([FakeDocument(i) for i in range(2)]) == 2
+            # 任务结束时等待队列中的文档写入完成
+            bulk_writer.flush_all()
+            assert writer.flush(timeout=0)
+
+        assert [[a["_id"] for a in c[0][1]] for c in bulk_mock.call_args_list] == [[0, 1]]
+
+    def test_flush_all_timeout(self, writer):
+        writer.task_flush_timeout = 0.1
+        with mock.patch.dict(bulk_writer._writers, {FakeDocument: writer}), mock.patch.object(writer, "_run"):
+            assert writer.submit([FakeDocument(1)]) == 1
+            # 文档未能在超时时间内写入时不再等待，留在队列中由后台线程继续写入
+            bulk_writer.flush_all()
+            assert writer._queue.unfinished_tasks == 1
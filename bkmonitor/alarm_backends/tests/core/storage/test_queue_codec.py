@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+
+import pytest
+
+from alarm_backends.core.storage import queue_codec
+
+RECORDS = [
+    {
+        "record_id": "f7659f5811a0e187c71d119c7d625f23.1569246480",
+        "value": 1.38,
+        "values": {"timestamp": 1569246480, "load5": 1.38},
+        "dimensions": {"ip": "127.0.0.1", "bk_cloud_id": "0"},
+        "time": 1569246480,
+    },
+    {
+        "record_id": "d8f7a0c4b0f1e2b8a9c3d2e1f0a9b8c7.1569246480",
+        "value": None,
+        "values": {"timestamp": 1569246480, "load5": None},
+        "dimensions": {"ip": "127.0.0.2", "bk_cloud_id": "0"},
+        "time": 1569246480,
+    },
+    {
+        "data": {"record_id": "xxx", "dimensions": {}, "value": [1, 2]},
+        "anomaly": {"1": {"anomaly_id": "xxx.1", "context": {}}},
+        "strategy_snapshot_key": "key",
+    },
+]
+
+
+class TestQueueCodec(object):
+    def test_packed_round_trip(self, settings):
+        settings.ALARM_QUEUE_PACKED_CHUNK_SIZE = 2
+        messages = queue_codec.dumps(RECORDS, packed=True)
+        assert len(messages) == 2
+        assert all(message.startswith(queue_codec.PACKED_PREFIX_V1) for message in messages)
+        assert queue_codec.loads(messages) == RECORDS
+
+    def test_json_round_trip(self):
+        messages = queue_codec.dumps(RECORDS, packed=False)
+        assert messages == [json.dumps(record) for record in RECORDS]
+        assert queue_codec.loads(messages) == RECORDS
+
+    def test_mixed_messages(self):
+        messages = [json.dumps(RECORDS[0]), queue_codec.pack(RECORDS[1:])]
+        assert queue_codec.loads(messages) == RECORDS
+
+    def test_shared_schema(self):
+        schemas, rows = json.loads(queue_codec.pack(RECORDS[:2])[len(queue_codec.PACKED_PREFIX_V1) :])
+        assert len(schemas) == 1
+        assert [row[0] for row in rows] == [0, 0]
+
+    def test_invalid_message(self):
+        with pytest.raises(ValueError):
+            queue_codec.unpack("invalid")
+
+    def test_max_messages(self, settings):
+        settings.ALARM_QUEUE_PACKED_ENCODING = False
+        assert queue_codec.max_messages(1000) == 1000
+        settings.ALARM_QUEUE_PACKED_ENCODING = True
+        settings.ALARM_QUEUE_PACKED_CHUNK_SIZE = 200
+        assert queue_codec.max_messages(1000) == 5
+        assert queue_codec.max_messages(10) == 1
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from alarm_backends.management.hashring import HashRing
+
+NODES = {"127.0.0.1": 1, "127.0.0.2": 1, "127.0.0.3": 1}
+
+
+def _node_loads(node_targets, loads):
+    return {node: sum(loads[str(target)] for target in targets) for node, targets in node_targets.items()}
+
+
+class TestHashRing(object):
+    def setup_method(self):
+        HashRing.clear_cache()
+
+    def test_incremental_build(self):
+        nodes = dict(NODES)
+        nodes["127.0.0.4"] = 1
+        HashRing.clear_cache()
+        expected = HashRing(nodes)
+        HashRing.clear_cache()
+
+        # 节点变更时复用已有节点的虚拟节点，结果与重新计算一致
+        HashRing(NODES)
+        incremental = HashRing(nodes)
+        assert incremental.ring == expected.ring
+        assert incremental.hash2node == expected.hash2node
+        assert [incremental.get_node(i) for i in range(100)] == [expected.get_node(i) for i in range(100)]
+
+        # 节点不变时复用哈希环
+        assert HashRing(nodes).ring is incremental.ring
+
+    def test_iter_nodes(self):
+        ring = HashRing(NODES)
+        for key in range(20):
+            nodes = list(ring.iter_nodes(key))
+            assert nodes[0] == ring.get_node(key)
+            assert sorted(nodes) == sorted(NODES)
+
+    def test_dispatch_with_load(self):
+        ring = HashRing(NODES)
+        targets = list(range(30))
+        heavy_node = ring.get_node(0)
+        heavy_targets = [target for target in targets if ring.get_node(target) == heavy_node][:3]
+        loads = {str(target): 50 if target in heavy_targets else 1 for target in targets}
+
+        node_targets = ring.dispatch_with_load(targets, loads)
+        assert sorted(sum(node_targets.values(), [])) == targets
+        capacity = sum(loads.values()) / len(NODES) * 1.25
+        assert all(load <= capacity for load in _node_loads(node_targets, loads).values())
+
+        # 不允许迁移时，与哈希环分配一致
+        node_targets = ring.dispatch_with_load(targets, loads, max_moves=0)
+        assert all(ring.get_node(target) == node for node, targets in node_targets.items() for target in targets)
+
+        # 限制迁移数量
+        node_targets = ring.dispatch_with_load(targets, loads, max_moves=1)
+        moved = [t for node, node_targets in node_targets.items() for t in node_targets if ring.get_node(t) != node]
+        assert len(moved) == 1
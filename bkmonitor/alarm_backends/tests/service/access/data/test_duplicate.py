@@ -11,11 +11,17 @@ specific language governing permissions and limitations under the License.
 
 
 import copy
+import threading
 
 import fakeredis
+import mock
 import pytest
 
-from alarm_backends.service.access.data.duplicate import Duplicate
+from alarm_backends.service.access.data.duplicate import (
+    RECENT_RECORD_IDS,
+    Duplicate,
+    RecentRecordIdCache,
+)
 
 from .config import STANDARD_DATA
 
@@ -32,6 +38,7 @@ class TestDuplicate(object):
     def setup_method(self, method):
         redis = fakeredis.FakeRedis(decode_responses=True)
         redis.flushall()
+        RECENT_RECORD_IDS.clear()
 
     def test_duplicate(self):
         strategy_group_key = "123456789"
@@ -65,3 +72,56 @@ class TestDuplicate(object):
         assert dup.is_duplicate(record_1) is True
         assert dup.is_duplicate(record_2) is True
         assert dup.is_duplicate(record) is False
+
+    def test_prefetch(self):
+        strategy_group_key = "123456789"
+        records = []
+        for offset in range(3):
+            raw_data = copy.deepcopy(STANDARD_DATA)
+            raw_data["time"] += offset * 60
+            records.append(MockRecord(raw_data))
+
+        dup = Duplicate(strategy_group_key)
+        dup.add_record(records[0])
+        dup.add_record(records[1])
+        dup.refresh_cache()
+
+        # 本地缓存失效后，仍可通过 redis 批量确认
+        RECENT_RECORD_IDS.clear()
+        dup = Duplicate(strategy_group_key, batch=True)
+        dup.prefetch(records)
+        with mock.patch.object(dup, "prefetch") as prefetch:
+            assert [dup.is_duplicate(record) for record in records] == [True, True, False]
+            prefetch.assert_not_called()
+
+    def test_legacy_mode(self):
+        strategy_group_key = "123456789"
+        record = MockRecord(copy.deepcopy(STANDARD_DATA))
+
+        dup = Duplicate(strategy_group_key, batch=False)
+        assert dup.is_duplicate(record) is False
+        dup.add_record(record)
+        dup.refresh_cache()
+
+        dup = Duplicate(strategy_group_key, batch=False)
+        assert dup.is_duplicate(record) is True
+
+
+class TestRecentRecordIdCache(object):
+    def test_concurrent_access(self):
+        cache = RecentRecordIdCache(max_size=50, ttl=60)
+
+        def worker(index):
+            for i in range(1000):
+                dup_key = f"{index}.{i % 20}"
+                cache.add(dup_key, {str(i)})
+                cache.contains(dup_key, str(i))
+
+        # 多线程并发读写时，LRU 淘汰不会出错，容量统计保持一致
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert cache.size == sum(len(record_ids) for _, record_ids in cache._data.values())
+        assert cache.size <= 50
@@ -12,13 +12,18 @@ specific language governing permissions and limitations under the License.
 
 import copy
 
-from alarm_backends.core.cache.cmdb import HostManager, ServiceInstanceManager
+from alarm_backends.core.cache import clear_mem_cache
+from alarm_backends.core.cache.cmdb import (
+    HostIDManager,
+    HostManager,
+    ServiceInstanceManager,
+)
 from alarm_backends.core.cache.strategy import StrategyCacheManager
 from alarm_backends.core.control.strategy import Strategy
 from alarm_backends.service.access.data.fullers import TopoNodeFuller
 from alarm_backends.service.access.data.records import DataRecord
 
-from .config import RAW_DATA, STRATEGY_CONFIG
+from .config import RAW_DATA, RAW_DATA_ZERO, STRATEGY_CONFIG
 
 
 class MockTopoNode(object):
@@ -86,3 +91,83 @@ class TestTopoNodeFuller(object):
         assert service_topo_node == ["biz|2", "module|1", "set|1"]
 
         assert record.dimensions["bk_host_id"] == 0
+
+    def test_full_many(self, mocker):
+        mocker.patch.object(StrategyCacheManager, "get_strategy_by_id", return_value=copy.deepcopy(STRATEGY_CONFIG))
+        topo_link = {"module|1": [MockTopoNode("biz|2"), MockTopoNode("module|1"), MockTopoNode("set|1")]}
+        hosts = {"127.0.0.1|0": MockHost(topo_link)}
+        service_instances = {"1": MockServiceInstance(topo_link)}
+        get_hosts = mocker.patch.object(
+            HostManager, "multi_get_with_dict", side_effect=lambda keys: {key: hosts.get(key) for key in keys}
+        )
+        get_service_instances = mocker.patch.object(
+            ServiceInstanceManager,
+            "multi_get_with_dict",
+            side_effect=lambda keys: {key: service_instances.get(key) for key in keys},
+        )
+        clear_mem_cache("host_cache")
+
+        strategy = Strategy(1)
+        strategy.items[0].query_configs[0]["agg_dimension"].append("bk_target_service_instance_id")
+        service_raw_data = dict(RAW_DATA_ZERO, bk_target_service_instance_id=1)
+        records = [
+            DataRecord(strategy.items[0], copy.deepcopy(raw_data))
+            for raw_data in [RAW_DATA, RAW_DATA, RAW_DATA_ZERO, service_raw_data]
+        ]
+        TopoNodeFuller().full_many(records)
+
+        # 同一批次中的主机及服务实例只查询一次
+        get_hosts.assert_called_once()
+        assert set(get_hosts.call_args[0][0]) == {"127.0.0.1|0", "127.0.0.2|0"}
+        get_service_instances.assert_called_once()
+        assert set(get_service_instances.call_args[0][0]) == {"1"}
+
+        for record in records[:2]:
+            assert sorted(record.dimensions["bk_topo_node"]) == ["biz|2", "module|1", "set|1"]
+            assert record.dimensions["bk_host_id"] == 0
+        # 相同主机的拓扑节点列表相互独立
+        assert records[0].dimensions["bk_topo_node"] is not records[1].dimensions["bk_topo_node"]
+
+        assert "bk_topo_node" not in records[2].dimensions
+
+        assert sorted(records[3].dimensions["bk_topo_node"]) == ["biz|2", "module|1", "set|1"]
+        assert records[3].dimensions["bk_target_ip"] == "127.0.0.1"
+        assert "bk_host_id" not in records[3].dimensions
+        clear_mem_cache("host_cache")
+
+    def test_full_many_by_host_id(self, mocker):
+        mocker.patch.object(StrategyCacheManager, "get_strategy_by_id", return_value=copy.deepcopy(STRATEGY_CONFIG))
+        topo_link = {"module|1": [MockTopoNode("biz|2"), MockTopoNode("module|1"), MockTopoNode("set|1")]}
+        host_1, host_3 = MockHost(topo_link), MockHost(topo_link)
+        host_1.ip, host_1.bk_cloud_id = "127.0.0.1", 0
+        host_3.ip, host_3.bk_cloud_id = "127.0.0.3", 0
+        hosts = {"1": host_1, "127.0.0.1|0": host_1, "127.0.0.3|0": host_3}
+        get_hosts = mocker.patch.object(
+            HostManager, "multi_get_with_dict", side_effect=lambda keys: {key: hosts.get(key) for key in keys}
+        )
+        host_keys = {"3": "127.0.0.3|0"}
+        get_host_keys = mocker.patch.object(
+            HostIDManager, "multi_get_with_dict", side_effect=lambda keys: {key: host_keys.get(key) for key in keys}
+        )
+        get_by_id = mocker.patch.object(HostManager, "get_by_id")
+        clear_mem_cache("host_cache")
+
+        strategy = Strategy(1)
+        strategy.items[0].query_configs[0]["agg_dimension"].append("bk_host_id")
+        records = [
+            DataRecord(strategy.items[0], dict(RAW_DATA, bk_host_id=bk_host_id, bk_target_ip=""))
+            for bk_host_id in [1, 3, 4]
+        ]
+        TopoNodeFuller().full_many(records)
+
+        # 主机ID未命中时直接通过主机ID与IP的映射批量获取，不再逐个调用 get_by_id
+        get_by_id.assert_not_called()
+        get_host_keys.assert_called_once()
+        assert set(get_host_keys.call_args[0][0]) == {"3", "4"}
+        assert set(get_hosts.call_args_list[0][0][0]) == {"1", "3", "4"}
+
+        assert records[0].dimensions["bk_target_ip"] == "127.0.0.1"
+        assert records[1].dimensions["bk_target_ip"] == "127.0.0.3"
+        assert sorted(records[1].dimensions["bk_topo_node"]) == ["biz|2", "module|1", "set|1"]
+        assert not records[2].dimensions.get("bk_target_ip")
+        assert "bk_topo_node" not in records[2].dimensions
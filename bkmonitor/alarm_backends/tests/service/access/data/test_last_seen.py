@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+
+import mock
+
+from alarm_backends.core.cache.key import NO_DATA_LAST_SEEN_KEY
+from alarm_backends.core.control.mixins.nodata import CheckMixin
+from alarm_backends.service.access.data.last_seen import (
+    list_last_seen_data,
+    update_last_seen,
+)
+
+
+class MockRecord(object):
+    def __init__(self, ip, time):
+        self.data = {"dimensions": {"bk_target_ip": ip, "bk_target_cloud_id": "0", "device": "eth0"}}
+        self.time = time
+
+
+def get_item():
+    item = mock.MagicMock()
+    item.id = 1
+    item.strategy.strategy_id = 1
+    item.query_configs = [{"agg_interval": 60}]
+    item.no_data_config = {"is_enabled": True, "agg_dimension": ["bk_target_ip", "bk_target_cloud_id"]}
+    return item
+
+
+class TestLastSeen(object):
+    def setup_method(self, method):
+        NO_DATA_LAST_SEEN_KEY.client.flushall()
+
+    def test_update_last_seen(self):
+        item = get_item()
+        update_last_seen(
+            item,
+            [MockRecord("127.0.0.1", 120), MockRecord("127.0.0.1", 180), MockRecord("127.0.0.2", 60)],
+        )
+
+        cache_key = NO_DATA_LAST_SEEN_KEY.get_key(strategy_id=1, item_id=1)
+        assert NO_DATA_LAST_SEEN_KEY.client.hlen(cache_key) == 2
+
+        data = sorted(list_last_seen_data(item, 180), key=lambda d: d["time"])
+        assert [d["time"] for d in data] == [60, 180]
+        assert data[1]["dimensions"] == {"bk_target_ip": "127.0.0.1", "bk_target_cloud_id": "0"}
+
+        # 返回所有未过期的维度，晚于检测时间点的上报时间按检测时间点返回
+        data = sorted(list_last_seen_data(item, 120), key=lambda d: d["time"])
+        assert [(d["dimensions"]["bk_target_ip"], d["time"]) for d in data] == [
+            ("127.0.0.2", 60),
+            ("127.0.0.1", 120),
+        ]
+
+    def test_stale_point(self):
+        # 按维度与上次检测记录的上报时间比对，上报时间未更新视为无新数据，迟到的数据视为有新数据
+        assert CheckMixin._is_stale_point(120, b"120", require_new_data=True)
+        assert not CheckMixin._is_stale_point(120, b"60", require_new_data=True)
+        assert not CheckMixin._is_stale_point(120, b"120")
+
+    def test_missing_dimensions(self):
+        item = get_item()
+        record = MockRecord("127.0.0.1", 60)
+        record.data["dimensions"].pop("bk_target_cloud_id")
+        update_last_seen(item, [record])
+        assert list_last_seen_data(item, 60) == []
+
+    def test_expire_dimensions(self):
+        item = get_item()
+        update_last_seen(item, [MockRecord("127.0.0.1", 60), MockRecord("127.0.0.2", 3600)])
+
+        # 长时间未上报的维度被清理
+        data = list_last_seen_data(item, 60 * 62)
+        assert [d["dimensions"]["bk_target_ip"] for d in data] == ["127.0.0.2"]
+        cache_key = NO_DATA_LAST_SEEN_KEY.get_key(strategy_id=1, item_id=1)
+        assert NO_DATA_LAST_SEEN_KEY.client.hlen(cache_key) == 1
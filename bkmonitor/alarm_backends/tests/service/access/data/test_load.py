@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import mock
+
+from alarm_backends.core.cache.key import (
+    ACCESS_DATA_LOAD_KEY,
+    ACCESS_DATA_LOAD_WINDOW_KEY,
+)
+from alarm_backends.service.access.data.load import (
+    LOAD_WINDOW,
+    get_biz_loads,
+    get_dispatch_window,
+    record_process_time,
+)
+
+
+class TestLoad(object):
+    def setup_method(self, method):
+        ACCESS_DATA_LOAD_WINDOW_KEY.client.flushall()
+
+    def test_dispatch_window_shared(self):
+        now = 100 * LOAD_WINDOW
+        with mock.patch("alarm_backends.service.access.data.load.time.time", return_value=now - 1):
+            assert get_dispatch_window() == 97
+
+        # 时钟已进入下一个窗口的机器，仍使用已写入的窗口
+        with mock.patch("alarm_backends.service.access.data.load.time.time", return_value=now + 1):
+            assert get_dispatch_window() == 97
+
+        # 窗口过期后重新选择
+        ACCESS_DATA_LOAD_WINDOW_KEY.client.delete(ACCESS_DATA_LOAD_WINDOW_KEY.get_key())
+        with mock.patch("alarm_backends.service.access.data.load.time.time", return_value=now + 1):
+            assert get_dispatch_window() == 98
+
+    def test_get_biz_loads(self):
+        now = 100 * LOAD_WINDOW
+        with mock.patch("alarm_backends.service.access.data.load.time.time", return_value=now - 2 * LOAD_WINDOW):
+            record_process_time(2, 1.5)
+            record_process_time(2, 1)
+            record_process_time(3, 4)
+        ACCESS_DATA_LOAD_KEY.client.hset(ACCESS_DATA_LOAD_KEY.get_key(window=98), "4", "invalid")
+
+        with mock.patch("alarm_backends.service.access.data.load.time.time", return_value=now):
+            assert get_biz_loads() == {"2": 2.5, "3": 4.0}
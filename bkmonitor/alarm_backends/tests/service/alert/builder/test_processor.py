@@ -1081,3 +1081,18 @@ class TestProcessor(TestCase):
         alert._is_new = False
         alert = AlertBuilder().alert_qos_handle(alert)
         self.assertEqual(alert.status, "CLOSED")
+
+    @mock.patch("alarm_backends.service.composite.tasks.check_action_and_composite_batch.delay")
+    @mock.patch("alarm_backends.service.composite.tasks.check_action_and_composite.delay")
+    def test_send_signal_batch(self, composite_patch, composite_batch_patch):
+        alerts = [mock.MagicMock(key=f"key{i}", status="ABNORMAL", is_blocked=i == 0) for i in range(6)]
+
+        builder = AlertBuilder()
+        with self.settings(ALERT_SIGNAL_BATCH_SIZE=2):
+            builder.send_signal(alerts)
+
+        composite_patch.assert_not_called()
+        self.assertEqual(composite_batch_patch.call_count, 3)
+        alert_signals = sum([call[1]["alert_signals"] for call in composite_batch_patch.call_args_list], [])
+        # 被熔断的告警不发送信号
+        self.assertEqual(alert_signals, [{"alert_key": f"key{i}", "alert_status": "ABNORMAL"} for i in range(1, 6)])
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest import TestCase
+
+import mock
+
+from alarm_backends.core.alert import Alert
+from alarm_backends.core.alert.alert import AlertKey
+from alarm_backends.core.cache.strategy import StrategyCacheManager
+from alarm_backends.service.composite import tasks
+from alarm_backends.service.composite.processor import CompositeProcessor
+from core.errors.alert import AlertNotFoundError
+
+
+def make_alert(alert_id):
+    return Alert(
+        {
+            "id": alert_id,
+            "alert_name": "测试关联告警",
+            "severity": 2,
+            "strategy_id": 0,
+            "event": {"bk_biz_id": 2},
+        }
+    )
+
+
+def make_signal(alert_id):
+    return {"alert_key": AlertKey(alert_id=alert_id, strategy_id=0), "alert_status": "ABNORMAL"}
+
+
+class TestCheckActionAndCompositeBatch(TestCase):
+    def setUp(self) -> None:
+        self.process_alert_mock = mock.patch.object(tasks, "process_alert")
+        self.process_alert = self.process_alert_mock.start()
+        self.apply_async_mock = mock.patch.object(tasks.check_action_and_composite, "apply_async")
+        self.apply_async = self.apply_async_mock.start()
+
+    def tearDown(self) -> None:
+        self.process_alert_mock.stop()
+        self.apply_async_mock.stop()
+
+    def test_mget_miss(self):
+        alert = make_alert("1")
+        signals = [make_signal("1"), make_signal("2")]
+        with mock.patch.object(Alert, "mget", return_value=[alert]), mock.patch.object(
+            Alert, "get", side_effect=AlertNotFoundError
+        ) as get_alert:
+            tasks.check_action_and_composite_batch(signals)
+
+        # 批量未命中的告警先通过 Alert.get 兜底查询，仍找不到时才推迟检测
+        get_alert.assert_called_once_with(signals[1]["alert_key"])
+        self.apply_async.assert_called_once()
+        self.assertEqual(self.apply_async.call_args[1]["kwargs"]["alert_key"], signals[1]["alert_key"])
+        self.assertEqual(self.apply_async.call_args[1]["kwargs"]["retry_times"], 1)
+        self.assertEqual(self.process_alert.call_count, 1)
+        self.assertIs(self.process_alert.call_args[0][0], alert)
+
+    def test_mget_miss_found_by_get(self):
+        alert = make_alert("2")
+        with mock.patch.object(Alert, "mget", return_value=[]), mock.patch.object(Alert, "get", return_value=alert):
+            tasks.check_action_and_composite_batch([make_signal("2")])
+
+        self.apply_async.assert_not_called()
+        self.assertEqual(self.process_alert.call_count, 1)
+        self.assertIs(self.process_alert.call_args[0][0], alert)
+
+    def test_mget_error(self):
+        alerts = {"1": make_alert("1"), "2": make_alert("2")}
+        with mock.patch.object(Alert, "mget", side_effect=Exception("redis error")), mock.patch.object(
+            Alert, "get", side_effect=lambda alert_key: alerts[alert_key.alert_id]
+        ) as get_alert:
+            tasks.check_action_and_composite_batch([make_signal("1"), make_signal("2")])
+
+        # 批量获取失败时逐条处理
+        self.assertEqual(get_alert.call_count, 2)
+        self.assertEqual([call[0][0] for call in self.process_alert.call_args_list], list(alerts.values()))
+        self.apply_async.assert_not_called()
+
+
+class TestCompositeSharedCache(TestCase):
+    def test_strategy_lookup_dedupe(self):
+        alerts = [make_alert("1"), make_alert("2"), make_alert("3")]
+        with mock.patch.object(Alert, "mget", return_value=alerts), mock.patch.object(
+            CompositeProcessor, "process_single_strategy"
+        ), mock.patch.object(
+            StrategyCacheManager, "get_fta_alert_strategy_ids", return_value={"2": [1, 2]}
+        ) as get_strategy_ids, mock.patch.object(
+            StrategyCacheManager, "get_strategy_by_ids", return_value=[]
+        ) as get_strategies:
+            tasks.check_action_and_composite_batch([make_signal(alert.id) for alert in alerts])
+
+        # 同一批次的告警共享策略缓存，相同告警名称只查询一次
+        get_strategy_ids.assert_called_once_with(alert_name="测试关联告警")
+        get_strategies.assert_called_once_with([1, 2])
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from datetime import datetime, timedelta, timezone
+
+import arrow
+
+from alarm_backends.service.converge.shield.shield_index import AlertShieldIndex
+
+
+def _config(shield_id, category, dimension_config, scope_type="", hours=1):
+    now = datetime.now(tz=timezone.utc)
+    return {
+        "id": shield_id,
+        "bk_biz_id": 2,
+        "category": category,
+        "scope_type": scope_type,
+        "description": "",
+        "begin_time": now - timedelta(hours=1),
+        "end_time": now + timedelta(hours=hours),
+        "dimension_config": dimension_config,
+        "cycle_config": {"type": 1, "week_list": [], "day_list": [], "begin_time": "", "end_time": ""},
+    }
+
+
+CONFIGS = [
+    _config(1, "strategy", {"strategy_id": [1, 2], "level": [1]}),
+    _config(
+        2,
+        "strategy",
+        {"strategy_id": [3], "bk_topo_node": [{"bk_obj_id": "set", "bk_inst_id": 1}]},
+        scope_type="node",
+    ),
+    _config(3, "scope", {"bk_target_ip": ["127.0.0.1"]}),
+    _config(
+        4,
+        "dimension",
+        {
+            "dimension_conditions": [
+                {"key": "device", "value": ["eth0"], "method": "eq"},
+                {"key": "device", "value": ["eth1"], "method": "eq", "condition": "or"},
+            ]
+        },
+    ),
+    _config(5, "dimension", {"dimension_conditions": [{"key": "device", "value": ["eth"], "method": "include"}]}),
+    _config(6, "strategy", {"strategy_id": [1]}, hours=-0.5),
+]
+
+
+def _ids(shield_objs):
+    return [shield_obj.id for shield_obj in shield_objs]
+
+
+def test_shield_index():
+    index = AlertShieldIndex(CONFIGS)
+    assert _ids(index.shield_objs[position] for position in index.unindexed) == [5]
+
+    now = arrow.now()
+    dimensions = [
+        {"strategy_id": 1, "level": 1},
+        {"strategy_id": 2, "level": 2},
+        {"strategy_id": 3, "bk_topo_node": ["biz|2", "set|1", "module|3"]},
+        {"strategy_id": 4, "bk_target_ip": "127.0.0.1", "device": "eth1"},
+        {"strategy_id": 5, "device": "lo"},
+    ]
+    for dimension in dimensions:
+        candidates = index.get_candidates(dimension, now)
+        # 已结束的屏蔽配置不会成为候选
+        assert 6 not in _ids(candidates)
+
+        # 候选配置的匹配结果与逐条匹配一致
+        expected = [
+            shield_obj
+            for shield_obj in index.shield_objs
+            if index.is_time_in_range(index.shield_objs.index(shield_obj), now.timestamp)
+            and shield_obj.is_dimension_match(dimension, now)
+        ]
+        assert [obj for obj in candidates if obj.is_dimension_match(dimension, now)] == expected
+
+    assert _ids(index.get_candidates(dimensions[0], now)) == [1, 5]
+    assert _ids(index.get_candidates(dimensions[2], now)) == [2, 5]
+    assert _ids(index.get_candidates(dimensions[3], now)) == [3, 4, 5]
+    assert _ids(index.get_candidates(dimensions[4], now)) == [5]
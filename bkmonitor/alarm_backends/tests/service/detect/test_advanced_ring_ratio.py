@@ -95,6 +95,21 @@ class TestAdvancedRingRatio(object):
             assert len(detect_engine.detect(datapoint100)) == 0
             assert len(detect_engine.detect(datapoint_1)) == 1
 
+    def test_batch_filter_with_different_intervals(self):
+        history_points = {1: [datapoint200], 2: [datapoint1, datapoint99]}
+        with mock.patch(
+            "alarm_backends.service.detect.strategy." "advanced_ring_ratio.AdvancedRingRatio.history_point_fetcher",
+            side_effect=lambda data_point, cycles: history_points[cycles],
+        ):
+            # 下降比较前1个周期(200)，上升比较前2个周期的均值(50)
+            algorithms_config = {"floor": 50, "ceil": 200, "floor_interval": 1, "ceil_interval": 2}
+            detect_engine = AdvancedRingRatio(config=algorithms_config, unit="percent")
+            data_points = [datapoint200, datapoint101, datapoint99]
+            candidates = detect_engine.batch_filter(data_points)
+            # 仅上升超过阈值的数据点(200)不能被过滤
+            assert candidates == [True, False, True]
+            assert candidates == [bool(detect_engine.detect(point)) for point in data_points]
+
     def test_anomaly_message(self):
         from .test_threshold import mock_datapoint_with_value
 
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+
+import mock
+
+from alarm_backends.core.cache.key import HISTORY_SERIES_KEY
+from alarm_backends.service.detect.history import HistorySeriesStore, get_group
+from alarm_backends.service.detect.strategy.advanced_ring_ratio import AdvancedRingRatio
+from alarm_backends.service.detect.strategy.simple_ring_ratio import SimpleRingRatio
+
+
+class MockPoint(object):
+    def __init__(self, series_md5, value, timestamp):
+        self.record_id = "{}.{}".format(series_md5, timestamp)
+        self.value = value
+        self.timestamp = timestamp
+        self.dimensions = {"ip": series_md5}
+
+
+def get_item():
+    item = mock.MagicMock()
+    item.id = 1
+    item.strategy.id = 1
+    item.query_configs = [{"agg_interval": 60}]
+    return item
+
+
+class TestHistorySeriesStore(object):
+    def setup_method(self, method):
+        HISTORY_SERIES_KEY.client.flushall()
+
+    def test_save_and_load(self, settings):
+        settings.DETECT_HISTORY_SERIES_WINDOW = 2
+        item = get_item()
+        group = get_group(60, 60)
+
+        store = HistorySeriesStore(item)
+        store.load(["a", "b"])
+        store.add(group, [MockPoint("a", 1, 600), MockPoint("a", 2, 660), MockPoint("b", 3, 660)])
+        store.mark_covered(group, 600, 720)
+        store.save()
+
+        store = HistorySeriesStore(item)
+        store.load(["a"])
+        assert store.get_values(["a", "a", "b"], [600, 660, 660]) == [1, 2, None]
+        assert store.is_covered(600, 720)
+        assert not store.is_covered(600, 780)
+        # 时间窗口推移后，只需查询新增的时间范围
+        assert store.get_missing_range(group, 660, 780) == (720, 780)
+
+    def test_ring_rotate(self, settings):
+        settings.DETECT_HISTORY_SERIES_WINDOW = 2
+        item = get_item()
+        group = get_group(60, 60)
+
+        store = HistorySeriesStore(item)
+        store.load(["a"])
+        store.add(group, [MockPoint("a", 1, 600), MockPoint("a", 2, 660)])
+        store.add(group, [MockPoint("a", 4, 780)])
+        store.mark_covered(group, 600, 660)
+        store.mark_covered(group, 660, 840)
+        store.save()
+
+        # 缓冲区长度为 3，600 的数据已被覆盖
+        assert store.coverage[group] == [660, 840]
+        store = HistorySeriesStore(item)
+        store.load(["a"])
+        assert store.get_values(["a"] * 4, [600, 660, 720, 780]) == [None, 2, None, 4]
+
+
+class TestHistoryPointFetcher(object):
+    def test_fetch_history_point(self):
+        detect_engine = SimpleRingRatio(config={"floor": 50, "ceil": None})
+        item = get_item()
+        detect_engine._history_store = store = HistorySeriesStore(item)
+        store.lookup[("a", 600)] = 200
+
+        point = MockPoint("a", 99, 660)
+        point.item = item
+        point.unit = "%"
+        history_point = detect_engine.fetch_history_point(item, point, 600)
+        assert history_point.value == 200
+        assert history_point.dimensions == {"ip": "a"}
+        assert detect_engine.fetch_history_point(item, point, 540) is None
+        assert detect_engine.fetch_history_values([point], 60) == [200]
+        assert detect_engine.batch_filter([point]) == [True]
+
+        detect_engine.set_default(0)
+        assert detect_engine.fetch_history_point(item, point, 540).value == 0
+
+    def test_batch_history_values_with_different_intervals(self):
+        algorithms_config = {"floor": 50, "ceil": 200, "floor_interval": 2, "ceil_interval": 1}
+        detect_engine = AdvancedRingRatio(config=algorithms_config, unit="%")
+        item = get_item()
+        detect_engine._history_store = store = HistorySeriesStore(item)
+        store.lookup.update({("a", 600): 10, ("a", 540): 390, ("b", 600): 100, ("b", 540): 100})
+
+        points = [MockPoint("a", 101, 660), MockPoint("a", 99, 660), MockPoint("b", 200, 660)]
+        for point in points:
+            point.item = item
+            point.unit = "%"
+        # 下降比较前2个周期的均值，上升比较前1个周期的值
+        assert detect_engine.batch_history_values(points) == [(200, 10), (200, 10), (100, 100)]
+        # 仅上升超过阈值的数据点(101)不能被过滤
+        assert detect_engine.batch_filter(points) == [True, True, False]
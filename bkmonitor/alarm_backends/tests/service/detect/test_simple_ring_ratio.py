@@ -102,6 +102,35 @@ class TestSimpleRingRatio(object):
             assert len(anomaly_result) == 1
             assert anomaly_result[0].anomaly_message == "avg(测试指标)较前一时刻(99%)下降超过50.0%, 当前值0%"
 
+    def test_batch_filter(self):
+        with mock.patch(
+            "alarm_backends.service.detect.strategy." "simple_ring_ratio.SimpleRingRatio.history_point_fetcher",
+            return_value=datapoint99,
+        ):
+            algorithms_config = {"floor": 50, "ceil": 100}
+            detect_engine = SimpleRingRatio(config=algorithms_config)
+            data_points = [datapoint200, datapoint0, datapoint100, datapoint99]
+            candidates = detect_engine.batch_filter(data_points)
+            assert candidates == [bool(detect_engine.detect(point)) for point in data_points]
+            assert candidates == [True, True, False, False]
+
+    def test_batch_context_reuse(self, settings):
+        settings.DETECT_BATCH_ENABLED = True
+        with mock.patch(
+            "alarm_backends.service.detect.strategy." "simple_ring_ratio.SimpleRingRatio.history_point_fetcher",
+            return_value=datapoint99,
+        ) as history_point_fetcher:
+            from .test_threshold import mock_datapoint_with_value
+
+            data_points = [mock_datapoint_with_value(200), mock_datapoint_with_value(100)]
+            detect_engine = SimpleRingRatio(config={"floor": 50, "ceil": 100})
+            anomaly_result = detect_engine.detect_records(data_points, 1)
+            assert len(anomaly_result) == 1
+            assert anomaly_result[0].anomaly_message == "avg(测试指标)较前一时刻(99%)上升超过100.0%, 当前值200%"
+            # 候选点逐点检测时复用预筛选的上下文，每个点只获取一次历史数据
+            assert history_point_fetcher.call_count == 2
+            assert detect_engine._batch_contexts == {}
+
     def test_detect_with_invalid_datapoint(self):
         algorithms_config = {"floor": 99, "ceil": 99}
         with pytest.raises(InvalidDataPoint):
@@ -259,3 +259,25 @@ class TestThreshold(object):
 
         anomaly_records = detect_engine.detect_records([datapoint], 1)
         assert anomaly_records[0].anomaly_message == "avg(测试指标) >= 1.0KiB, 当前值1.000977KiB"
+
+    def test_batch_filter(self):
+        algorithms_config = [
+            [{"threshold": 6, "method": "gt"}, {"threshold": 99, "method": "lte"}, {"threshold": 50, "method": "neq"}],
+            [{"threshold": 6, "method": "eq"}],
+        ]
+        detect_engine = Threshold(config=algorithms_config)
+        data_points = [datapoint99, datapoint50, datapoint6, datapoint_example]
+        candidates = detect_engine.batch_filter(data_points)
+        assert candidates == [bool(detect_engine.detect(point)) for point in data_points]
+        assert candidates == [True, False, True, False]
+
+        anomaly_result = detect_engine.detect_records(data_points, 1)
+        assert [ap.data_point for ap in anomaly_result] == [datapoint99, datapoint6]
+
+    def test_batch_filter_with_invalid_value(self):
+        algorithms_config = [[{"threshold": 50.0, "method": "gte"}]]
+        detect_engine = Threshold(config=algorithms_config)
+        invalid_point = mock_datapoint_with_value(None)
+        # 无法批量计算的点交由逐点检测处理
+        assert detect_engine.batch_filter([invalid_point, datapoint6]) == [True, False]
+        assert detect_engine.detect_records([invalid_point, datapoint6], 1) == []
@@ -11,6 +11,7 @@ specific language governing permissions and limitations under the License.
 import copy
 
 import arrow
+import mock
 from django.test import TestCase
 
 from alarm_backends.core.cache.key import CHECK_RESULT_CACHE_KEY
@@ -389,6 +390,19 @@ class TestChecker(TestCase):
         self.assertEqual(anomaly_level, -1)
         self.assertListEqual(anomaly_timestamps, [])
 
+    def test_prefetch_check_results(self):
+        for anomaly_count in [0, 1, 2, 3]:
+            self.clear_check_result()
+            self.insert_check_result(anomaly_count)
+            expected = AnomalyChecker(POINT, STRATEGY, 1).check_anomaly()
+
+            checker = AnomalyChecker(POINT, STRATEGY, 1)
+            windows = AnomalyChecker.prefetch_check_results([checker])
+            self.assertEqual(set(windows.keys()), {self.gen_check_result_key(level) for level in POINT["anomaly"]})
+            with mock.patch.object(CHECK_RESULT_CACHE_KEY.client, "zrangebyscore") as zrangebyscore:
+                self.assertEqual(checker.check_anomaly(), expected)
+                zrangebyscore.assert_not_called()
+
     def test_gen_event_record(self):
         checker = AnomalyChecker(POINT, STRATEGY, 1)
         record = checker.gen_event_record(-1, [])
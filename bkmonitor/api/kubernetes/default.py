@@ -39,6 +39,7 @@ from bkmonitor.utils.kubernetes import (
     KubernetesContainerJsonParser,
     KubernetesEndpointJsonParser,
     KubernetesNodeJsonParser,
+    KubernetesOwnerReferenceGraph,
     KubernetesPodJsonParser,
     KubernetesPodMonitorJsonParser,
     KubernetesServiceJsonParser,
@@ -485,6 +486,7 @@ class FetchK8sPodListByClusterResource(CacheResource):
     def get_replica_set_field():
         field = [
             "data.metadata.name",
+            "data.metadata.namespace",
             "data.metadata.ownerReferences",
         ]
         return ",".join(field)
@@ -515,6 +517,7 @@ class FetchK8sPodListByClusterResource(CacheResource):
     def get_job_field():
         field = [
             "data.metadata.name",
+            "data.metadata.namespace",
             "data.metadata.ownerReferences",
         ]
         return ",".join(field)
@@ -534,6 +537,14 @@ class FetchK8sPodListByClusterResource(CacheResource):
                 {"cluster_id": bcs_cluster_id, "type": "Job", "field": job_field},
             ]
         )
+        # 构建一次归属关系索引，避免每个Pod遍历全量ReplicaSet和Job
+        owner_graph = KubernetesOwnerReferenceGraph(replica_set_list, job_list)
+        # 节点IP到节点名称的映射
+        node_name_map = {}
+        for node in node_list:
+            node_parser = KubernetesNodeJsonParser(node)
+            node_name_map[node_parser.node_ip] = node_parser.name
+
         data = []
         namespace_set = set(namespace_list)
         for pod in pod_data:
@@ -556,7 +567,7 @@ class FetchK8sPodListByClusterResource(CacheResource):
             pod_name = pod_parser.name
             status = pod_parser.service_status
 
-            workloads = pod_parser.get_workloads(replica_set_list, job_list)
+            workloads = pod_parser.get_workloads(owner_graph=owner_graph)
             workload_name = workloads["workload_name"]
             workload_type = workloads["workload_type"]
             owner_references = workloads["owner_references"]
@@ -577,12 +588,7 @@ class FetchK8sPodListByClusterResource(CacheResource):
             limits_memory = resources["limits_memory"]
 
             # 获得节点名称
-            node_name = ""
-            for node in node_list:
-                node_parser = KubernetesNodeJsonParser(node)
-                node_item_ip = node_parser.node_ip
-                if node_item_ip == node_ip:
-                    node_name = node_parser.name
+            node_name = node_name_map.get(node_ip, "")
 
             data.append(
                 {
@@ -1242,7 +1248,7 @@ class FetchK8sContainerListByClusterResource(CacheResource):
                 bcs_cluster_id = pod["bcs_cluster_id"]
                 labels = pod_parser.labels
 
-                container_parser = KubernetesContainerJsonParser(pod.get("pod", {}), container)
+                container_parser = KubernetesContainerJsonParser(pod.get("pod", {}), container, pod_parser)
                 container_name = container_parser.name
                 age = container_parser.age
                 status = container_parser.service_status
@@ -1532,6 +1538,13 @@ class FetchK8sWorkloadListByClusterResource(CacheResource):
         if not workload_type_list:
             workload_type_list = api.kubernetes.fetch_k8s_workload_type_list({"bcs_cluster_id": bcs_cluster_id})
         pod_list = api.kubernetes.fetch_k8s_pod_list_by_cluster({"bcs_cluster_id": bcs_cluster_id})
+        # 按顶层workload对Pod分组
+        workload_pods = {}
+        for pod in pod_list:
+            if pod.get("bcs_cluster_id") != bcs_cluster_id:
+                continue
+            key = (pod.get("workload_type"), pod.get("namespace"), pod.get("workload_name"))
+            workload_pods.setdefault(key, []).append(pod)
         workload_field = self.get_workload_field()
         for workload_type in workload_type_list:
             items = api.bcs_storage.fetch(
@@ -1562,22 +1575,12 @@ class FetchK8sWorkloadListByClusterResource(CacheResource):
                 limits_cpu = 0
                 requests_memory = 0
                 limits_memory = 0
-                for pod in pod_list:
-                    pod_workload_type = pod.get("workload_type", [])
-                    pod_workload_name = pod.get("workload_name", [])
-                    pod_namespace = pod.get("namespace", [])
-                    pod_bcs_cluster_id = pod.get("bcs_cluster_id", [])
-                    if (
-                        workload_type in pod_workload_type
-                        and workload_name in pod_workload_name
-                        and workload_namespace == pod_namespace
-                        and pod_bcs_cluster_id == bcs_cluster_id
-                    ):
-                        pod_name_list.append(pod.get("name"))
-                        requests_cpu += pod.get("requests_cpu", 0)
-                        limits_cpu += pod.get("limits_cpu", 0)
-                        requests_memory += pod.get("requests_memory", 0)
-                        limits_memory += pod.get("limits_memory", 0)
+                for pod in workload_pods.get((workload_type, workload_namespace, workload_name), []):
+                    pod_name_list.append(pod.get("name"))
+                    requests_cpu += pod.get("requests_cpu", 0)
+                    limits_cpu += pod.get("limits_cpu", 0)
+                    requests_memory += pod.get("requests_memory", 0)
+                    limits_memory += pod.get("limits_memory", 0)
 
                 # 忽略中间的workoad
                 item = {
@@ -41,6 +41,10 @@ DATABASE_CONNECTION_NAME = getattr(settings, "METADATA_DEFAULT_DATABASE_NAME", "
 #############################################################################
 DISCOVER_TIME_RANGE = "10m"
 DISCOVER_BATCH_SIZE = 10000
+# 单次发现处理的span数量(同一trace的span不拆分，单个trace超过此数量时整体处理)
+DISCOVER_SPAN_CHUNK_SIZE = 50000
+# 分页拉取span时PIT/scroll的保持时间
+DISCOVER_SEARCH_KEEP_ALIVE = "5m"
 
 
 ############################################################################
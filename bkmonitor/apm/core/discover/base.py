@@ -11,7 +11,6 @@ specific language governing permissions and limitations under the License.
 
 import abc
 import datetime
-import itertools
 import logging
 import traceback
 from abc import ABC
@@ -21,7 +20,6 @@ from apm import constants
 from apm.core.discover.precalculation.processor import PrecalculateProcessor
 from apm.core.discover.precalculation.storage import PrecalculateStorage
 from apm.models import ApmApplication, ApmTopoDiscoverRule, TraceDataSource
-from apm.utils.base import divide_biscuit
 from constants.apm import OtlpKey, SpanKind
 from opentelemetry.semconv.resource import ResourceAttributes
 
@@ -248,37 +246,104 @@ class TopoHandler:
             if not after_key:
                 break
 
-    def list_span_by_trace_ids(self, trace_ids, max_result_count):
-
-        if max_result_count >= constants.DISCOVER_BATCH_SIZE * len(trace_ids):
-            # 直接获取
-            query = {
-                "query": {"bool": {"must": [{"terms": {OtlpKey.TRACE_ID: trace_ids}}]}},
-                "size": constants.DISCOVER_BATCH_SIZE * len(trace_ids),
-            }
-            response = self.datasource.es_client.search(index=self.datasource.index_name, body=query)
-            hits = response["hits"]["hits"]
-            return [i["_source"] for i in hits]
+    def iter_trace_spans(self, trace_ids, page_size):
+        """
+        流式获取trace的span，按批次返回
+        同一trace的span不会被拆分到不同批次，每批span数量约为DISCOVER_SPAN_CHUNK_SIZE，内存占用不随trace数量增长
+        """
+        chunk = []
+        for page in self._iter_span_pages(trace_ids, page_size):
+            chunk.extend(page)
+            if len(chunk) < constants.DISCOVER_SPAN_CHUNK_SIZE:
+                continue
+
+            # 结果按trace_id排序，最后一个trace可能还有数据在下一页，留到下一批处理
+            last_trace_id = chunk[-1][OtlpKey.TRACE_ID]
+            index = len(chunk)
+            while index > 0 and chunk[index - 1][OtlpKey.TRACE_ID] == last_trace_id:
+                index -= 1
+
+            if not index:
+                # 单个trace超过批次大小，继续累积直到此trace结束
+                continue
+
+            yield chunk[:index]
+            chunk = chunk[index:]
+
+        if chunk:
+            yield chunk
+
+    def _iter_span_pages(self, trace_ids, page_size):
+        """按trace_id排序分页获取span，优先使用PIT + search_after，集群不支持时降级为scroll"""
+        es_client = self.datasource.es_client
+        query = {"bool": {"must": [{"terms": {OtlpKey.TRACE_ID: trace_ids}}]}}
+
+        pit_id = None
+        # ES 7.10 以下的客户端/集群不支持PIT
+        if hasattr(es_client, "open_point_in_time"):
+            try:
+                pit_id = es_client.open_point_in_time(
+                    index=self.datasource.index_name, keep_alive=constants.DISCOVER_SEARCH_KEEP_ALIVE
+                )["id"]
+            except Exception as e:  # noqa
+                logger.info(f"[TopoHandler] {self} open point in time failed, use scroll instead, error: {e}")
+
+        if pit_id:
+            yield from self._iter_span_pages_by_pit(es_client, pit_id, query, page_size)
         else:
-            # 使用scroll获取
-            res = []
-            query = {
-                "query": {"bool": {"must": [{"terms": {OtlpKey.TRACE_ID: trace_ids}}]}},
-                "size": constants.DISCOVER_BATCH_SIZE * len(trace_ids),
-            }
-            response = self.datasource.es_client.search(index=self.datasource.index_name, body=query, scroll="5m")
-            hits = response["hits"]["hits"]
-            res += [i["_source"] for i in hits]
+            yield from self._iter_span_pages_by_scroll(es_client, query, page_size)
 
-            scroll_id = response["_scroll_id"]
+    @classmethod
+    def _get_span_sort(cls):
+        return [{OtlpKey.TRACE_ID: "asc"}, {OtlpKey.SPAN_ID: "asc"}]
+
+    def _iter_span_pages_by_pit(self, es_client, pit_id, query, page_size):
+        search_after = None
+        try:
+            while True:
+                body = {
+                    "query": query,
+                    "size": page_size,
+                    "sort": self._get_span_sort(),
+                    "pit": {"id": pit_id, "keep_alive": constants.DISCOVER_SEARCH_KEEP_ALIVE},
+                }
+                if search_after:
+                    body["search_after"] = search_after
 
-            while len(hits):
-                response = self.datasource.es_client.scroll(scroll_id=scroll_id, scroll="5m")
+                response = es_client.search(body=body, request_timeout=60)
+                pit_id = response.get("pit_id", pit_id)
                 hits = response["hits"]["hits"]
-                res += [i["_source"] for i in hits]
+                if not hits:
+                    break
+
+                yield [i["_source"] for i in hits]
+
+                if len(hits) < page_size:
+                    break
+                search_after = hits[-1]["sort"]
+        finally:
+            try:
+                es_client.close_point_in_time(body={"id": pit_id})
+            except Exception as e:  # noqa
+                logger.warning(f"[TopoHandler] {self} close point in time failed, error: {e}")
+
+    def _iter_span_pages_by_scroll(self, es_client, query, page_size):
+        response = es_client.search(
+            index=self.datasource.index_name,
+            body={"query": query, "size": page_size, "sort": self._get_span_sort()},
+            scroll=constants.DISCOVER_SEARCH_KEEP_ALIVE,
+        )
+        scroll_id = response["_scroll_id"]
+        try:
+            hits = response["hits"]["hits"]
+            while hits:
+                yield [i["_source"] for i in hits]
 
-            self.datasource.es_client.clear_scroll(scroll_id=scroll_id)
-            return res
+                response = es_client.scroll(scroll_id=scroll_id, scroll=constants.DISCOVER_SEARCH_KEEP_ALIVE)
+                scroll_id = response.get("_scroll_id", scroll_id)
+                hits = response["hits"]["hits"]
+        finally:
+            es_client.clear_scroll(scroll_id=scroll_id)
 
     def _discover_handle(self, discover, spans, handle_type):
         def _topo_handle():
@@ -330,40 +395,37 @@ class TopoHandler:
         pre_calculate_storage = PrecalculateStorage(self.bk_biz_id, self.app_name)
         trace_id_count = 0
         span_count = 0
-        max_result_count, per_trace_size = self._get_trace_task_splits()
+        max_result_count, _ = self._get_trace_task_splits()
+        page_size = min(max_result_count, constants.DISCOVER_BATCH_SIZE)
+
+        # 预计算处理类每轮只构建一次，避免每个批次都查询应用及空间信息
+        pre_calculate_processor = None
+        if pre_calculate_storage.is_valid:
+            # 灰度应用不参与定时任务中的预计算功能
+            from apm.core.discover.precalculation.daemon import (
+                PrecalculateGrayRelease,
+            )
+
+            if not PrecalculateGrayRelease.exist(self.application.id):
+                pre_calculate_processor = PrecalculateProcessor(pre_calculate_storage, self.bk_biz_id, self.app_name)
 
         for trace_ids in self.list_trace_ids():
             trace_id_count += len(trace_ids)
 
             pool = ThreadPool()
-            get_spans_params = [(i, max_result_count) for i in divide_biscuit(trace_ids, per_trace_size)]
-            results = pool.map_ignore_exception(self.list_span_by_trace_ids, get_spans_params)
-            all_spans = list(itertools.chain(*[i for i in results if i]))
-            span_count += len(all_spans)
+            for all_spans in self.iter_trace_spans(trace_ids, page_size):
+                span_count += len(all_spans)
 
-            topo_spans = [i for i in all_spans if i[OtlpKey.KIND] in self.FILTER_KIND]
+                topo_spans = [i for i in all_spans if i[OtlpKey.KIND] in self.FILTER_KIND]
 
-            # 拓扑发现任务
-            topo_params = [(c, topo_spans, "topo") for c in DiscoverBase.DISCOVER_CLS]
+                # 拓扑发现任务
+                topo_params = [(c, topo_spans, "topo") for c in DiscoverBase.DISCOVER_CLS]
 
-            # 预计算任务
-            if pre_calculate_storage.is_valid:
-                # 灰度应用不参与定时任务中的预计算功能
-                from apm.core.discover.precalculation.daemon import (
-                    PrecalculateGrayRelease,
-                )
+                # 预计算任务
+                if pre_calculate_processor:
+                    topo_params.append((pre_calculate_processor, all_spans, "pre_calculate"))
 
-                if not PrecalculateGrayRelease.exist(self.application.id):
-                    pre_calculate_params = [
-                        (
-                            PrecalculateProcessor(pre_calculate_storage, self.bk_biz_id, self.app_name),
-                            all_spans,
-                            "pre_calculate",
-                        )
-                    ]
-                    topo_params += pre_calculate_params
-
-            pool.map_ignore_exception(self._discover_handle, topo_params)
+                pool.map_ignore_exception(self._discover_handle, topo_params)
 
         logger.info(
             f"[TopoHandler] discover finished {self.bk_biz_id} {self.app_name} "
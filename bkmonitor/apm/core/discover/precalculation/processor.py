@@ -17,11 +17,18 @@ to the current version of the project delivered to anyone in the future.
 """
 import datetime
 import logging
+import multiprocessing
 import operator
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 import networkx
 from apm_web.handlers.span_infer import InferenceHandler
 from apm_web.utils import group_by
+from celery.signals import worker_process_shutdown
+from django.conf import settings
 from networkx import dag_longest_path_length
 from opentelemetry.semconv.resource import ResourceAttributes
 from opentelemetry.semconv.trace import SpanAttributes
@@ -30,6 +37,7 @@ from opentelemetry.trace import StatusCode
 from apm.constants import KindCategory
 from apm.models import ApmApplication
 from bkm_space.api import SpaceApi
+from bkmonitor.utils.common_utils import chunks
 from bkmonitor.utils.thread_backend import ThreadPool
 from constants.apm import (
     OtlpKey,
@@ -37,9 +45,111 @@ from constants.apm import (
     SpanKind,
     SpanStandardField,
 )
+from core.prometheus import metrics
 
 logger = logging.getLogger("apm")
 
+# 预计算进程池在每个 worker 进程内只创建一次，避免每次处理都重新 fork 子进程
+_process_pool = None
+_process_pool_pid = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    """
+    获取当前进程复用的预计算进程池
+    进程池属于创建它的进程，fork 出的进程不能复用父进程的进程池，需要重新创建
+    """
+    global _process_pool, _process_pool_pid
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_pid != os.getpid():
+            # 使用 fork 方式创建子进程，子进程直接继承已初始化的 django 环境
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.APM_APP_PRE_CALCULATE_PROCESS_POOL_SIZE,
+                mp_context=multiprocessing.get_context("fork"),
+            )
+            _process_pool_pid = os.getpid()
+        return _process_pool
+
+
+def shutdown_process_pool(wait=True):
+    """
+    关闭预计算进程池，下次使用时重新创建
+    """
+    global _process_pool, _process_pool_pid
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+        pid, _process_pool_pid = _process_pool_pid, None
+    if pool is not None and pid == os.getpid():
+        pool.shutdown(wait=wait)
+
+
+@worker_process_shutdown.connect
+def pool_process_shutdown_handler(signal=None, sender=None, **kwargs):
+    # celery worker 子进程退出时不会执行 atexit，需要主动回收进程池的子进程
+    shutdown_process_pool(wait=False)
+
+
+def get_compact_fields():
+    """
+    获取预计算所需的 span 字段
+    返回: (顶层字段集合, {嵌套字段: 子字段集合})
+    """
+    fields = {
+        OtlpKey.SPAN_ID,
+        OtlpKey.PARENT_SPAN_ID,
+        OtlpKey.START_TIME,
+        OtlpKey.END_TIME,
+        OtlpKey.KIND,
+        OtlpKey.SPAN_NAME,
+        OtlpKey.STATUS,
+    }
+    nested_fields = {
+        OtlpKey.RESOURCE: {ResourceAttributes.SERVICE_NAME},
+        OtlpKey.ATTRIBUTES: {SpanAttributes.HTTP_STATUS_CODE, SpanAttributes.RPC_GRPC_STATUS_CODE},
+    }
+    # 服务推断
+    for i in InferenceHandler.infers:
+        nested_fields[OtlpKey.ATTRIBUTES].update(getattr(i, "predicate_keys", []))
+    # 标准字段收集
+    for f in SpanStandardField.COMMON_STANDARD_FIELDS:
+        if f.source == f.key:
+            fields.add(f.source)
+        else:
+            nested_fields.setdefault(f.source, set()).add(f.key)
+
+    return fields, nested_fields
+
+
+COMPACT_FIELDS, COMPACT_NESTED_FIELDS = get_compact_fields()
+
+
+def compact_span(span):
+    """
+    裁剪 span，仅保留预计算所需字段，降低进程间传输的序列化开销
+    """
+    res = {}
+    for k, v in span.items():
+        if k in COMPACT_NESTED_FIELDS and isinstance(v, dict):
+            res[k] = {i: v[i] for i in COMPACT_NESTED_FIELDS[k] if i in v}
+        elif k in COMPACT_FIELDS or k in COMPACT_NESTED_FIELDS:
+            res[k] = v
+    return res
+
+
+def calculate_trace_infos(context, traces):
+    """
+    进程池 worker: 计算一批 trace 的预计算信息，单个 trace 失败不影响其他 trace
+    """
+    processor = PrecalculateProcessor.from_context(context)
+    results = []
+    for trace_id, spans in traces:
+        try:
+            results.append(processor.get_trace_info(trace_id, spans))
+        except Exception as e:  # noqa
+            logger.exception(f"[PrecalculateProcessor] calculate trace: {trace_id} failed, error: {e}")
+    return results
+
 
 class PrecalculateProcessor:
     """
@@ -51,6 +161,7 @@ class PrecalculateProcessor:
         self.app_name = app_name
         self.storage = storage
         self.application = ApmApplication.get_application(bk_biz_id=bk_biz_id, app_name=app_name)
+        self.app_id = self.application.id
         space_info = {i.bk_biz_id: i for i in SpaceApi.list_spaces()}
         if bk_biz_id in space_info:
             bk_biz_name = space_info[bk_biz_id].space_name
@@ -58,16 +169,50 @@ class PrecalculateProcessor:
             bk_biz_name = bk_biz_id
         self.bk_biz_name = bk_biz_name
 
+    @classmethod
+    def from_context(cls, context):
+        """根据上下文构建处理类(进程池 worker 中使用，不再访问 DB 及空间接口)"""
+        processor = cls.__new__(cls)
+        processor.storage = None
+        processor.application = None
+        processor.__dict__.update(context)
+        return processor
+
+    def get_context(self):
+        return {
+            "bk_biz_id": self.bk_biz_id,
+            "bk_biz_name": self.bk_biz_name,
+            "app_id": self.app_id,
+            "app_name": self.app_name,
+        }
+
     def handle(self, all_span):
+        start = time.time()
 
         trace_mapping = group_by(all_span, operator.itemgetter(OtlpKey.TRACE_ID))
 
         logger.info(f"[PrecalculateProcessor] group by total {len(trace_mapping)} trace")
         data = []
-        pool = ThreadPool()
         params = [(k, v) for k, v in trace_mapping.items()]
 
-        results = pool.map_ignore_exception(self.get_trace_info, params)
+        mode = "thread"
+        results = None
+        # trace 数量不足一个批次时，进程池的启动及序列化开销高于收益，直接使用线程池
+        if (
+            settings.APM_APP_PRE_CALCULATE_PROCESS_POOL_SIZE > 0
+            and len(params) > settings.APM_APP_PRE_CALCULATE_PROCESS_CHUNK_SIZE
+        ):
+            try:
+                results = self.get_trace_infos_by_process(params)
+                mode = "process"
+            except Exception as e:  # noqa
+                logger.warning(f"[PrecalculateProcessor] process pool failed, fallback to thread pool, error: {e}")
+                # 进程池可能已损坏(如子进程被 kill)，丢弃后下次重新创建
+                shutdown_process_pool(wait=False)
+
+        if results is None:
+            pool = ThreadPool()
+            results = pool.map_ignore_exception(self.get_trace_info, params)
 
         for result in results:
             if not result:
@@ -75,9 +220,45 @@ class PrecalculateProcessor:
 
             data.append(result)
 
+        self.report_throughput(mode, len(all_span), time.time() - start)
+
         # 存储数据
         self.storage.save(data)
 
+    def get_trace_infos_by_process(self, params):
+        """
+        进程池计算 trace 信息
+        trace 按批次分发给 worker，span 裁剪为仅包含预计算字段的精简结构，避免传输完整的 _source
+        """
+        chunk_size = max(int(settings.APM_APP_PRE_CALCULATE_PROCESS_CHUNK_SIZE), 1)
+        context = self.get_context()
+
+        executor = get_process_pool()
+        futures = [
+            executor.submit(
+                calculate_trace_infos,
+                context,
+                [(trace_id, [compact_span(s) for s in spans]) for trace_id, spans in chunk],
+            )
+            for chunk in chunks(params, chunk_size)
+        ]
+
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def report_throughput(self, mode, span_count, duration):
+        throughput = span_count / duration if duration > 0 else span_count
+        logger.info(
+            f"[PrecalculateProcessor] {self.bk_biz_id} {self.app_name} mode: {mode} span count: {span_count} "
+            f"elapsed: {duration:.3f}s throughput: {throughput:.1f} span/s"
+        )
+        metrics.APM_PRE_CALCULATE_SPAN_THROUGHPUT.labels(
+            bk_biz_id=self.bk_biz_id, app_name=self.app_name, mode=mode
+        ).observe(throughput)
+        metrics.report_all()
+
     def get_status_code(self, span):
 
         for i in [SpanAttributes.HTTP_STATUS_CODE, SpanAttributes.RPC_GRPC_STATUS_CODE]:
@@ -208,7 +389,7 @@ class PrecalculateProcessor:
         return {
             PreCalculateSpecificField.BIZ_ID.value: self.bk_biz_id,
             PreCalculateSpecificField.BIZ_NAME.value: self.bk_biz_name,
-            PreCalculateSpecificField.APP_ID.value: self.application.id,
+            PreCalculateSpecificField.APP_ID.value: self.app_id,
             PreCalculateSpecificField.APP_NAME.value: self.app_name,
             PreCalculateSpecificField.TRACE_ID.value: trace_id,
             PreCalculateSpecificField.HIERARCHY_COUNT.value: hierarchy_count,
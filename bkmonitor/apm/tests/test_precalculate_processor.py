@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import mock
+import pytest
+
+from apm.core.discover.precalculation import processor as processor_module
+from apm.core.discover.precalculation.processor import PrecalculateProcessor
+
+
+def _get_trace_info(self, trace_id, spans):
+    return {"trace_id": trace_id, "span_count": len(spans), "app_id": self.app_id}
+
+
+def _spans(trace_ids):
+    return [{"trace_id": trace_id, "span_id": f"{trace_id}-{i}"} for trace_id in trace_ids for i in range(2)]
+
+
+def _processor():
+    processor = PrecalculateProcessor.from_context(
+        {"bk_biz_id": 2, "bk_biz_name": "test", "app_id": 1, "app_name": "test"}
+    )
+    processor.storage = mock.MagicMock()
+    return processor
+
+
+@pytest.fixture
+def process_pool(settings):
+    settings.APM_APP_PRE_CALCULATE_PROCESS_POOL_SIZE = 2
+    settings.APM_APP_PRE_CALCULATE_PROCESS_CHUNK_SIZE = 1
+    yield
+    processor_module.shutdown_process_pool()
+
+
+@mock.patch.object(PrecalculateProcessor, "get_trace_info", _get_trace_info)
+@mock.patch.object(PrecalculateProcessor, "report_throughput")
+def test_handle_by_process(report_throughput, process_pool):
+    processor = _processor()
+
+    processor.handle(_spans(["a", "b", "c"]))
+    pool = processor_module.get_process_pool()
+    processor.handle(_spans(["d", "e"]))
+
+    # 同一个 worker 进程内复用进程池
+    assert processor_module.get_process_pool() is pool
+    assert [call[0][0] for call in report_throughput.call_args_list] == ["process", "process"]
+    saved = [sorted(i["trace_id"] for i in call[0][0]) for call in processor.storage.save.call_args_list]
+    assert saved == [["a", "b", "c"], ["d", "e"]]
+    assert processor.storage.save.call_args_list[0][0][0][0]["span_count"] == 2
+
+
+@mock.patch.object(PrecalculateProcessor, "get_trace_info", _get_trace_info)
+@mock.patch.object(PrecalculateProcessor, "report_throughput")
+def test_handle_fallback_to_thread(report_throughput, process_pool):
+    processor = _processor()
+
+    with mock.patch.object(processor_module, "get_process_pool", side_effect=OSError("fork failed")), mock.patch.object(
+        processor_module, "shutdown_process_pool"
+    ) as shutdown_process_pool:
+        processor.handle(_spans(["a", "b"]))
+
+    # 进程池不可用时回退到线程池，并丢弃可能已损坏的进程池
+    shutdown_process_pool.assert_called_once()
+    assert report_throughput.call_args[0][0] == "thread"
+    assert sorted(i["trace_id"] for i in processor.storage.save.call_args[0][0]) == ["a", "b"]
+
+
+@mock.patch.object(PrecalculateProcessor, "get_trace_info", _get_trace_info)
+@mock.patch.object(PrecalculateProcessor, "report_throughput")
+def test_handle_small_batch_by_thread(report_throughput, settings):
+    settings.APM_APP_PRE_CALCULATE_PROCESS_POOL_SIZE = 2
+    settings.APM_APP_PRE_CALCULATE_PROCESS_CHUNK_SIZE = 500
+    processor = _processor()
+
+    with mock.patch.object(processor_module, "get_process_pool") as get_process_pool:
+        processor.handle(_spans(["a", "b"]))
+
+    # trace 数量不足一个批次时不使用进程池
+    get_process_pool.assert_not_called()
+    assert report_throughput.call_args[0][0] == "thread"
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import mock
+
+from apm.core.discover.base import TopoHandler
+
+
+def _spans(trace_id, count):
+    return [{"trace_id": trace_id, "span_id": f"{trace_id}-{i}"} for i in range(count)]
+
+
+def _handler():
+    handler = TopoHandler.__new__(TopoHandler)
+    handler.bk_biz_id = 2
+    handler.app_name = "test"
+    return handler
+
+
+@mock.patch("apm.core.discover.base.constants.DISCOVER_SPAN_CHUNK_SIZE", 3)
+def test_iter_trace_spans():
+    spans = _spans("a", 2) + _spans("b", 2) + _spans("c", 5) + _spans("d", 1)
+    pages = [spans[i : i + 2] for i in range(0, len(spans), 2)]
+
+    handler = _handler()
+    with mock.patch.object(TopoHandler, "_iter_span_pages", return_value=iter(pages)):
+        chunks = list(handler.iter_trace_spans(["a", "b", "c", "d"], 2))
+
+    assert [[i["trace_id"] for i in chunk] for chunk in chunks] == [
+        ["a", "a"],
+        ["b", "b"],
+        ["c"] * 5,
+        ["d"],
+    ]
+    assert sum(chunks, []) == spans
+
+
+def test_iter_span_pages_by_pit():
+    es_client = mock.MagicMock()
+    es_client.search.side_effect = [
+        {"pit_id": "pit2", "hits": {"hits": [{"_source": {"span_id": 1}, "sort": ["a", 1]}] * 2}},
+        {"pit_id": "pit3", "hits": {"hits": [{"_source": {"span_id": 2}, "sort": ["b", 2]}]}},
+    ]
+
+    handler = _handler()
+    pages = list(handler._iter_span_pages_by_pit(es_client, "pit1", {}, 2))
+
+    assert pages == [[{"span_id": 1}, {"span_id": 1}], [{"span_id": 2}]]
+    second_body = es_client.search.call_args_list[1][1]["body"]
+    assert second_body["search_after"] == ["a", 1]
+    assert second_body["pit"]["id"] == "pit2"
+    es_client.close_point_in_time.assert_called_once_with(body={"id": "pit3"})
+
+
+@mock.patch("apm.core.discover.base.DiscoverBase.DISCOVER_CLS", [])
+@mock.patch("apm.core.discover.precalculation.daemon.PrecalculateGrayRelease.exist", return_value=False)
+@mock.patch("apm.core.discover.base.PrecalculateStorage")
+@mock.patch("apm.core.discover.base.PrecalculateProcessor")
+def test_discover_build_processor_once(processor_cls, storage_cls, gray_release_exist):
+    storage_cls.return_value.is_valid = True
+    chunks = [[{**span, "kind": 2} for span in _spans(i, count)] for i, count in [("a", 2), ("b", 1), ("c", 3)]]
+
+    handler = _handler()
+    handler.application = mock.MagicMock(id=1)
+    with mock.patch.object(TopoHandler, "_get_trace_task_splits", return_value=(10000, 1)), mock.patch.object(
+        TopoHandler, "list_trace_ids", return_value=iter([["a", "b"], ["c"]])
+    ), mock.patch.object(TopoHandler, "iter_trace_spans", side_effect=[iter(chunks[:2]), iter(chunks[2:])]):
+        handler.discover()
+
+    # 每轮只构建一次预计算处理类，所有批次共用
+    processor_cls.assert_called_once_with(storage_cls.return_value, 2, "test")
+    assert [call[0][0] for call in processor_cls.return_value.handle.call_args_list] == chunks
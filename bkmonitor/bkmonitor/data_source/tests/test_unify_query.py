@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import time
+import types
+
+import mock
+import pytest
+
+from bkmonitor.data_source.unify_query.query import UnifyQuery
+
+PARAMS = {"query_list": [{"reference_name": "a"}]}
+
+DATA = {
+    "series": [
+        {
+            "name": "_result0",
+            "columns": ["_time", "_value"],
+            "types": ["time", "float"],
+            "group_keys": ["bk_target_ip_table1", "bk_target_cloud_id"],
+            "group_values": ["127.0.0.1", "0"],
+            "values": [["2019-09-23T13:47:00Z", 1.0], ["2019-09-23T13:48:00Z", 2.0]],
+        },
+        {
+            "name": "_result1",
+            "columns": ["_time", "a"],
+            "types": ["time", "float"],
+            "group_keys": None,
+            "group_values": [],
+            "values": [["2019-09-23T13:47:00Z", 3.0], ["2019-09-23T13:48:00Z", 4.0]],
+        },
+    ]
+}
+
+
+def test_process_unify_query_data():
+    records = UnifyQuery.process_unify_query_data(PARAMS, DATA)
+    assert records == [
+        {"bk_target_ip": "127.0.0.1", "bk_target_cloud_id": "0", "_time_": 1569246420000, "_result_": 1.0},
+        {"bk_target_ip": "127.0.0.1", "bk_target_cloud_id": "0", "_time_": 1569246480000, "_result_": 2.0},
+        {"_time_": 1569246420000, "a": 3.0, "_result_": 3.0},
+        {"_time_": 1569246480000, "a": 4.0, "_result_": 4.0},
+    ]
+
+    # 等于结束时间的数据不返回
+    records = UnifyQuery.process_unify_query_data(PARAMS, DATA, end_time=1569246480000)
+    assert [record["_result_"] for record in records] == [1.0, 3.0]
+
+
+def test_iter_unify_query_data():
+    records = UnifyQuery.iter_unify_query_data(PARAMS, DATA)
+    assert isinstance(records, types.GeneratorType)
+    assert list(records) == UnifyQuery.process_unify_query_data(PARAMS, DATA)
+
+
+def test_iter_unify_query_series():
+    series = list(UnifyQuery.iter_unify_query_series(DATA))
+    assert series[0] == (
+        {"bk_target_ip": "127.0.0.1", "bk_target_cloud_id": "0"},
+        {"_time_": [1569246420000, 1569246480000], "_result_": [1.0, 2.0]},
+    )
+    assert series[1] == ({}, {"_time_": [1569246420000, 1569246480000], "a": [3.0, 4.0]})
+
+
+def test_iter_unify_query_data_with_short_row():
+    data = {
+        "series": [
+            {
+                "name": "_result0",
+                "columns": ["_time", "_value", "a"],
+                "types": ["time", "float", "float"],
+                "group_keys": [],
+                "group_values": [],
+                "values": [["2019-09-23T13:47:00Z", 1.0, 1.0], ["2019-09-23T13:48:00Z", 2.0]],
+            }
+        ]
+    }
+    # 数据行长度不足时，缺失的列不出现在记录中
+    assert list(UnifyQuery.iter_unify_query_data(PARAMS, data)) == [
+        {"_time_": 1569246420000, "_result_": 1.0, "a": 1.0},
+        {"_time_": 1569246480000, "_result_": 2.0},
+    ]
+
+
+def test_iter_query_data_metrics():
+    labels = {
+        "data_source_label": "bk_monitor",
+        "data_type_label": "time_series",
+        "role": "api",
+        "result_table": "system.cpu_summary",
+        "api": "unify_query",
+    }
+
+    def broken_records():
+        yield {"_result_": 1.0}
+        raise ValueError("broken")
+
+    with mock.patch("bkmonitor.data_source.unify_query.query.metrics") as mock_metrics:
+        records = UnifyQuery._iter_query_data(broken_records(), labels, time.time())
+        # 迭代开始前不上报
+        mock_metrics.DATASOURCE_QUERY_COUNT.labels.assert_not_called()
+        assert next(records) == {"_result_": 1.0}
+        with pytest.raises(ValueError):
+            next(records)
+
+        mock_metrics.DATASOURCE_QUERY_TIME.labels.return_value.observe.assert_called_once()
+        count_labels = mock_metrics.DATASOURCE_QUERY_COUNT.labels.call_args[1]
+        assert count_labels["status"] == mock_metrics.StatusEnum.from_exc.return_value
+        assert isinstance(mock_metrics.StatusEnum.from_exc.call_args[0][0], ValueError)
+        mock_metrics.report_all.assert_called_once()
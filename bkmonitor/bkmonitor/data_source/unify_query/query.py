@@ -14,7 +14,7 @@ import logging
 import re
 import time
 from itertools import chain
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Union
 
 import arrow
 from django.conf import settings
@@ -37,6 +37,9 @@ from core.prometheus import metrics
 tracer = trace.get_tracer(__name__)
 logger = logging.getLogger(__name__)
 
+# 列式解析时，数据行长度不足的位置使用该占位值填充，生成记录时跳过(与逐行 zip 解析的语义一致)
+MISSING_VALUE = object()
+
 
 class UnifyQuery:
     """
@@ -100,40 +103,76 @@ class UnifyQuery:
             dimensions.update(data_source.group_by)
         return list(dimensions)
 
+    @staticmethod
+    def _normalize_column(column: str) -> str:
+        if column == "_time":
+            return "_time_"
+        elif column in ["_result", "_value"]:
+            return "_result_"
+        return column
+
     @classmethod
-    def process_unify_query_data(cls, params: Dict, data: Dict, end_time: int = None):
+    def iter_unify_query_series(cls, data: Dict):
         """
-        处理统一查询模块返回值
+        按序列解析统一查询模块返回值(列式)
+        :return: 生成器，每个元素为 (dimensions, columns)，columns 为 {列名: 该列所有取值}
+        时间列按取值缓存解析结果，同一批次内所有序列共享相同时间点只解析一次；维度名按 group_keys 缓存
+        数据行长度不足时，缺失的位置以 MISSING_VALUE 填充
         """
         re_dimension = re.compile(r"_table\d+$")
-
-        records = []
+        time_cache = {}
+        group_keys_cache = {}
 
         rows = data["series"] or []
         for row in rows:
-            dimensions = {}
-            if not row["group_keys"]:
-                row["group_keys"] = []
-            for index, group_key in enumerate(row["group_keys"]):
-                end_string = re_dimension.findall(group_key)
-                if end_string:
-                    end_string = end_string[0]
-                    group_key = group_key[: -len(end_string)]
-
-                dimensions[group_key] = row["group_values"][index]
-
-            for value in row["values"]:
-                record = {**dimensions}
-                for column, column_type, v in zip(row["columns"], row["types"], value):
-                    if column_type == "time":
-                        v = arrow.get(v).timestamp * 1000
-
-                    if column == "_time":
-                        column = "_time_"
-                    elif column in ["_result", "_value"]:
-                        column = "_result_"
+            group_keys = tuple(row["group_keys"] or [])
+            dimension_keys = group_keys_cache.get(group_keys)
+            if dimension_keys is None:
+                dimension_keys = []
+                for group_key in group_keys:
+                    end_string = re_dimension.findall(group_key)
+                    if end_string:
+                        group_key = group_key[: -len(end_string[0])]
+                    dimension_keys.append(group_key)
+                group_keys_cache[group_keys] = dimension_keys
+            dimensions = dict(zip(dimension_keys, row["group_values"]))
+
+            columns = {}
+            row_values = row["values"]
+            for index, (column, column_type) in enumerate(zip(row["columns"], row["types"])):
+                if all(len(value) > index for value in row_values):
+                    values = [value[index] for value in row_values]
+                else:
+                    values = [value[index] if len(value) > index else MISSING_VALUE for value in row_values]
+                if column_type == "time":
+                    parsed_values = []
+                    for v in values:
+                        if v is MISSING_VALUE:
+                            parsed_values.append(v)
+                            continue
+                        timestamp = time_cache.get(v)
+                        if timestamp is None:
+                            timestamp = time_cache[v] = arrow.get(v).timestamp * 1000
+                        parsed_values.append(timestamp)
+                    values = parsed_values
+                columns[cls._normalize_column(column)] = values
+
+            yield dimensions, columns
 
-                    record[column] = v
+    @classmethod
+    def iter_unify_query_data(cls, params: Dict, data: Dict, end_time: int = None):
+        """
+        流式处理统一查询模块返回值，逐条生成数据记录
+        """
+        for dimensions, columns in cls.iter_unify_query_series(data):
+            names = list(columns.keys())
+            has_missing = any(MISSING_VALUE in values for values in columns.values())
+            for values in zip(*columns.values()):
+                record = {**dimensions}
+                if has_missing:
+                    record.update((name, v) for name, v in zip(names, values) if v is not MISSING_VALUE)
+                else:
+                    record.update(zip(names, values))
 
                 # 单指标情况下避免缺少_result_字段
                 if "_result_" not in record:
@@ -143,8 +182,14 @@ class UnifyQuery:
                 if end_time and record.get("_time_") == end_time:
                     continue
 
-                records.append(record)
-        return records
+                yield record
+
+    @classmethod
+    def process_unify_query_data(cls, params: Dict, data: Dict, end_time: int = None):
+        """
+        处理统一查询模块返回值
+        """
+        return list(cls.iter_unify_query_data(params, data, end_time=end_time))
 
     def use_unify_query(self) -> bool:
         """
@@ -243,9 +288,11 @@ class UnifyQuery:
         slimit: Optional[int] = None,
         down_sample_range: Optional[int] = "",
         time_alignment: bool = True,
-    ) -> List[Dict]:
+        iterator: bool = False,
+    ) -> Union[List[Dict], Iterator[Dict]]:
         """
         使用统一查询模块进行查询
+        :param iterator: 是否返回生成器，逐条解析数据记录，避免一次性构造所有记录
         """
         params = self.get_unify_query_params(start_time, end_time, time_alignment)
         params.update(dict(down_sample_range=down_sample_range, timezone=timezone.get_current_timezone_name()))
@@ -256,6 +303,8 @@ class UnifyQuery:
             span.set_attribute("bk.system", "unify_query")
             span.set_attribute("bk.unify_query.statement", json.dumps(params))
             data = api.unify_query.query_data(**params)
+            if iterator:
+                return self.iter_unify_query_data(params, data, end_time=end_time)
             data = self.process_unify_query_data(params, data, end_time=end_time)
         return data
 
@@ -299,9 +348,14 @@ class UnifyQuery:
         down_sample_range: Optional[str] = "",
         *args,
         **kwargs,
-    ) -> List[Dict]:
+    ) -> Union[List[Dict], Iterator[Dict]]:
+        """
+        查询数据
+        :param iterator: 是否以生成器形式返回数据记录(仅统一查询模块支持流式解析)
+        """
+        iterator = kwargs.get("iterator", False)
         if not self.data_sources:
-            return []
+            return iter([]) if iterator else []
 
         if not start_time or not end_time:
             end_time = int(time.time()) * 1000
@@ -342,18 +396,24 @@ class UnifyQuery:
         # 使用统一查询模块或原始数据源进行查询
         if self.use_unify_query():
             labels["api"] = "unify_query"
+            begin_time = time.time()
             try:
-                with metrics.DATASOURCE_QUERY_TIME.labels(**labels).time():
-                    data = self._query_unify_query(
-                        start_time=start_time,
-                        end_time=end_time,
-                        limit=limit,
-                        slimit=slimit,
-                        down_sample_range=down_sample_range,
-                        time_alignment=kwargs.get("time_alignment", True),
-                    )
+                data = self._query_unify_query(
+                    start_time=start_time,
+                    end_time=end_time,
+                    limit=limit,
+                    slimit=slimit,
+                    down_sample_range=down_sample_range,
+                    time_alignment=kwargs.get("time_alignment", True),
+                    iterator=iterator,
+                )
             except Exception as e:
                 exc = e
+
+            # 流式解析在返回后才执行，查询耗时及异常在迭代结束时上报
+            if iterator and not exc:
+                return self._iter_query_data(data, labels, begin_time)
+            metrics.DATASOURCE_QUERY_TIME.labels(**labels).observe(time.time() - begin_time)
         else:
             try:
                 labels["api"] = "query_api"
@@ -373,8 +433,28 @@ class UnifyQuery:
         if exc:
             raise exc
 
+        if iterator:
+            return iter(data)
         return data
 
+    @staticmethod
+    def _iter_query_data(data: Iterator[Dict], labels: Dict, begin_time: float) -> Iterator[Dict]:
+        """
+        逐条返回数据记录，迭代过程中的解析耗时及异常同样计入数据源查询指标
+        """
+        exc = None
+        try:
+            yield from data
+        except Exception as e:
+            exc = e
+            raise
+        finally:
+            metrics.DATASOURCE_QUERY_TIME.labels(**labels).observe(time.time() - begin_time)
+            metrics.DATASOURCE_QUERY_COUNT.labels(
+                **labels, status=metrics.StatusEnum.from_exc(exc), exception=exc
+            ).inc()
+            metrics.report_all()
+
     def query_dimensions(self, dimension_field: Union[List, str], limit, start_time, end_time, *args, **kwargs):
         """
         查询维度
@@ -437,6 +437,62 @@ class KubernetesNodeJsonParser(KubernetesV1ObjectJsonParser):
         return labels
 
 
+class KubernetesOwnerReferenceGraph:
+    """集群资源归属关系索引 .
+
+    按类型、名字空间、名称索引中间资源(ReplicaSet、Job)的ownerReferences，
+    每次拉取集群资源时构建一次，Pod通过字典查找逐级解析到顶层workload
+    """
+
+    # 需要继续向上解析归属关系的资源类型
+    INTERMEDIATE_KINDS = ("ReplicaSet", "Job")
+
+    def __init__(self, replica_set_list: Optional[List] = None, job_list: Optional[List] = None):
+        self.owner_references_map = {}
+        self.add_resources("ReplicaSet", replica_set_list or [])
+        self.add_resources("Job", job_list or [])
+
+    def add_resources(self, kind: str, resource_list: List) -> None:
+        for resource in resource_list:
+            metadata = resource.get("metadata") or {}
+            owner_references = metadata.get("ownerReferences")
+            if not owner_references:
+                continue
+            key = (kind, metadata.get("namespace"), metadata.get("name"))
+            self.owner_references_map[key] = owner_references
+
+    def get_owner_references(self, kind: str, name: str, namespace: Optional[str] = None) -> List:
+        owner_references = self.owner_references_map.get((kind, namespace, name))
+        if owner_references is None and namespace is not None:
+            # 未拉取名字空间字段时只按名称匹配
+            owner_references = self.owner_references_map.get((kind, None, name))
+        return owner_references or []
+
+    def resolve(self, owner_references: List, namespace: Optional[str] = None) -> Dict:
+        """沿归属链解析顶层workload，上级资源的ownerReferences追加到owner_references中 ."""
+        workload_type = ""
+        workload_name = ""
+        if owner_references:
+            workload_type = owner_references[0].get("kind", "")
+            workload_name = owner_references[0].get("name", "")
+
+        visited = set()
+        while workload_type in self.INTERMEDIATE_KINDS and (workload_type, workload_name) not in visited:
+            visited.add((workload_type, workload_name))
+            parent_owner_references = self.get_owner_references(workload_type, workload_name, namespace)
+            if not parent_owner_references:
+                break
+            owner_references += parent_owner_references
+            workload_type = parent_owner_references[0].get("kind", "")
+            workload_name = parent_owner_references[0].get("name", "")
+
+        return {
+            "owner_references": owner_references,
+            "workload_name": workload_name,
+            "workload_type": workload_type,
+        }
+
+
 class KubernetesPodJsonParser(KubernetesV1ObjectJsonParser):
     @cached_property
     def status(self):
@@ -611,50 +667,26 @@ class KubernetesPodJsonParser(KubernetesV1ObjectJsonParser):
 
         return reason
 
-    def get_workloads(self, replica_set_list, job_list):
+    def get_workloads(self, replica_set_list=None, job_list=None, owner_graph=None):
+        """获得Pod所属的顶层workload
+
+        :param owner_graph: 集群资源归属关系索引，批量解析时应复用同一个索引
+        """
+        if owner_graph is None:
+            owner_graph = KubernetesOwnerReferenceGraph(replica_set_list, job_list)
         # 获取垃圾回收配置
         owner_references = self.metadata.get("ownerReferences", [])
         if not owner_references:
             owner_references = []
-        workload_type = ""
-        workload_name = ""
-        if owner_references:
-            workload_name = owner_references[0].get("name", "")
-            workload_type = owner_references[0].get("kind", "")
-            if "ReplicaSet" == workload_type:
-                for replica_set in replica_set_list:
-                    replica_set_owner_references = replica_set.get("metadata", {}).get("ownerReferences", [])
-                    if not replica_set_owner_references:
-                        continue
-
-                    rs_workload_name = replica_set_owner_references[0].get("name", "")
-                    rs_workload_type = replica_set_owner_references[0].get("kind", "")
-                    rs_name = replica_set.get("metadata", {}).get("name")
-                    if replica_set_owner_references and rs_name in workload_name:
-                        owner_references += replica_set_owner_references
-                        self.metadata["ownerReferences"] = owner_references
-                        workload_name = rs_workload_name
-                        workload_type = rs_workload_type
-            elif "Job" == workload_type:
-                for job in job_list:
-                    parent_owner_references = job.get("metadata", {}).get("ownerReferences", [])
-                    if not parent_owner_references:
-                        continue
-
-                    rs_workload_name = parent_owner_references[0].get("name", "")
-                    rs_workload_type = parent_owner_references[0].get("kind", "")
-                    job_name = job.get("metadata", {}).get("name")
-                    if parent_owner_references and job_name in workload_name:
-                        owner_references += parent_owner_references
-                        self.metadata["ownerReferences"] = owner_references
-                        workload_name = rs_workload_name
-                        workload_type = rs_workload_type
+        count = len(owner_references)
+        workloads = owner_graph.resolve(owner_references, self.namespace)
+        if len(owner_references) != count:
+            self.metadata["ownerReferences"] = owner_references
+        return workloads
 
-        return {
-            "owner_references": owner_references,
-            "workload_name": workload_name,
-            "workload_type": workload_type,
-        }
+    @cached_property
+    def container_status_map(self) -> Dict:
+        return {container_status.get("name"): container_status for container_status in self.container_statuses}
 
     @cached_property
     def containers(self) -> List:
@@ -666,18 +698,15 @@ class KubernetesPodJsonParser(KubernetesV1ObjectJsonParser):
 
 
 class KubernetesContainerJsonParser:
-    def __init__(self, pod: Dict, container: Dict):
-        self.pod_parser = KubernetesPodJsonParser(pod)
+    def __init__(self, pod: Dict, container: Dict, pod_parser: Optional[KubernetesPodJsonParser] = None):
+        # 同一个Pod的多个容器复用Pod解析结果
+        self.pod_parser = pod_parser or KubernetesPodJsonParser(pod)
         self.container = container
 
     @cached_property
     def container_status(self) -> Dict:
         """获得容器当前的状态 ."""
-        container_statuses = self.pod_parser.container_statuses
-        for container_status in container_statuses:
-            if container_status.get("name") == self.name:
-                return container_status
-        return {}
+        return self.pod_parser.container_status_map.get(self.name, {})
 
     @cached_property
     def service_status(self):
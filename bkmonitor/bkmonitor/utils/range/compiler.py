@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+条件编译
+
+将条件树(conditions.py)及监控目标条件(target.py)编译为单个匹配函数，匹配结果与 is_match 保持一致
+1. 条件值在编译时完成字符串/浮点数转换，正则预先编译
+2. 普通维度字段直接从数据中取值，避免每条数据重复构造字段对象
+"""
+import logging
+import re
+import sre_constants
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+from bkmonitor.utils.common_utils import safe_float
+
+from . import conditions
+from .fields import DimensionField
+from .target import TargetCondition
+
+logger = logging.getLogger("service")
+
+Matcher = Callable[[Dict], bool]
+
+# 原有的单条件匹配方法，用于无法编译的条件
+simple_condition_match = conditions.SimpleCondition.is_match
+
+IP_FIELDS = ("ip", "bk_target_ip")
+SERVICE_INSTANCE_FIELDS = ("service_instance_id", "bk_target_service_instance_id")
+
+
+def _to_str_list(value) -> List[str]:
+    """
+    与 DimensionField.to_str_list 一致
+    """
+    if not isinstance(value, (list, tuple)):
+        return [str(value).strip()]
+    return [str(v).strip() for v in value]
+
+
+def _to_float_list(value) -> List[float]:
+    """
+    与 DimensionField.to_float_list 一致
+    """
+    if not isinstance(value, (list, tuple)):
+        return [safe_float(value)]
+    return [safe_float(v) for v in value]
+
+
+def _match_all(data) -> bool:
+    return True
+
+
+def _match_none(data) -> bool:
+    return False
+
+
+def _compile_value_getter(cond_field: DimensionField):
+    """
+    从数据中取值，普通维度字段直接读取字典
+    """
+    if type(cond_field).get_value_from_data is not DimensionField.get_value_from_data:
+        return cond_field.get_value_from_data
+
+    name = cond_field.name
+
+    def get_value(data):
+        if name in data:
+            return True, data[name]
+        return False, None
+
+    return get_value
+
+
+def _compile_str_list(cond_field: DimensionField):
+    field_class = type(cond_field)
+    if field_class.to_str_list is DimensionField.to_str_list:
+        return _to_str_list
+
+    name = cond_field.name
+    return lambda value: field_class(name, value).to_str_list()
+
+
+def _compile_equal(condition):
+    cond_values = set(condition.cond_field.to_str_list())
+    to_str_list = _compile_str_list(condition.cond_field)
+    return lambda value: not cond_values.isdisjoint(to_str_list(value))
+
+
+def _compile_include(condition):
+    cond_values = condition.cond_field.to_str_list()
+    to_str_list = _compile_str_list(condition.cond_field)
+
+    def predicate(value):
+        data_value = to_str_list(value)[0]
+        for v in cond_values:
+            if v in data_value:
+                return True
+        return False
+
+    return predicate
+
+
+def _compile_greater(condition):
+    cond_value = max(condition.cond_field.to_float_list())
+    return lambda value: min(_to_float_list(value)) > cond_value
+
+
+def _compile_lesser(condition):
+    cond_value = min(condition.cond_field.to_float_list())
+    return lambda value: max(_to_float_list(value)) < cond_value
+
+
+def _compile_regular(condition):
+    patterns = []
+    for v in condition.cond_field.to_str_list():
+        try:
+            patterns.append(re.compile(r"%s" % v))
+        except sre_constants.error:
+            # 与逐条匹配一致，遇到非法正则后不再继续匹配
+            break
+    to_str_list = _compile_str_list(condition.cond_field)
+
+    def predicate(value):
+        data_value = to_str_list(value)[0]
+        for pattern in patterns:
+            if pattern.search(data_value):
+                return True
+        return False
+
+    return predicate
+
+
+def _negate(predicate):
+    return lambda value: not predicate(value)
+
+
+# 条件类型 -> (谓词编译函数, 是否取反)
+SIMPLE_CONDITION_COMPILERS = {
+    conditions.EqualCondition: (_compile_equal, False),
+    conditions.NotEqualCondition: (_compile_equal, True),
+    conditions.IncludeCondition: (_compile_include, False),
+    conditions.ExcludeCondition: (_compile_include, True),
+    conditions.GreaterCondition: (_compile_greater, False),
+    conditions.LesserOrEqualCondition: (_compile_greater, True),
+    conditions.LesserCondition: (_compile_lesser, False),
+    conditions.GreaterOrEqualCondition: (_compile_lesser, True),
+    conditions.RegularCondition: (_compile_regular, False),
+    conditions.NotRegularCondition: (_compile_regular, True),
+}
+
+
+def _compile_simple(condition: conditions.SimpleCondition) -> Matcher:
+    compiler, negative = SIMPLE_CONDITION_COMPILERS[type(condition)]
+    try:
+        predicate = compiler(condition)
+    except ValueError:
+        # 条件值为空等异常配置，保持原有的匹配行为
+        return partial(simple_condition_match, condition)
+    if negative:
+        predicate = _negate(predicate)
+
+    get_value = _compile_value_getter(condition.cond_field)
+    default_value = condition.default_value_if_not_exists
+
+    def match(data):
+        existed, value = get_value(data)
+        if not existed:
+            return default_value
+        return predicate(value)
+
+    return match
+
+
+def _compile_or(matchers: List[Matcher]) -> Matcher:
+    def match(data):
+        for matcher in matchers:
+            if matcher(data):
+                return True
+        return False
+
+    return match
+
+
+def _compile_and(matchers: List[Matcher]) -> Matcher:
+    def match(data):
+        for matcher in matchers:
+            if not matcher(data):
+                return False
+        return True
+
+    return match
+
+
+def compile_condition(condition: conditions.Condition) -> Matcher:
+    """
+    将条件树编译为匹配函数
+    """
+    if type(condition) in SIMPLE_CONDITION_COMPILERS:
+        return _compile_simple(condition)
+
+    if type(condition) in (conditions.OrCondition, conditions.AndCondition):
+        if not condition.conditions:
+            return _match_all
+        matchers = [compile_condition(cond) for cond in condition.conditions]
+        if len(matchers) == 1:
+            return matchers[0]
+        if type(condition) is conditions.OrCondition:
+            return _compile_or(matchers)
+        return _compile_and(matchers)
+
+    # 未知的条件类型，使用原有的匹配方法
+    return condition.is_match
+
+
+def _get_ip_target_keys(data):
+    target_keys = set()
+    bk_host_id = data.get("bk_host_id")
+    if bk_host_id:
+        target_keys.add(str(bk_host_id))
+
+    ip = data.get("bk_target_ip", data.get("ip"))
+    if ip:
+        bk_cloud_id = data.get("bk_target_cloud_id", data.get("bk_cloud_id", 0))
+        target_keys.add(f"{ip}|{bk_cloud_id}")
+    return target_keys
+
+
+def _get_service_instance_target_keys(data):
+    service_instance_id = data.get("bk_target_service_instance_id", data.get("service_instance_id"))
+    if not service_instance_id:
+        return set()
+    return {str(service_instance_id)}
+
+
+def _compile_target_item(condition: Dict) -> Matcher:
+    """
+    编译单个监控目标条件，返回 False 表示该组条件不满足
+    """
+    field = condition["field"]
+    values = condition["target_keys"]
+    is_equal = condition["method"] == "eq"
+
+    if field in IP_FIELDS or field in SERVICE_INSTANCE_FIELDS:
+        get_target_keys = _get_ip_target_keys if field in IP_FIELDS else _get_service_instance_target_keys
+
+        def match(data):
+            target_keys = get_target_keys(data)
+            # 数据中不存在目标信息时忽略该条件
+            if not target_keys:
+                return True
+            return is_equal != values.isdisjoint(target_keys)
+
+        return match
+
+    def match_topo_node(data):
+        if "bk_topo_node" in data:
+            topo_nodes = data["bk_topo_node"]
+        elif "bk_obj_id" in data and "bk_inst_id" in data:
+            topo_nodes = [f'{data["bk_obj_id"]}|{data["bk_inst_id"]}']
+        else:
+            # 数据中不存在topo信息，表示主机信息无效，数据均以无效处理
+            return False
+
+        if not topo_nodes:
+            logger.info(f"data target topo_node is empty, {data}")
+            return False
+        return is_equal != values.isdisjoint(topo_nodes)
+
+    return match_topo_node
+
+
+def compile_target_condition(target_condition: TargetCondition) -> Matcher:
+    """
+    将监控目标条件编译为匹配函数，各组条件之间为或关系，组内条件为且关系
+    """
+    group_matchers = []
+    for target_conditions in target_condition.conditions_list:
+        matchers = [_compile_target_item(condition) for condition in target_conditions]
+        group_matchers.append(matchers[0] if len(matchers) == 1 else _compile_and(matchers))
+
+    if not group_matchers:
+        return _match_none
+    if len(group_matchers) == 1:
+        return group_matchers[0]
+    return _compile_or(group_matchers)
+
+
+def compile_all(matchers: List[Optional[Matcher]]) -> Matcher:
+    """
+    合并多个匹配函数(且关系)，忽略空值
+    """
+    matchers = [matcher for matcher in matchers if matcher]
+    if not matchers:
+        return _match_all
+    if len(matchers) == 1:
+        return matchers[0]
+    return _compile_and(matchers)
+
+
+def filter_dimensions(matcher: Matcher, dimensions_list: List[Dict]) -> List[Dict]:
+    """
+    批量过滤维度，返回匹配的维度列表
+    """
+    return [dimensions for dimensions in dimensions_list if matcher(dimensions)]
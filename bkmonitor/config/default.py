@@ -600,6 +600,10 @@ APM_APP_BKDATA_VIRTUAL_METRIC_STORAGE = ""
 APM_APP_PRE_CALCULATE_STORAGE_SLICE_SIZE = 500
 APM_APP_PRE_CALCULATE_STORAGE_RETENTION = 30
 APM_APP_PRE_CALCULATE_STORAGE_SHARDS = 3
+# APM预计算进程池大小，为0时使用线程池计算
+APM_APP_PRE_CALCULATE_PROCESS_POOL_SIZE = 0
+# APM预计算进程池模式下每个批次的trace数量
+APM_APP_PRE_CALCULATE_PROCESS_CHUNK_SIZE = 500
 APM_TRACE_DIAGRAM_CONFIG = {}
 APM_DORIS_STORAGE_CONFIG = {}
 # {2:["foo", "bar"], 3:["baz"]}
@@ -731,6 +735,17 @@ ENABLE_METADATA_DOWNSAMPLE_BY_BKDATA = False
 # 是否启用 unify-query 查询计算平台降精度数据
 ENABLE_UNIFY_QUERY_DOWNSAMPLE_BY_BKDATA = False
 
+# 图表查询是否按时间桶缓存查询结果
+UNIFY_QUERY_CACHE_ENABLED = False
+# 每个时间桶包含的数据点数
+UNIFY_QUERY_CACHE_BUCKET_POINTS = 10
+# 时间桶结束多久后(秒)才写入缓存，避免缓存延迟上报前的不完整数据
+UNIFY_QUERY_CACHE_DELAY = 120
+# 入库延迟较大的数据源，时间桶结束多久后(秒)才写入缓存，按数据来源配置，与 UNIFY_QUERY_CACHE_DELAY 取较大值
+UNIFY_QUERY_CACHE_SOURCE_DELAY = {"bk_data": 900, "bk_log_search": 300}
+# 时间桶缓存的最长过期时间(秒)
+UNIFY_QUERY_CACHE_TTL = 3600
+
 WECOM_ROBOT_BIZ_WHITE_LIST = []
 WECOM_ROBOT_ACCOUNT = {}
 IS_WECOM_ROBOT_ENABLED = False
@@ -756,6 +771,77 @@ ALARM_DISABLE_STRATEGY_RULES = []
 # access模块数据拉取延迟时间
 ACCESS_DATA_TIME_DELAY = 10
 
+# detect模块批量检测开关(阈值及同环比类算法先整体预筛选，再对候选点逐点生成异常信息)
+DETECT_BATCH_ENABLED = False
+# detect模块同环比历史数据是否按时间序列存储(每个维度一个环形缓冲区，按需批量获取)
+DETECT_HISTORY_SERIES_ENABLED = False
+# 历史数据环形缓冲区在偏移区间之外额外保留的周期数
+DETECT_HISTORY_SERIES_WINDOW = 30
+
+# access模块数据去重是否使用批量模式(按 record_id 批量确认，不再拉取整个去重集合)
+ACCESS_DUPLICATE_BATCH_ENABLED = True
+# access模块数据去重进程内缓存的最大 record_id 数量
+ACCESS_DUPLICATE_LOCAL_CACHE_SIZE = 500000
+
+# access/detect/trigger 间队列是否使用打包编码(需所有后台进程升级后再开启)
+ALARM_QUEUE_PACKED_ENCODING = False
+# 打包编码时单个队列元素包含的最大记录数
+ALARM_QUEUE_PACKED_CHUNK_SIZE = 200
+
+# access(data) 是否按业务数据拉取耗时分配业务到各机器(需所有 access 进程升级后再开启)
+ACCESS_DATA_LOAD_AWARE_DISPATCH = False
+# 按耗时分配时，单次最多偏离哈希环分配的业务数量(两次分配之间迁移的业务数量最多为该值的2倍)
+ACCESS_DATA_DISPATCH_MAX_MOVES = 20
+
+# 无数据检测是否使用各维度最近上报时间代替原始数据队列(需 access 及 nodata 进程均升级后再开启)
+NODATA_LAST_SEEN_ENABLED = False
+
+# 告警状态变更信号批量发送时单个任务包含的最大告警数，为0时逐条发送(需 composite worker 升级后再开启)
+ALERT_SIGNAL_BATCH_SIZE = 0
+
+# 告警、流水日志及事件是否通过批量写入服务写入ES(告警及流水日志为异步写入)
+ES_BULK_WRITER_ENABLED = False
+# ES批量写入单次请求的最大文档数
+ES_BULK_WRITER_BATCH_SIZE = 500
+# ES批量写入的最大刷新间隔(秒)
+ES_BULK_WRITER_FLUSH_INTERVAL = 1
+# ES批量写入队列的最大文档数，队列满时由调用方同步写入
+ES_BULK_WRITER_QUEUE_SIZE = 20000
+# ES批量写入队列满时的最大等待时间(秒)
+ES_BULK_WRITER_PUT_TIMEOUT = 1
+# ES批量写入时不同索引的最大并发请求数
+ES_BULK_WRITER_CONCURRENCY = 4
+# ES批量写入失败文档的最大重试次数
+ES_BULK_WRITER_MAX_RETRIES = 3
+# ES异步批量写入重试次数用尽后，后台线程继续重试失败文档的最大轮数(期间不写入后续文档)
+ES_BULK_WRITER_RETRY_ROUNDS = 5
+# celery任务结束时等待ES异步批量写入完成的最大时间(秒)，超时后剩余文档由后台线程继续写入
+ES_BULK_WRITER_TASK_FLUSH_TIMEOUT = 10
+
+# 告警快照是否使用压缩编码写入(需所有后台进程升级后再开启)
+ALERT_SNAPSHOT_COMPRESS = False
+
+# 后台进程是否复用进程内已构建的策略及监控项(策略缓存内容不变时不再重新解析)
+STRATEGY_REGISTRY_ENABLED = False
+# 进程内策略注册表的最大策略数量
+STRATEGY_REGISTRY_SIZE = 5000
+
+# CMDB缓存进程内缓存的最大对象数量(按缓存类型分别计算)，为0时不使用进程内缓存
+CMDB_LOCAL_CACHE_SIZE = 100000
+# CMDB缓存进程内缓存主动比对版本的间隔(秒)，作为订阅通知丢失或不可用时的兜底
+CMDB_LOCAL_CACHE_VERSION_CHECK_INTERVAL = 60
+# API资源按模块(module_name)配置的批量请求并发数，未配置的模块使用 default 配置
+API_MODULE_CONCURRENCY = {"default": 10}
+# API资源按模块(module_name)配置的HTTP连接池大小，未配置的模块使用 default 配置
+API_MODULE_POOL_SIZE = {"default": 10}
+# 是否合并参数相同的并发API请求(仅对GET请求及开启缓存的资源生效)
+API_SINGLEFLIGHT_ENABLED = False
+
+# CMDB缓存按业务刷新的并发数，为1时逐个业务刷新
+CMDB_CACHE_REFRESH_CONCURRENCY = 1
+# CMDB缓存全量写入的间隔(秒)，期间只写入内容变化或缺失的对象，为0时每次都全量写入
+CMDB_CACHE_FULL_REFRESH_INTERVAL = 60 * 60
+
 # kafka是否自动提交配置
 KAFKA_AUTO_COMMIT = True
 
@@ -1341,6 +1427,9 @@ BCS_APIGW_BASE_URL = os.getenv("BKAPP_BCS_APIGW_BASE_URL", "")
 # 获取指标的间隔时间，默认为 2 hour
 FETCH_TIME_SERIES_METRIC_INTERVAL_SECONDS = 7200
 
+# 是否增量发现自定义指标，按分组记录同步水位，只同步维度有变化的指标
+ENABLE_TS_METRIC_INCREMENTAL_DISCOVERY = False
+
 # 是否启用 metadata 新功能
 IS_ENABLE_METADATA_FUNCTION_CONTROLLER = True
 
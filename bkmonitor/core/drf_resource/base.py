@@ -223,6 +223,13 @@ class Resource(six.with_metaclass(abc.ABCMeta, object)):
             validated_response_data = self.validate_response_data(response_data)
             return validated_response_data
 
+    def get_executor(self):
+        """
+        批量请求使用的共享线程池，为空时每次批量请求创建新的线程池
+        :rtype: core.drf_resource.concurrency.ModuleExecutor
+        """
+        return None
+
     def bulk_request(self, request_data_iterable=None, ignore_exceptions=False):
         """
         基于多线程的批量并发请求
@@ -230,19 +237,20 @@ class Resource(six.with_metaclass(abc.ABCMeta, object)):
         if not isinstance(request_data_iterable, (list, tuple)):
             raise TypeError("'request_data_iterable' object is not iterable")
 
-        pool = ThreadPool()
-        futures = []
-        for request_data in request_data_iterable:
-            futures.append(pool.apply_async(self.request, args=(request_data,)))
-
-        pool.close()
-        pool.join()
+        executor = self.get_executor()
+        if executor:
+            futures = [executor.submit(self.request, request_data) for request_data in request_data_iterable]
+        else:
+            pool = ThreadPool()
+            futures = [pool.apply_async(self.request, args=(request_data,)) for request_data in request_data_iterable]
+            pool.close()
+            pool.join()
 
         results = []
         exceptions = []
         for future in futures:
             try:
-                results.append(future.get())
+                results.append(future.result() if executor else future.get())
             except Exception as e:
                 # 判断是否忽略错误
                 if not ignore_exceptions:
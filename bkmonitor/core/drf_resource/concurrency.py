@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+Resource 并发控制，均为进程内共享，fork 后的子进程重新创建
+
+1. ModuleExecutor: 按模块(module_name)共享的有界线程池，限制同一下游系统的并发请求数
+2. SingleFlight: 相同参数的请求在执行中时，后续请求等待并复用其结果，不再重复请求
+3. get_http_adapter: 按模块共享的 HTTP 连接池
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from bkmonitor.utils.thread_backend import ThreadPool
+from core.prometheus import metrics
+
+
+def get_module_setting(name, module_name, default):
+    """
+    获取按模块配置的参数，未配置的模块使用 default 配置
+    """
+    config = getattr(settings, name, None) or {}
+    return config.get(module_name, config.get("default", default))
+
+
+class ModuleExecutor(object):
+    """
+    模块共享线程池
+    """
+
+    _local = threading.local()
+
+    def __init__(self, module_name, max_workers):
+        self.module_name = module_name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"resource-{module_name}")
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        # 任意模块线程池内的任务再次提交任务时直接执行，避免线程池占满后相互等待
+        # 包括跨模块的嵌套提交(A -> B -> A)，此时两个线程池可能都已占满
+        if getattr(self._local, "executor", None) is not None:
+            future = Future()
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        # 同步 local 数据、时区及语言等线程变量
+        func = ThreadPool.get_func_with_local(func)
+        submit_time = time.time()
+
+        def run():
+            metrics.API_RESOURCE_QUEUE_WAIT_TIME.labels(module=self.module_name).observe(time.time() - submit_time)
+            self._local.executor = self
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.executor = None
+
+        return self._executor.submit(run)
+
+
+class SingleFlight(object):
+    """
+    请求合并
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        """
+        执行函数，相同 key 的函数正在执行时等待其结果
+        :return: (结果, 是否复用了其他请求的结果)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = Future()
+
+        if not is_leader:
+            return call.result(), True
+
+        try:
+            result = func()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+_lock = threading.Lock()
+_pid = None
+_executors = {}
+_adapters = {}
+_single_flight = SingleFlight()
+
+
+def _check_pid():
+    """
+    fork 后线程池及连接不可继承，需要重新创建
+    """
+    global _pid, _single_flight
+    if _pid == os.getpid():
+        return
+    with _lock:
+        if _pid != os.getpid():
+            _executors.clear()
+            _adapters.clear()
+            _single_flight = SingleFlight()
+            _pid = os.getpid()
+
+
+def get_executor(module_name) -> ModuleExecutor:
+    _check_pid()
+    executor = _executors.get(module_name)
+    if executor is None:
+        with _lock:
+            executor = _executors.get(module_name)
+            if executor is None:
+                max_workers = get_module_setting("API_MODULE_CONCURRENCY", module_name, 10)
+                executor = _executors[module_name] = ModuleExecutor(module_name, max_workers)
+    return executor
+
+
+def get_http_adapter(module_name) -> HTTPAdapter:
+    _check_pid()
+    adapter = _adapters.get(module_name)
+    if adapter is None:
+        with _lock:
+            adapter = _adapters.get(module_name)
+            if adapter is None:
+                pool_size = get_module_setting("API_MODULE_POOL_SIZE", module_name, 10)
+                adapter = _adapters[module_name] = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    return adapter
+
+
+def get_single_flight() -> SingleFlight:
+    _check_pid()
+    return _single_flight
@@ -11,6 +11,7 @@ specific language governing permissions and limitations under the License.
 
 
 import abc
+import json
 import logging
 
 import requests
@@ -24,9 +25,15 @@ from requests.exceptions import HTTPError, ReadTimeout
 
 from bkmonitor.utils.request import get_common_headers, get_request
 from bkmonitor.utils.user import make_userinfo
+from core.drf_resource.concurrency import (
+    get_executor,
+    get_http_adapter,
+    get_single_flight,
+)
 from core.drf_resource.contrib.cache import CacheResource
 from core.errors.api import BKAPIError
 from core.errors.iam import APIPermissionDeniedError
+from core.prometheus import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -129,6 +136,13 @@ class APIResource(six.with_metaclass(abc.ABCMeta, CacheResource)):
         assert self.method.upper() in ["GET", "POST", "PUT", "DELETE", "PATCH"], _("method仅支持GET或POST或PUT或DELETE或PATCH")
         self.method = self.method.upper()
         self.session = requests.session()
+        # 同一模块的请求共享连接池
+        adapter = get_http_adapter(self.module_name)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get_executor(self):
+        return get_executor(self.module_name)
 
     def request(self, request_data=None, **kwargs):
         request_data = request_data or kwargs
@@ -169,6 +183,57 @@ class APIResource(six.with_metaclass(abc.ABCMeta, CacheResource)):
         request_url = self.get_request_url(validated_request_data)
         logger.debug("request: {}".format(request_url))
 
+        singleflight_key = self.get_singleflight_key(request_url, validated_request_data)
+        if singleflight_key is None:
+            result = self.send_request(request_url, validated_request_data)
+        else:
+            # 已读取完毕的响应可在多个线程中分别解析，各请求得到的数据互不影响
+            result, shared = get_single_flight().do(
+                singleflight_key, lambda: self.send_request(request_url, validated_request_data)
+            )
+            metrics.API_RESOURCE_SINGLEFLIGHT_COUNT.labels(
+                module=self.module_name, result="shared" if shared else "requested"
+            ).inc()
+        result_json = self.parse_response(request_url, result)
+
+        # 渲染数据
+        if self.IS_STANDARD_FORMAT:
+            response_data = self.render_response_data(validated_request_data, result_json.get("data"))
+        else:
+            response_data = self.render_response_data(validated_request_data, result_json)
+
+        return response_data
+
+    def get_singleflight_key(self, request_url, validated_request_data):
+        """
+        请求合并的key，为空时不合并
+        仅合并 GET 请求及开启了缓存的请求，这类请求不会修改下游数据
+        """
+        if not getattr(settings, "API_SINGLEFLIGHT_ENABLED", False):
+            return None
+        if self.method != "GET" and self.cache_type is None and self.backend_cache_type is None:
+            return None
+
+        try:
+            # 请求头中包含语言等信息，会影响返回结果
+            params = json.dumps([validated_request_data, self.get_headers()], sort_keys=True)
+        except (TypeError, ValueError):
+            # 文件等无法序列化的参数不合并
+            return None
+        return "{}.{}".format(self.__class__.__module__, self.__class__.__name__), self.method, request_url, params
+
+    def send_request(self, request_url, validated_request_data):
+        """
+        发起http请求
+        :rtype: requests.Response
+        """
+        metrics.API_RESOURCE_INFLIGHT_REQUESTS.labels(module=self.module_name).inc()
+        try:
+            return self._send_request(request_url, validated_request_data)
+        finally:
+            metrics.API_RESOURCE_INFLIGHT_REQUESTS.labels(module=self.module_name).dec()
+
+    def _send_request(self, request_url, validated_request_data):
         try:
             headers = self.get_headers()
             kwargs = {
@@ -206,7 +271,12 @@ class APIResource(six.with_metaclass(abc.ABCMeta, CacheResource)):
                 result = self.session.request(**kwargs)
         except ReadTimeout:
             raise BKAPIError(system_name=self.module_name, url=self.action, result=_("接口返回结果超时"))
+        return result
 
+    def parse_response(self, request_url, result):
+        """
+        校验接口返回结果
+        """
         try:
             result.raise_for_status()
         except HTTPError as err:
@@ -240,13 +310,7 @@ class APIResource(six.with_metaclass(abc.ABCMeta, CacheResource)):
             #     self.module_name, request_url, validated_request_data, result_json)
             raise BKAPIError(system_name=self.module_name, url=self.action, result=result_json)
 
-        # 渲染数据
-        if self.IS_STANDARD_FORMAT:
-            response_data = self.render_response_data(validated_request_data, result_json.get("data"))
-        else:
-            response_data = self.render_response_data(validated_request_data, result_json)
-
-        return response_data
+        return result_json
 
     @property
     def label(self):
@@ -16,7 +16,7 @@ from django.conf import settings
 from prometheus_client.exposition import push_to_gateway
 from prometheus_client.utils import INF
 
-from core.prometheus.base import REGISTRY, BkCollectorRegistry, Counter, Histogram
+from core.prometheus.base import REGISTRY, BkCollectorRegistry, Counter, Gauge, Histogram
 from core.prometheus.tools import get_metric_agg_gateway_url, udp_handler
 
 logger = logging.getLogger(__name__)
@@ -102,6 +102,12 @@ DATASOURCE_QUERY_COUNT = Counter(
     labelnames=("data_source_label", "data_type_label", "role", "result_table", "api", "status", "exception"),
 )
 
+UNIFY_QUERY_CACHE_BUCKET_COUNT = Counter(
+    name="bkmonitor_unify_query_cache_bucket_count",
+    documentation="图表查询时间桶缓存命中情况",
+    labelnames=("bk_biz_id", "result"),
+)
+
 # access
 ACCESS_DATA_PROCESS_TIME = Histogram(
     name="bkmonitor_access_data_process_time",
@@ -314,6 +320,24 @@ Alert_QOS_COUNT = Counter(
     labelnames=("strategy_id", "is_blocked"),
 )
 
+ES_BULK_WRITER_QUEUE_SIZE = Gauge(
+    name="bkmonitor_es_bulk_writer_queue_size",
+    documentation="ES 批量写入队列长度",
+    labelnames=("document",),
+)
+
+ES_BULK_WRITER_FLUSH_TIME = Histogram(
+    name="bkmonitor_es_bulk_writer_flush_time",
+    documentation="ES 批量写入耗时",
+    labelnames=("document",),
+)
+
+ES_BULK_WRITER_DOCUMENT_COUNT = Counter(
+    name="bkmonitor_es_bulk_writer_document_count",
+    documentation="ES 批量写入文档数",
+    labelnames=("document", "status"),
+)
+
 # composite
 COMPOSITE_PROCESS_TIME = Histogram(
     name="bkmonitor_composite_process_time",
@@ -439,6 +463,24 @@ ALARM_CACHE_TASK_TIME = Histogram(
     buckets=(1, 3, 5, 10, 30, 60, 300, INF),
 )
 
+ALARM_CACHE_CHANGED_KEY_COUNT = Counter(
+    name="bkmonitor_alarm_cache_changed_key_count",
+    documentation="数据缓存刷新时发生变化的对象数量",
+    labelnames=("bk_biz_id", "type"),
+)
+
+STRATEGY_REGISTRY_COUNT = Counter(
+    name="bkmonitor_strategy_registry_count",
+    documentation="进程内策略注册表获取次数",
+    labelnames=("result",),
+)
+
+STRATEGY_SNAPSHOT_WRITE_COUNT = Counter(
+    name="bkmonitor_strategy_snapshot_write_count",
+    documentation="策略快照写入次数",
+    labelnames=("result",),
+)
+
 # mail report
 MAIL_REPORT_SEND_LATENCY = Histogram(
     name="bkmonitor_mail_report_send_latency",
@@ -460,4 +502,32 @@ CELERY_TASK_EXECUTE_TIME = Histogram(
     buckets=(0.1, 0.5, 1, 3, 5, 10, 30, 60, 300, 1800, INF),
 )
 
+# apm
+APM_PRE_CALCULATE_SPAN_THROUGHPUT = Histogram(
+    name="bkmonitor_apm_pre_calculate_span_throughput",
+    documentation="APM 预计算处理速率(span/s)",
+    labelnames=("bk_biz_id", "app_name", "mode"),
+    buckets=(100, 500, 1000, 5000, 10000, 50000, 100000, 500000, INF),
+)
+
+# api resource
+API_RESOURCE_INFLIGHT_REQUESTS = Gauge(
+    name="bkmonitor_api_resource_inflight_requests",
+    documentation="API 资源正在执行的请求数",
+    labelnames=("module",),
+)
+
+API_RESOURCE_SINGLEFLIGHT_COUNT = Counter(
+    name="bkmonitor_api_resource_singleflight_count",
+    documentation="API 资源请求合并次数",
+    labelnames=("module", "result"),
+)
+
+API_RESOURCE_QUEUE_WAIT_TIME = Histogram(
+    name="bkmonitor_api_resource_queue_wait_time",
+    documentation="API 资源批量请求在线程池中的排队耗时",
+    labelnames=("module",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 3, 5, 10, 30, INF),
+)
+
 TOTAL_TAG = "__total__"
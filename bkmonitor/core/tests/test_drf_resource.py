@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import threading
+import time
+
+import pytest
+
+from core.drf_resource.concurrency import (
+    ModuleExecutor,
+    SingleFlight,
+    get_executor,
+    get_http_adapter,
+)
+
+
+class TestSingleFlight(object):
+    def test_do(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        def func():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"result": True}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(single_flight.do("key", func))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert sorted(shared for __, shared in results) == [False, True, True, True, True]
+        assert all(result == {"result": True} for result, __ in results)
+
+        # 请求结束后不再复用结果
+        assert single_flight.do("key", func) == ({"result": True}, False)
+        assert len(calls) == 2
+
+    def test_exception(self):
+        single_flight = SingleFlight()
+
+        def func():
+            raise ValueError("error")
+
+        with pytest.raises(ValueError):
+            single_flight.do("key", func)
+        assert single_flight.do("key", lambda: 1) == (1, False)
+
+
+class TestModuleExecutor(object):
+    def test_nested_submit(self):
+        executor = ModuleExecutor("test", max_workers=1)
+
+        def outer():
+            # 线程池已满时，嵌套提交的任务直接执行
+            return executor.submit(lambda: threading.current_thread().name).result(timeout=1)
+
+        assert executor.submit(outer).result(timeout=1).startswith("resource-test")
+
+    def test_cross_module_nested_submit(self):
+        executor_a = ModuleExecutor("a", max_workers=1)
+        executor_b = ModuleExecutor("b", max_workers=1)
+
+        def inner():
+            # 跨模块嵌套提交(A -> B -> A)时同样直接执行
+            return executor_a.submit(lambda: threading.current_thread().name).result(timeout=1)
+
+        def outer():
+            return executor_b.submit(inner).result(timeout=1)
+
+        assert executor_a.submit(outer).result(timeout=1).startswith("resource-a")
+
+    def test_shared_by_module(self, settings):
+        settings.API_MODULE_CONCURRENCY = {"default": 3, "cmdb": 5}
+        settings.API_MODULE_POOL_SIZE = {"default": 3, "cmdb": 5}
+        assert get_executor("cmdb") is get_executor("cmdb")
+        assert get_executor("cmdb").max_workers == 5
+        assert get_executor("bcs").max_workers == 3
+        assert get_http_adapter("cmdb") is get_http_adapter("cmdb")
+        assert get_http_adapter("cmdb")._pool_maxsize == 5
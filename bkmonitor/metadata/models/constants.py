@@ -421,6 +421,12 @@ INFLUXDB_ADDITIONAL_INFO_FOR_UNIFY_QUERY = "query_router_info"
 # 查询 vm 存储的路由信息
 QUERY_VM_STORAGE_ROUTER_KEY = "query_vm_router"
 
+# 自定义指标增量发现 Redis Keys
+# 各分组已同步的指标上报时间水位
+TS_METRIC_WATERMARK_KEY = "bkmonitorv3:ts_metric:watermark"
+# 各分组已同步指标的维度摘要，后缀为分组ID
+TS_METRIC_DIGEST_KEY_PREFIX = "bkmonitorv3:ts_metric:digest"
+
 # 批量写入数量限制
 BULK_CREATE_BATCH_SIZE = 2000
 
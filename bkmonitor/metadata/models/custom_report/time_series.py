@@ -24,12 +24,15 @@ from django.utils.timezone import make_aware
 from django.utils.timezone import now as tz_now
 from django.utils.translation import ugettext as _
 
+from bkmonitor.utils.common_utils import count_md5
 from bkmonitor.utils.db.fields import JsonField
 from metadata import config
 from metadata.models.constants import (
     BULK_CREATE_BATCH_SIZE,
     BULK_UPDATE_BATCH_SIZE,
     DB_DUPLICATE_ID,
+    TS_METRIC_DIGEST_KEY_PREFIX,
+    TS_METRIC_WATERMARK_KEY,
 )
 from metadata.models.result_table import (
     ResultTable,
@@ -38,6 +41,7 @@ from metadata.models.result_table import (
 )
 from metadata.models.storage import ClusterInfo
 from metadata.utils.db import filter_model_by_in_page
+from metadata.utils.redis_tools import RedisTools
 from utils.redis_client import RedisClient
 
 from .base import CustomGroupBase
@@ -52,6 +56,9 @@ class TimeSeriesGroup(CustomGroupBase):
     # 默认表名
     DEFAULT_MEASUREMENT = "__default__"
 
+    # 增量发现时水位回退的时间，容忍 transfer 写入延迟，重复拉取的指标通过维度摘要过滤
+    METRIC_WATERMARK_OFFSET_SECONDS = 5 * 60
+
     GROUP_ID_FIELD = "time_series_group_id"
     GROUP_NAME_FIELD = "time_series_group_name"
 
@@ -456,10 +463,28 @@ class TimeSeriesGroup(CustomGroupBase):
     def metric_consul_path(self):
         return "{}/influxdb_metrics/{}/time_series_metric".format(config.CONSUL_PATH, self.bk_data_id)
 
-    def get_metrics_from_redis(self, expired_time: Optional[int] = settings.TIME_SERIES_METRIC_EXPIRED_SECONDS):
+    def get_metrics_from_redis(
+        self,
+        expired_time: Optional[int] = settings.TIME_SERIES_METRIC_EXPIRED_SECONDS,
+        begin_ts: Optional[float] = None,
+    ):
         """从 redis 中获取数据
 
         其中，redis 中数据有 transfer 上报
+        :param expired_time: 有效期，只获取有效期内上报的指标
+        :param begin_ts: 只获取该时间之后上报的指标
+        """
+        return self.fetch_metrics_from_redis(expired_time=expired_time, begin_ts=begin_ts)[0]
+
+    def fetch_metrics_from_redis(
+        self,
+        expired_time: Optional[int] = settings.TIME_SERIES_METRIC_EXPIRED_SECONDS,
+        begin_ts: Optional[float] = None,
+    ) -> Tuple[List, bool]:
+        """从 redis 中获取数据，并返回是否有分批拉取失败
+
+        参数同 get_metrics_from_redis
+        :return: (指标列表, 是否有分批拉取失败)
         """
         client = RedisClient.from_envs(prefix="BK_MONITOR_TRANSFER")
         custom_metrics_key = f"{settings.METRICS_KEY_PREFIX}{self.bk_data_id}"
@@ -468,9 +493,12 @@ class TimeSeriesGroup(CustomGroupBase):
         now_time = tz_now()
         fetch_step = settings.MAX_METRICS_FETCH_STEP
         valid_begin_ts = (now_time - datetime.timedelta(seconds=expired_time)).timestamp()
+        if begin_ts:
+            valid_begin_ts = max(valid_begin_ts, begin_ts)
         metrics_filter_params = {"name": custom_metrics_key, "min": valid_begin_ts, "max": now_time.timestamp()}
 
         metrics_info = []
+        has_failure = False
         # 分批拉取 redis 数据，防止大批量数据拖垮
         for i in range(math.ceil(client.zcount(**metrics_filter_params) / fetch_step)):
             try:
@@ -481,6 +509,7 @@ class TimeSeriesGroup(CustomGroupBase):
             except Exception:
                 logger.exception("failed to get metrics from storage, filter params: %s", metrics_filter_params)
                 # metrics 可能存在大批量内容，可容忍某一步出错
+                has_failure = True
                 continue
 
             # 1. 获取当前这批 metrics 的 dimensions 信息
@@ -488,6 +517,7 @@ class TimeSeriesGroup(CustomGroupBase):
                 dimensions_list: List[bytes] = client.hmget(metric_dimensions_key, [x[0] for x in metrics_with_scores])
             except Exception:
                 logger.exception("failed to get dimensions from metrics")
+                has_failure = True
                 continue
 
             # 2. 尝试更新 metrics 和对应 dimensions(tags)
@@ -514,13 +544,89 @@ class TimeSeriesGroup(CustomGroupBase):
                         "last_modify_time": metric_with_score[1],
                     }
                 )
-        return metrics_info
+        return metrics_info, has_failure
+
+    @property
+    def metric_digest_key(self):
+        return f"{TS_METRIC_DIGEST_KEY_PREFIX}:{self.time_series_group_id}"
+
+    @staticmethod
+    def get_dimensions_digest(metric_info: Dict) -> str:
+        """计算指标维度集合的摘要"""
+        return count_md5(list(metric_info["tag_value_list"].keys()))
+
+    def filter_changed_metrics(self, metrics_info: List) -> Tuple[List, Dict]:
+        """过滤出维度有变化的指标
+
+        指标最后更新时间在 DB 中按天刷新，因此距离上次同步超过一天的指标也需要同步
+        :return: (需要同步的指标, 需要更新的维度摘要)
+        """
+        changed_metrics_info, digests = [], {}
+        fetch_step = settings.MAX_METRICS_FETCH_STEP
+        for i in range(0, len(metrics_info), fetch_step):
+            chunk = metrics_info[i : i + fetch_step]
+            try:
+                old_digests = RedisTools.hmget(self.metric_digest_key, [m["field_name"] for m in chunk])
+            except Exception:
+                logger.exception("failed to get metric digests, group_id: %s", self.time_series_group_id)
+                old_digests = [None] * len(chunk)
+
+            for metric_info, old_digest in zip(chunk, old_digests):
+                digest = self.get_dimensions_digest(metric_info)
+                last_modify_time = metric_info["last_modify_time"]
+                if old_digest:
+                    old_digest, __, synced_time = old_digest.decode("utf-8").partition("|")
+                    if old_digest == digest and last_modify_time - float(synced_time or 0) < 24 * 3600:
+                        continue
+                changed_metrics_info.append(metric_info)
+                digests[metric_info["field_name"]] = f"{digest}|{last_modify_time}"
+        return changed_metrics_info, digests
+
+    def update_changed_time_series_metrics(self) -> bool:
+        """增量同步TS的指标和维度对应关系
+
+        只拉取水位之后上报的指标，并跳过维度未变化的指标；全部拉取且同步成功后才推进水位，否则下次重新拉取
+        :return: 返回是否有更新指标
+        """
+        group_id = str(self.time_series_group_id)
+        now_ts = time.time()
+        begin_ts = None
+        watermark = RedisTools.hget(TS_METRIC_WATERMARK_KEY, group_id)
+        if watermark:
+            begin_ts = float(watermark) - self.METRIC_WATERMARK_OFFSET_SECONDS
+
+        metrics_info, has_failure = self.fetch_metrics_from_redis(
+            expired_time=settings.FETCH_TIME_SERIES_METRIC_INTERVAL_SECONDS, begin_ts=begin_ts
+        )
+        metrics_info, digests = self.filter_changed_metrics(metrics_info)
+        is_updated = False
+        if metrics_info:
+            is_updated = self.update_metrics(metrics_info)
+            digest_items = list(digests.items())
+            for i in range(0, len(digest_items), BULK_UPDATE_BATCH_SIZE):
+                RedisTools.hmset_to_redis(self.metric_digest_key, dict(digest_items[i : i + BULK_UPDATE_BATCH_SIZE]))
+            RedisTools().client.expire(self.metric_digest_key, settings.TIME_SERIES_METRIC_EXPIRED_SECONDS)
+
+        # 存在拉取失败的分批时不推进水位，下次从原水位重新拉取
+        if not has_failure:
+            RedisTools.hset_to_redis(TS_METRIC_WATERMARK_KEY, group_id, now_ts)
+        logger.info(
+            "TimeSeriesGroup<%s> incrementally updated %s metrics, is_updated: %s, has_failure: %s",
+            self.pk,
+            len(metrics_info),
+            is_updated,
+            has_failure,
+        )
+        return is_updated
 
     def update_time_series_metrics(self) -> bool:
         """从远端存储中同步TS的指标和维度对应关系
 
         :return: 返回是否有更新指标
         """
+        if settings.ENABLE_TS_METRIC_INCREMENTAL_DISCOVERY:
+            return self.update_changed_time_series_metrics()
+
         metrics_info = self.get_metrics_from_redis(expired_time=settings.FETCH_TIME_SERIES_METRIC_INTERVAL_SECONDS)
         # 如果为空，直接返回
         if not metrics_info:
@@ -543,6 +649,11 @@ class TimeSeriesGroup(CustomGroupBase):
         metrics_queryset.delete()
         logger.info("all metrics about {}->[{}] is deleted.".format(self.__class__.__name__, self.time_series_group_id))
 
+        if settings.ENABLE_TS_METRIC_INCREMENTAL_DISCOVERY:
+            # 清理增量发现的水位及维度摘要，避免重新启用时跳过已删除的指标
+            RedisTools.hdel(TS_METRIC_WATERMARK_KEY, [str(self.time_series_group_id)])
+            RedisTools().client.delete(self.metric_digest_key)
+
     @classmethod
     @atomic(config.DATABASE_CONNECTION_NAME)
     def create_time_series_group(
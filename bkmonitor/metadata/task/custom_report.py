@@ -13,11 +13,13 @@ specific language governing permissions and limitations under the License.
 import logging
 import time
 import traceback
+from queue import Empty
 from typing import Optional
 
 import billiard as multiprocessing
 from django import db
 from django.conf import settings
+from django.db.models import Count
 
 from alarm_backends.core.lock.service_lock import share_lock
 from bkmonitor.utils.version import compare_versions, get_max_version
@@ -143,6 +145,24 @@ def refresh_custom_report_2_node_man(bk_biz_id=None):
         logger.exception("refresh custom report config to colletor error: %s" % e)
 
 
+def iter_time_series_groups(queue):
+    """从任务队列中获取待同步的分组，队列为空时结束"""
+    while True:
+        try:
+            group_id = queue.get(timeout=1)
+        except Empty:
+            return
+        ts_group = models.TimeSeriesGroup.objects.filter(time_series_group_id=group_id).first()
+        if ts_group:
+            yield ts_group
+
+
+def update_time_series_metrics_by_queue(queue):
+    from metadata.task.tasks import update_time_series_metrics
+
+    update_time_series_metrics(iter_time_series_groups(queue))
+
+
 @share_lock(ttl=PERIODIC_TASK_DEFAULT_TTL, identify="metadata_refreshTimeSeriesMetrics")
 def check_update_ts_metric():
     logger.info("check_update_ts_metric:start")
@@ -155,16 +175,34 @@ def check_update_ts_metric():
         return
     # 限制多进程任务数量
     max_worker = getattr(settings, "MAX_TS_METRIC_TASK_PROCESS_NUM", 1)
-    # 每一组最大任务数量
-    chunk_size = count // max_worker + 1 if count % max_worker != 0 else int(count / max_worker)
-    # 按数量分组，最多分为max_worker组
-    chunks = [ts_groups[i : i + chunk_size] for i in range(0, count, chunk_size)]
+    if settings.ENABLE_TS_METRIC_INCREMENTAL_DISCOVERY:
+        # 按指标数量从多到少放入任务队列，各进程从队列中获取分组，避免指标多的分组集中在同一个进程
+        group_ids = list(ts_groups.values_list("time_series_group_id", flat=True))
+        metric_counts = dict(
+            models.TimeSeriesMetric.objects.values("group_id")
+            .annotate(count=Count("group_id"))
+            .order_by()
+            .values_list("group_id", "count")
+        )
+        group_ids.sort(key=lambda group_id: metric_counts.get(group_id, 0), reverse=True)
+        queue = multiprocessing.Queue()
+        for group_id in group_ids:
+            queue.put(group_id)
+        target = update_time_series_metrics_by_queue
+        process_args = [(queue,) for __ in range(min(int(max_worker), count))]
+    else:
+        # 每一组最大任务数量
+        chunk_size = count // max_worker + 1 if count % max_worker != 0 else int(count / max_worker)
+        # 按数量分组，最多分为max_worker组
+        chunks = [ts_groups[i : i + chunk_size] for i in range(0, count, chunk_size)]
+        target = update_time_series_metrics
+        process_args = [(chunk,) for chunk in chunks]
     processes = []
     # 使用django-ORM时启用多进程会导致子进程使用同一个数据库连接，会产生无效连接，在启用多进程之前需要关闭连接，子进程中会重新创建连接
     db.connections.close_all()
-    for chunk in chunks:
+    for args in process_args:
         # multiprocessing库在celery中会导致worker假死，使用billiard库启用多进程
-        t = multiprocessing.Process(target=update_time_series_metrics, args=(chunk,))
+        t = multiprocessing.Process(target=target, args=args)
         processes.append(t)
         t.start()
 
@@ -9,10 +9,13 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import datetime
+import time
 
 import pytest
+from mockredis import mock_redis_client
 
 from metadata import models
+from metadata.utils.redis_tools import RedisTools
 
 pytestmark = pytest.mark.django_db
 
@@ -178,3 +181,57 @@ def test_delete_ts_metrics(create_and_delete_records):
 
     objs = models.TimeSeriesMetric.objects.filter(group_id=DEFAULT_GROUP_ID, field_name="disk_usage1")
     assert not objs.exists()
+
+
+@pytest.mark.django_db(databases=["default", "monitor_api"])
+def test_update_changed_ts_metrics(mocker, settings, create_and_delete_records):
+    settings.ENABLE_TS_METRIC_INCREMENTAL_DISCOVERY = True
+    mocker.patch.object(RedisTools, "metadata_redis_client", mock_redis_client())
+    curr_time = int(time.time())
+    metric_info_list = [
+        {
+            "field_name": "disk_usage",
+            "tag_value_list": {
+                "disk_name": {"last_update_time": curr_time, "values": None},
+                "bk_target_ip": {"last_update_time": curr_time, "values": None},
+            },
+            "last_modify_time": curr_time,
+        }
+    ]
+    get_metrics = mocker.patch.object(
+        models.TimeSeriesGroup, "fetch_metrics_from_redis", return_value=(metric_info_list, False)
+    )
+    update_metrics = mocker.patch.object(models.TimeSeriesGroup, "update_metrics", return_value=False)
+    group = models.TimeSeriesGroup.objects.get(time_series_group_id=DEFAULT_GROUP_ID)
+
+    # 首次同步没有水位，拉取全部有效期内的指标
+    group.update_time_series_metrics()
+    assert get_metrics.call_args[1]["begin_ts"] is None
+    update_metrics.assert_called_once_with(metric_info_list)
+
+    # 只拉取水位之后的指标，维度未变化时跳过
+    update_metrics.reset_mock()
+    group.update_time_series_metrics()
+    assert get_metrics.call_args[1]["begin_ts"] >= curr_time - group.METRIC_WATERMARK_OFFSET_SECONDS
+    update_metrics.assert_not_called()
+
+    # 维度变化时同步
+    metric_info_list[0]["tag_value_list"]["endpoint"] = {"last_update_time": curr_time, "values": None}
+    group.update_time_series_metrics()
+    update_metrics.assert_called_once_with(metric_info_list)
+
+    # 距离上次同步超过一天时，需要刷新指标的最后更新时间
+    update_metrics.reset_mock()
+    metric_info_list[0]["last_modify_time"] = curr_time + 24 * 3600
+    group.update_time_series_metrics()
+    update_metrics.assert_called_once_with(metric_info_list)
+
+    # 存在拉取失败的分批时不推进水位，下次从原水位重新拉取
+    get_metrics.return_value = (metric_info_list, True)
+    group.update_time_series_metrics()
+    begin_ts = get_metrics.call_args[1]["begin_ts"]
+    get_metrics.return_value = (metric_info_list, False)
+    group.update_time_series_metrics()
+    assert get_metrics.call_args[1]["begin_ts"] == begin_ts
+    group.update_time_series_metrics()
+    assert get_metrics.call_args[1]["begin_ts"] > begin_ts
@@ -10,14 +10,16 @@ specific language governing permissions and limitations under the License.
 """
 import logging
 import re
+import time
 from collections import defaultdict
 from dataclasses import asdict
 from functools import reduce
 from itertools import chain
-from typing import Dict, List, Pattern, Tuple
+from typing import Dict, List, Optional, Pattern, Tuple
 
 import arrow
 from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Q
 from django.forms import model_to_dict
 from django.utils import timezone
@@ -41,6 +43,7 @@ from bkmonitor.data_source.unify_query.query import UnifyQuery
 from bkmonitor.models import MetricListCache
 from bkmonitor.share.api_auth_resource import ApiAuthResource
 from bkmonitor.strategy.new_strategy import get_metric_id
+from bkmonitor.utils.common_utils import count_md5
 from bkmonitor.utils.time_tools import (
     hms_string,
     parse_time_compare_abbreviation,
@@ -56,7 +59,10 @@ from constants.strategy import SYSTEM_EVENT_RT_TABLE_ID, UPTIMECHECK_ERROR_CODE_
 from core.drf_resource import Resource, api, resource
 from core.errors.api import BKAPIError
 from core.prometheus.base import OPERATION_REGISTRY
-from core.prometheus.metrics import safe_push_to_gateway
+from core.prometheus.metrics import (
+    UNIFY_QUERY_CACHE_BUCKET_COUNT,
+    safe_push_to_gateway,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -456,6 +462,141 @@ class QueryTypeProcessor:
         return new_data
 
 
+class TimeBucketQueryCache:
+    """
+    按时间桶缓存查询结果
+    1. 查询时间范围按步长切分为固定点数的时间桶，已结束的时间桶查询结果写入缓存
+    2. 图表刷新时只查询缓存缺失及最近的时间桶，连续的时间桶合并为一次查询
+    3. 时间桶结束后的一段时间内仍可能有延迟数据写入，暂不缓存；之后缓存时长与时间桶已结束的时长一致
+    4. 不缓存的时长取各数据源入库延迟的最大值，计算平台等入库延迟较大的数据源可单独配置
+    """
+
+    # 数据量过大的时间桶不缓存
+    MAX_BUCKET_RECORDS = 50000
+
+    def __init__(self, params: Dict, query: UnifyQuery):
+        self.params = params
+        self.query = query
+
+        # 与统一查询模块的查询步长保持一致
+        intervals = [data_source.interval for data_source in query.data_sources if data_source.interval]
+        self.step = min(intervals) if intervals else 60
+        self.bucket_size = self.step * settings.UNIFY_QUERY_CACHE_BUCKET_POINTS
+        self.delay = max([settings.UNIFY_QUERY_CACHE_DELAY, self.step] + self.get_ingest_delays(query))
+        self._key_prefix = None
+
+    @staticmethod
+    def get_ingest_delays(query: UnifyQuery) -> List[int]:
+        """
+        获取各数据源的入库延迟
+        """
+        source_delays = settings.UNIFY_QUERY_CACHE_SOURCE_DELAY or {}
+        return [
+            source_delays[data_source.data_source_label]
+            for data_source in query.data_sources
+            if data_source.data_source_label in source_delays
+        ]
+
+    def is_enabled(self) -> bool:
+        if not settings.UNIFY_QUERY_CACHE_ENABLED or self.params["type"] != "range":
+            return False
+
+        # 仅缓存按步长聚合的时序数据，按天及以上的步长受时区影响，不缓存
+        if self.step >= 86400 or not self.query.data_sources or not self.query.use_unify_query():
+            return False
+        query_configs = self.params["query_configs"]
+        return all(query_config["data_type_label"] == DataTypeLabel.TIME_SERIES for query_config in query_configs)
+
+    @staticmethod
+    def is_limited(limit: Optional[int], slimit: Optional[int]) -> bool:
+        """
+        是否限制了点数或维度数量
+        limit/slimit 对每次查询单独生效，按时间桶分段查询后合并的结果与整体查询不一致，此时不使用缓存
+        """
+        return any(value is not None and value < settings.SQL_MAX_LIMIT for value in (limit, slimit))
+
+    def get_cache_key(self, bucket_start: int) -> str:
+        if self._key_prefix is None:
+            key_params = {
+                "query_configs": self.params["query_configs"],
+                "expression": self.params["expression"],
+                "functions": self.params["functions"],
+                "limit": self.params["limit"],
+                "slimit": self.params["slimit"],
+                "down_sample_range": self.params["down_sample_range"],
+                "timezone": timezone.get_current_timezone_name(),
+                "bucket_size": self.bucket_size,
+            }
+            self._key_prefix = "unify_query.bucket.{}.{}".format(
+                self.params["bk_biz_id"], count_md5(key_params, list_sort=False)
+            )
+        return f"{self._key_prefix}.{bucket_start}"
+
+    def query_data(self, start_time: int, end_time: int, **kwargs) -> List[Dict]:
+        """
+        查询数据，参数与 UnifyQuery.query_data 一致
+        """
+        if not self.is_enabled() or self.is_limited(kwargs.get("limit"), kwargs.get("slimit")):
+            return self.query.query_data(start_time=start_time, end_time=end_time, **kwargs)
+
+        now = int(time.time())
+        start = time_interval_align(start_time // 1000, self.step)
+        buckets = list(range(time_interval_align(start, self.bucket_size), end_time // 1000, self.bucket_size))
+        cache_keys = {
+            bucket: self.get_cache_key(bucket) for bucket in buckets if bucket + self.bucket_size <= now - self.delay
+        }
+        cached_data = cache.get_many(list(cache_keys.values())) if cache_keys else {}
+
+        records = []
+        # 连续的缺失时间桶 [(开始时间, 结束时间)]
+        missing_ranges = []
+        for bucket in buckets:
+            cache_key = cache_keys.get(bucket)
+            if cache_key in cached_data:
+                records.extend(cached_data[cache_key])
+                continue
+            if missing_ranges and missing_ranges[-1][1] == bucket:
+                missing_ranges[-1][1] = bucket + self.bucket_size
+            else:
+                missing_ranges.append([bucket, bucket + self.bucket_size])
+
+        bk_biz_id = str(self.params["bk_biz_id"])
+        UNIFY_QUERY_CACHE_BUCKET_COUNT.labels(bk_biz_id=bk_biz_id, result="hit").inc(len(cached_data))
+        UNIFY_QUERY_CACHE_BUCKET_COUNT.labels(bk_biz_id=bk_biz_id, result="miss").inc(
+            len(cache_keys) - len(cached_data)
+        )
+        UNIFY_QUERY_CACHE_BUCKET_COUNT.labels(bk_biz_id=bk_biz_id, result="recent").inc(
+            len(buckets) - len(cache_keys)
+        )
+
+        for range_start, range_end in missing_ranges:
+            # 可缓存的时间桶查询完整的时间范围以便写入缓存，不可缓存的部分查询范围与原始请求一致
+            query_start = range_start * 1000 if range_start in cache_keys else max(range_start * 1000, start_time)
+            query_end = range_end * 1000 if range_end - self.bucket_size in cache_keys else end_time
+            range_records = self.query.query_data(start_time=query_start, end_time=query_end, **kwargs)
+            records.extend(range_records)
+            self.set_cache(range_start, query_end // 1000, cache_keys, range_records, now)
+
+        # 过滤超出原始查询范围的数据
+        records = [record for record in records if start * 1000 <= record["_time_"] < end_time]
+        records.sort(key=lambda record: record["_time_"])
+        return records
+
+    def set_cache(self, range_start: int, range_end: int, cache_keys: Dict, records: List[Dict], now: int):
+        bucket_records = defaultdict(list)
+        for record in records:
+            bucket_records[time_interval_align(record["_time_"] // 1000, self.bucket_size)].append(record)
+
+        for bucket in range(range_start, range_end, self.bucket_size):
+            if bucket not in cache_keys or bucket + self.bucket_size > range_end:
+                continue
+            if len(bucket_records[bucket]) > self.MAX_BUCKET_RECORDS:
+                continue
+            # 越早结束的时间桶，延迟数据越少，缓存时间越长
+            timeout = min(now - bucket - self.bucket_size, settings.UNIFY_QUERY_CACHE_TTL)
+            cache.set(cache_keys[bucket], bucket_records[bucket], timeout)
+
+
 class UnifyQueryRawResource(ApiAuthResource):
     """
     统一查询接口 (原始数据)
@@ -750,7 +891,7 @@ class UnifyQueryRawResource(ApiAuthResource):
         )
         safe_push_to_gateway(registry=OPERATION_REGISTRY)
 
-        points = query.query_data(
+        points = TimeBucketQueryCache(params, query).query_data(
             start_time=params["start_time"] * 1000,
             end_time=params["end_time"] * 1000,
             limit=params["limit"],
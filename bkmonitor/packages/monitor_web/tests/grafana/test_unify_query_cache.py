@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import time
+
+import mock
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+
+from bkmonitor.utils.time_tools import time_interval_align
+from monitor_web.grafana.resources.unify_query import TimeBucketQueryCache
+
+
+def query_data(start_time, end_time, **kwargs):
+    start = time_interval_align(start_time // 1000, 60)
+    return [
+        {"_time_": t * 1000, "_result_": t, "bk_target_ip": "127.0.0.1"}
+        for t in range(start, end_time // 1000 + 1, 60)
+        if t * 1000 != end_time
+    ]
+
+
+@pytest.fixture
+def query():
+    query = mock.MagicMock()
+    query.data_sources = [mock.MagicMock(interval=60)]
+    query.use_unify_query.return_value = True
+    query.query_data.side_effect = query_data
+    return query
+
+
+@pytest.fixture
+def params():
+    return {
+        "bk_biz_id": 2,
+        "type": "range",
+        "query_configs": [{"data_type_label": "time_series", "interval": 60, "filter_dict": {}}],
+        "expression": "a",
+        "functions": [],
+        "limit": 1000,
+        "slimit": 1000,
+        "down_sample_range": "",
+    }
+
+
+class TestTimeBucketQueryCache:
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, mocker):
+        settings.UNIFY_QUERY_CACHE_ENABLED = True
+        settings.UNIFY_QUERY_CACHE_BUCKET_POINTS = 10
+        settings.UNIFY_QUERY_CACHE_DELAY = 120
+        settings.UNIFY_QUERY_CACHE_TTL = 3600
+        mocker.patch("monitor_web.grafana.resources.unify_query.cache", LocMemCache("unify_query_cache", {}))
+
+    def test_query_data(self, params, query):
+        end_time = int(time.time()) * 1000
+        start_time = end_time - 3600 * 1000
+        excepted = query_data(start_time, end_time)
+
+        records = TimeBucketQueryCache(params, query).query_data(start_time=start_time, end_time=end_time)
+        assert records == excepted
+
+        # 已结束的时间桶从缓存获取，只查询最近的时间桶
+        query.query_data.reset_mock()
+        records = TimeBucketQueryCache(params, query).query_data(start_time=start_time, end_time=end_time)
+        assert records == excepted
+        assert query.query_data.call_count == 1
+        call_kwargs = query.query_data.call_args[1]
+        assert call_kwargs["end_time"] == end_time
+        assert call_kwargs["start_time"] > end_time - (600 + 120) * 1000
+
+    def test_source_delay(self, settings, params, query):
+        settings.UNIFY_QUERY_CACHE_SOURCE_DELAY = {"bk_data": 1800}
+        query.data_sources[0].data_source_label = "bk_data"
+        end_time = int(time.time()) * 1000
+        start_time = end_time - 3600 * 1000
+        TimeBucketQueryCache(params, query).query_data(start_time=start_time, end_time=end_time)
+
+        # 入库延迟较大的数据源，延迟时间内的时间桶不缓存
+        query.query_data.reset_mock()
+        TimeBucketQueryCache(params, query).query_data(start_time=start_time, end_time=end_time)
+        assert query.query_data.call_count == 1
+        call_kwargs = query.query_data.call_args[1]
+        assert end_time - (1800 + 600) * 1000 < call_kwargs["start_time"] <= end_time - 1800 * 1000
+
+    def test_query_params_changed(self, params, query):
+        end_time = int(time.time()) * 1000
+        start_time = end_time - 3600 * 1000
+        TimeBucketQueryCache(params, query).query_data(start_time=start_time, end_time=end_time)
+
+        # 查询条件变化时不复用缓存
+        query.query_data.reset_mock()
+        params["query_configs"][0]["filter_dict"] = {"bk_target_ip": "127.0.0.1"}
+        TimeBucketQueryCache(params, query).query_data(start_time=start_time, end_time=end_time)
+        assert query.query_data.call_args[1]["start_time"] <= start_time
+
+    def test_disabled(self, params, query):
+        params["type"] = "instant"
+        end_time = int(time.time()) * 1000
+        TimeBucketQueryCache(params, query).query_data(start_time=end_time - 300 * 1000, end_time=end_time)
+        query.query_data.assert_called_once_with(start_time=end_time - 300 * 1000, end_time=end_time)
+
+    def test_limited(self, settings, params, query):
+        end_time = int(time.time()) * 1000
+        start_time = end_time - 3600 * 1000
+
+        # 限制了点数或维度数量时，分段查询的结果与整体查询不一致，不使用缓存
+        for _ in range(2):
+            TimeBucketQueryCache(params, query).query_data(start_time=start_time, end_time=end_time, limit=10, slimit=5)
+        assert query.query_data.call_count == 2
+        for call in query.query_data.call_args_list:
+            assert call[1] == {"start_time": start_time, "end_time": end_time, "limit": 10, "slimit": 5}
+
+        # 默认上限不视为限制
+        query.query_data.reset_mock()
+        limits = {"limit": settings.SQL_MAX_LIMIT, "slimit": settings.SQL_MAX_LIMIT}
+        TimeBucketQueryCache(params, query).query_data(start_time=start_time, end_time=end_time, **limits)
+        assert query.query_data.call_args[1]["start_time"] <= start_time
+        query.query_data.reset_mock()
+        TimeBucketQueryCache(params, query).query_data(start_time=start_time, end_time=end_time, **limits)
+        assert query.query_data.call_count == 1
+        assert query.query_data.call_args[1]["start_time"] > start_time
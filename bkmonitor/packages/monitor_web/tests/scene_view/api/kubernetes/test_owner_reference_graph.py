@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from bkmonitor.utils.kubernetes import (
+    KubernetesOwnerReferenceGraph,
+    KubernetesPodJsonParser,
+)
+
+REPLICA_SET_LIST = [
+    {
+        "metadata": {
+            "name": "api-gateway-658d88f7df",
+            "namespace": "bcs-system",
+            "ownerReferences": [{"kind": "Deployment", "name": "api-gateway"}],
+        }
+    },
+    {
+        "metadata": {
+            "name": "api-gateway-658d88f7df",
+            "namespace": "default",
+            "ownerReferences": [{"kind": "Deployment", "name": "api-gateway-default"}],
+        }
+    },
+    {
+        "metadata": {
+            "name": "api-gateway-658d88f7df-etcd",
+            "namespace": "bcs-system",
+            "ownerReferences": [{"kind": "Deployment", "name": "api-gateway-etcd"}],
+        }
+    },
+]
+
+JOB_LIST = [
+    {
+        "metadata": {
+            "name": "clean-27849600",
+            "ownerReferences": [{"kind": "CronJob", "name": "clean"}],
+        }
+    },
+]
+
+
+def make_pod(namespace, kind, name):
+    return {
+        "metadata": {
+            "name": f"{name}-abcde",
+            "namespace": namespace,
+            "ownerReferences": [{"kind": kind, "name": name}],
+        }
+    }
+
+
+class TestKubernetesOwnerReferenceGraph:
+    def test_replica_set(self):
+        graph = KubernetesOwnerReferenceGraph(REPLICA_SET_LIST, JOB_LIST)
+        pod = make_pod("bcs-system", "ReplicaSet", "api-gateway-658d88f7df")
+        workloads = KubernetesPodJsonParser(pod).get_workloads(owner_graph=graph)
+        assert workloads["workload_type"] == "Deployment"
+        # 名称精确匹配，并区分名字空间
+        assert workloads["workload_name"] == "api-gateway"
+        assert pod["metadata"]["ownerReferences"] == [
+            {"kind": "ReplicaSet", "name": "api-gateway-658d88f7df"},
+            {"kind": "Deployment", "name": "api-gateway"},
+        ]
+
+        pod = make_pod("default", "ReplicaSet", "api-gateway-658d88f7df")
+        workloads = KubernetesPodJsonParser(pod).get_workloads(owner_graph=graph)
+        assert workloads["workload_name"] == "api-gateway-default"
+
+    def test_job_without_namespace(self):
+        graph = KubernetesOwnerReferenceGraph(REPLICA_SET_LIST, JOB_LIST)
+        pod = make_pod("default", "Job", "clean-27849600")
+        workloads = KubernetesPodJsonParser(pod).get_workloads(owner_graph=graph)
+        assert workloads["workload_type"] == "CronJob"
+        assert workloads["workload_name"] == "clean"
+
+    def test_missing_owner(self):
+        graph = KubernetesOwnerReferenceGraph(REPLICA_SET_LIST, JOB_LIST)
+        pod = make_pod("bcs-system", "ReplicaSet", "unknown-658d88f7df")
+        workloads = KubernetesPodJsonParser(pod).get_workloads(owner_graph=graph)
+        assert workloads["workload_type"] == "ReplicaSet"
+        assert workloads["workload_name"] == "unknown-658d88f7df"
+        assert len(pod["metadata"]["ownerReferences"]) == 1
+
+        # 兼容直接传入资源列表
+        pod = make_pod("bcs-system", "StatefulSet", "api-gateway")
+        workloads = KubernetesPodJsonParser(pod).get_workloads(REPLICA_SET_LIST, JOB_LIST)
+        assert workloads == {
+            "owner_references": [{"kind": "StatefulSet", "name": "api-gateway"}],
+            "workload_name": "api-gateway",
+            "workload_type": "StatefulSet",
+        }